@@ -0,0 +1,122 @@
+"""
+Benchmark: single-parse extraction vs the original reparse-per-block version.
+
+The baseline below is the original extract_content() path: one parse for
+links, one for content, and a serialize + BeautifulSoup reparse for every
+content block. Run from the project root:
+
+    python benchmarks/bench_extraction.py
+"""
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from scraper.utils import WebScraper, CONTENT_SELECTORS  # noqa: E402
+
+PAGE_SIZES = [50, 500, 2000]  # paragraphs per page
+ROUNDS = 3
+
+
+def legacy_extract(html, url):
+    soup_links = BeautifulSoup(html, 'lxml')
+    links = [a['href'] for a in soup_links.find_all('a', href=True)]
+
+    soup = BeautifulSoup(html, 'lxml')
+    for script in soup(["script", "style"]):
+        script.decompose()
+    body = soup.find('body')
+    for elem in body.find_all(['header', 'nav', 'footer', 'aside', 'sidebar']):
+        elem.decompose()
+    main_content = None
+    for selector in CONTENT_SELECTORS:
+        main_content = body.select_one(selector)
+        if main_content:
+            break
+    main_content = main_content or body
+
+    email_regex = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
+    allowed_tags = {'a', 'img', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'strong', 'em', 'u', 'code', 'ul', 'ol', 'li', 'blockquote'}
+    allowed_attrs = {'a': ['href'], 'img': ['src', 'alt']}
+
+    def clean_html(html_str):
+        soup_temp = BeautifulSoup(html_str, 'lxml')
+        for tag in soup_temp.find_all():
+            if tag.name not in allowed_tags:
+                tag.unwrap()
+                continue
+            for attr in [a for a in tag.attrs if a not in allowed_attrs.get(tag.name, [])]:
+                del tag[attr]
+        return str(soup_temp)
+
+    blocks = []
+    for element in main_content.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'img', 'ul', 'ol', 'blockquote']):
+        if element.name == 'img':
+            if element.get('src'):
+                blocks.append({'type': 'image', 'html': clean_html(str(element)),
+                               'src': element.get('src'), 'alt': element.get('alt', '')})
+            continue
+        if element.name == 'p' and not element.get_text().strip():
+            continue
+        html_out = clean_html(str(element))
+        re.findall(email_regex, element.get_text(), re.IGNORECASE)
+        html_out = re.sub(email_regex, r'<span class="email-highlight">\g<0></span>', html_out, flags=re.IGNORECASE)
+        if element.name.startswith('h'):
+            blocks.append({'type': 'heading', 'level': int(element.name[1]), 'html': html_out})
+        elif element.name == 'p':
+            blocks.append({'type': 'paragraph', 'html': html_out})
+        else:
+            blocks.append({'type': 'block', 'html': html_out})
+    return blocks, links
+
+
+def make_page(paragraphs):
+    parts = ['<html><head><title>Synthetic post</title><script>var x = 1;</script></head><body>',
+             '<nav>' + ''.join(f'<a href="/nav/{i}">Nav {i}</a>' for i in range(30)) + '</nav>',
+             '<article class="post">']
+    for i in range(paragraphs):
+        if i % 10 == 0:
+            parts.append(f'<h2 id="s{i}" class="section">Section {i}</h2>')
+        parts.append(
+            f'<p class="body" style="margin:0">Paragraph {i} with <a href="/post/{i}" rel="nofollow">a link</a>, '
+            f'<strong>bold text</strong>, <span class="x">inline spans</span> and contact{i}@example.com '
+            'plus enough filler words to look like a real blog paragraph of typical length.</p>'
+        )
+        if i % 25 == 0:
+            parts.append(f'<ul><li>Item <em>{i}</em></li><li>Item {i + 1}</li></ul>'
+                         f'<img src="/img/{i}.png" alt="Figure {i}" width="600">')
+    parts.append('</article><footer>Footer</footer></body></html>')
+    return ''.join(parts)
+
+
+def best_of(fn, *args):
+    timings = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    scraper = WebScraper()
+    url = 'https://example.com/post'
+    print(f"{'paragraphs':>10} {'page KB':>8} {'legacy ms':>10} {'single-pass ms':>15} {'speedup':>8}")
+    for paragraphs in PAGE_SIZES:
+        html = make_page(paragraphs)
+        legacy_blocks, _ = legacy_extract(html, url)
+        blocks = scraper.extract_page(html, url)['content']
+        if len(blocks) != len(legacy_blocks) or any(
+                legacy != {key: block.get(key) for key in legacy} for block, legacy in zip(blocks, legacy_blocks)):
+            print(f"WARNING: content blocks differ for {paragraphs} paragraphs")
+        legacy = best_of(legacy_extract, html, url)
+        single = best_of(scraper.extract_page, html, url)
+        print(f"{paragraphs:>10} {len(html) / 1024:>8.0f} {legacy * 1000:>10.1f} {single * 1000:>15.1f} {legacy / single:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
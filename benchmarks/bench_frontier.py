@@ -0,0 +1,64 @@
+"""
+Microbenchmark: per-link cost of frontier bookkeeping as the frontier grows.
+
+Compares the original list frontier (pop(0) plus a linear membership scan)
+with scraper.frontier.Frontier. Run from the project root:
+
+    python benchmarks/bench_frontier.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scraper.frontier import Frontier  # noqa: E402
+
+SIZES = [1000, 5000, 20000]
+LINKS_PER_PAGE = 50
+
+
+def make_links(size):
+    # Every "page" links to LINKS_PER_PAGE URLs, half of them already queued
+    return [f"https://example.com/post/{i % (size // 2 + 1)}/{i}" for i in range(size)]
+
+
+def bench_list(links):
+    visited = set()
+    to_visit = [(links[0], 0)]
+    start = time.perf_counter()
+    for i, link in enumerate(links):
+        if link not in visited and link not in [u for u, d in to_visit]:
+            to_visit.append((link, 1))
+        if i % LINKS_PER_PAGE == 0 and to_visit:
+            url, _ = to_visit.pop(0)
+            visited.add(url)
+    return time.perf_counter() - start
+
+
+def bench_frontier(links, strategy):
+    to_visit = Frontier(strategy)
+    to_visit.add(links[0], 0)
+    start = time.perf_counter()
+    for i, link in enumerate(links):
+        to_visit.add(link, 1)
+        if i % LINKS_PER_PAGE == 0 and to_visit:
+            to_visit.pop()
+    return time.perf_counter() - start
+
+
+def main():
+    print(f"{'links':>8} {'list ns/link':>14} {'bfs ns/link':>13} {'best_first ns/link':>20}")
+    for size in SIZES:
+        links = make_links(size)
+        results = [
+            bench_list(links),
+            bench_frontier(links, 'bfs'),
+            bench_frontier(links, 'best_first'),
+        ]
+        per_link = [elapsed / size * 1e9 for elapsed in results]
+        print(f"{size:>8} {per_link[0]:>14.0f} {per_link[1]:>13.0f} {per_link[2]:>20.0f}")
+
+
+if __name__ == '__main__':
+    main()
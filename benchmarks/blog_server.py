@@ -0,0 +1,206 @@
+"""
+Synthetic blog sites served from a local HTTP server, for offline benchmarks.
+
+Two sites are served side by side:
+
+    /static/...   server-rendered blog: article HTML is in the response
+    /js/...       client-rendered blog: an app shell whose article is
+                  injected by JavaScript (needs Playwright to extract)
+
+Each site has an index page linking to every post, posts numbered from 0,
+`--links` related-post links per post, robots.txt and a sitemap. Pages are
+generated deterministically, so runs are comparable. Run standalone with:
+
+    python benchmarks/blog_server.py --pages 200 --paragraphs 30 --latency-ms 20
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    'python django crawler content article performance latency browser render '
+    'parser extract selector network request response cache frontier queue '
+    'thread process memory throughput benchmark server client static dynamic '
+    'blog post author reader comment archive category tag page link sitemap'
+).split()
+
+
+class SiteConfig:
+    """
+    Shape of the generated sites.
+
+    Args:
+        pages (int): Posts per site (default: 100)
+        links (int): Related-post links per post (default: 10)
+        paragraphs (int): Paragraphs per post, i.e. page size (default: 20)
+        latency_ms (float): Artificial delay before every response (default: 0)
+        seed (int): Random seed for the generated text (default: 1)
+    """
+
+    def __init__(self, pages=100, links=10, paragraphs=20, latency_ms=0, seed=1):
+        self.pages = pages
+        self.links = links
+        self.paragraphs = paragraphs
+        self.latency_ms = latency_ms
+        self.seed = seed
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+def _paragraph(rng, words=60):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def _related(config, number):
+    rng = random.Random(config.seed * 7919 + number)
+    return sorted({rng.randrange(config.pages) for _ in range(config.links)} - {number})
+
+
+def post_body(config, number):
+    """Article HTML (title, headings, paragraphs) of post number"""
+    rng = random.Random(config.seed * 104729 + number)
+    parts = [f'<h1>Post {number}: {_paragraph(rng, 6)}</h1>']
+    for index in range(config.paragraphs):
+        if index and index % 5 == 0:
+            parts.append(f'<h2>Section {index // 5}</h2>')
+        parts.append(f'<p>{_paragraph(rng)}</p>')
+    return ''.join(parts)
+
+
+def _layout(title, body, head=''):
+    return (
+        f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{title}</title>{head}</head><body>'
+        '<header><nav><a href="/">Home</a> <a href="/about">About</a></nav></header>'
+        f'{body}'
+        '<footer><p>Benchmark blog footer with boilerplate text.</p></footer></body></html>'
+    )
+
+
+def static_post(config, number):
+    links = ''.join(f'<li><a href="/static/post/{n}.html">Related post {n}</a></li>' for n in _related(config, number))
+    body = f'<main><article>{post_body(config, number)}</article><aside><ul>{links}</ul></aside></main>'
+    return _layout(f'Post {number}', body)
+
+
+def js_post(config, number):
+    # Links stay in the server HTML so crawlers can discover the site, the
+    # article itself only exists after the script runs
+    links = ''.join(f'<a href="/js/post/{n}.html">Related post {n}</a>' for n in _related(config, number))
+    article = json.dumps(post_body(config, number))
+    body = (
+        f'<div id="root"></div><div class="related">{links}</div>'
+        f'<script>document.getElementById("root").innerHTML = "<article>" + {article} + "</article>";</script>'
+        '<noscript>This blog requires JavaScript</noscript>'
+    )
+    return _layout(f'Post {number}', body)
+
+
+def index_page(config, site):
+    links = ''.join(f'<li><a href="/{site}/post/{n}.html">Post {n}</a></li>' for n in range(config.pages))
+    return _layout(f'{site} blog', f'<main><h1>All posts</h1><ul>{links}</ul></main>')
+
+
+def sitemap(config, host):
+    urls = ''.join(
+        f'<url><loc>http://{host}/static/post/{n}.html</loc><lastmod>2024-01-{n % 28 + 1:02d}</lastmod></url>'
+        for n in range(config.pages)
+    )
+    return f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'
+
+
+def make_handler(config):
+    class BlogHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Send headers and body in one segment; otherwise delayed ACKs add
+        # ~40 ms to every keep-alive response and swamp the measurements
+        wbufsize = -1
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            if config.latency_ms:
+                time.sleep(config.latency_ms / 1000)
+            path = self.path.split('?', 1)[0]
+            content_type = 'text/html; charset=utf-8'
+            body = None
+            if path == '/robots.txt':
+                content_type = 'text/plain'
+                body = f'User-agent: *\nAllow: /\nSitemap: http://{self.headers["Host"]}/sitemap.xml\n'
+            elif path == '/sitemap.xml':
+                content_type = 'application/xml'
+                body = sitemap(config, self.headers['Host'])
+            elif path in ('/static/', '/js/'):
+                body = index_page(config, path.strip('/'))
+            elif path.startswith(('/static/post/', '/js/post/')) and path.endswith('.html'):
+                site, number = path.split('/')[1], path.rsplit('/', 1)[1][:-5]
+                if number.isdigit() and int(number) < config.pages:
+                    body = (static_post if site == 'static' else js_post)(config, int(number))
+            if body is None:
+                self.send_error(404)
+                return
+            data = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return BlogHandler
+
+
+class BlogServer:
+    """
+    Serve the synthetic sites on 127.0.0.1 from a background thread.
+
+    Usable as a context manager; base_url is set once the server is running.
+    """
+
+    def __init__(self, config=None, port=0):
+        self.config = config or SiteConfig()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(self.config))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name='blog-server', daemon=True)
+        self.base_url = f'http://127.0.0.1:{self._server.server_address[1]}'
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--port', type=int, default=8800)
+    parser.add_argument('--pages', type=int, default=100)
+    parser.add_argument('--links', type=int, default=10)
+    parser.add_argument('--paragraphs', type=int, default=20)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    args = parser.parse_args()
+
+    config = SiteConfig(args.pages, args.links, args.paragraphs, args.latency_ms)
+    with BlogServer(config, args.port) as server:
+        print(f'Serving {server.base_url}/static/ and {server.base_url}/js/ (Ctrl+C to stop)')
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
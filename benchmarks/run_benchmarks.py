@@ -0,0 +1,220 @@
+"""
+Offline benchmark suite for the scraper against local synthetic blog sites.
+
+Serves the sites from benchmarks/blog_server.py and runs each scenario in a
+fresh process, so peak RSS and CPU time are measured per scenario:
+
+    extract_content    WebScraper.extract_content() on generated pages (no network)
+    scrape_url         WebScraper.scrape_url() on every post, one after another
+    crawl_website      WebScraper.crawl_website() from the site index
+    crawl_and_export   the crawl_and_export management command (JSONL output)
+
+Pages/sec, p50/p99 page latency, peak RSS and CPU time are written as JSON.
+The "js" site needs Playwright with Chromium installed. Run from the project
+root:
+
+    python benchmarks/run_benchmarks.py --pages 200 --latency-ms 20 --output bench.json
+    python benchmarks/run_benchmarks.py --sites static js --compare bench.json
+"""
+import argparse
+import io
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from blog_server import BlogServer, SiteConfig, static_post, js_post  # noqa: E402
+
+SCENARIOS = ('extract_content', 'scrape_url', 'crawl_website', 'crawl_and_export')
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of values (q in 0-100), or None if empty"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def bench_extract_content(base_url, config, site):
+    from scraper.utils import WebScraper
+
+    render = static_post if site == 'static' else js_post
+    pages = [(f'{base_url}/{site}/post/{n}.html', render(config, n)) for n in range(config.pages)]
+    latencies = []
+    with WebScraper() as scraper:
+        for url, html in pages:
+            started = time.perf_counter()
+            scraper.extract_content(html, url)
+            latencies.append(time.perf_counter() - started)
+    return len(pages), latencies
+
+
+def bench_scrape_url(base_url, config, site):
+    from scraper.utils import WebScraper
+
+    latencies = []
+    with WebScraper() as scraper:
+        for n in range(config.pages):
+            started = time.perf_counter()
+            result = scraper.scrape_url(f'{base_url}/{site}/post/{n}.html')
+            latencies.append(time.perf_counter() - started)
+            if result.get('error'):
+                raise Exception(result['error'])
+    return config.pages, latencies
+
+
+def bench_crawl_website(base_url, config, site):
+    from scraper.utils import WebScraper
+
+    # Time between progress callbacks is the time spent on each page
+    marks = [time.perf_counter()]
+    with WebScraper() as scraper:
+        result = scraper.crawl_website(
+            f'{base_url}/{site}/', max_depth=2, max_pages=config.pages + 1, polite=False,
+            progress=lambda progress: marks.append(time.perf_counter()),
+        )
+    latencies = [later - earlier for earlier, later in zip(marks, marks[1:])]
+    return len(latencies), latencies, {'pages_extracted': len(result['pages'])}
+
+
+class PageSecondsHandler(logging.Handler):
+    """Collects the per-page seconds CrawlMetrics logs as JSON on 'scraper.metrics'"""
+
+    def __init__(self):
+        super().__init__(logging.INFO)
+        self.seconds = []
+
+    def emit(self, record):
+        event = json.loads(record.getMessage())
+        if event.get('event') == 'page':
+            self.seconds.append(event['seconds'])
+
+
+def bench_crawl_and_export(base_url, config, site):
+    import django
+    from django.core.management import call_command
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blogscraper.settings')
+    django.setup()
+    # Page latencies come from the command's own per-page metrics log lines
+    handler = PageSecondsHandler()
+    logger = logging.getLogger('scraper.metrics')
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, 'export.jsonl')
+        # --no-index: the benchmark measures crawling and export, and must not
+        # write its synthetic pages into the project's search index
+        call_command('crawl_and_export', f'{base_url}/{site}/', '--depth', '2', '--format', 'jsonl', '--output', output,
+                     '--ignore-robots', '--rate', '1000000', '--no-index', stdout=io.StringIO())
+        with open(output, encoding='utf-8') as f:
+            rows = sum(1 for _ in f)
+    logger.removeHandler(handler)
+    return len(handler.seconds), handler.seconds, {'pages_exported': rows}
+
+
+def run_scenario(name, base_url, config, site):
+    """Run one scenario in this (fresh) process and measure it"""
+    bench = globals()[f'bench_{name}']
+    started = time.perf_counter()
+    try:
+        outcome = bench(base_url, SiteConfig(**config), site)
+    except Exception as e:
+        return {'error': f'{type(e).__name__}: {e}'}
+    seconds = time.perf_counter() - started
+    pages, latencies = outcome[0], outcome[1]
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss_unit = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    result = {
+        'pages': pages,
+        'seconds': round(seconds, 4),
+        'pages_per_sec': round(pages / seconds, 2) if seconds else None,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3) if latencies else None,
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3) if latencies else None,
+        # Browser and driver processes count once they have exited
+        'cpu_seconds': round(own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime, 3),
+        'peak_rss_mb': round(own.ru_maxrss / rss_unit, 1),
+    }
+    if len(outcome) > 2:
+        result.update(outcome[2])
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(baseline, results):
+    print(f"\n{'benchmark':<32}{'pages/s before':>16}{'after':>12}{'change':>10}")
+    for key, after in results.items():
+        before = baseline.get('results', {}).get(key, {})
+        if not before.get('pages_per_sec') or not after.get('pages_per_sec'):
+            continue
+        change = (after['pages_per_sec'] / before['pages_per_sec'] - 1) * 100
+        print(f"{key:<32}{before['pages_per_sec']:>16}{after['pages_per_sec']:>12}{change:>+9.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline scraper benchmarks against a local synthetic blog')
+    parser.add_argument('--pages', type=int, default=100, help='Posts per site (default: 100)')
+    parser.add_argument('--links', type=int, default=10, help='Related-post links per post (default: 10)')
+    parser.add_argument('--paragraphs', type=int, default=20, help='Paragraphs per post (default: 20)')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Artificial server latency (default: 0)')
+    parser.add_argument('--sites', nargs='+', choices=('static', 'js'), default=['static'], help='Sites to run against (default: static)')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--output', default='benchmark_results.json', help='JSON results file (default: benchmark_results.json)')
+    parser.add_argument('--compare', default=None, help='Earlier results file to print pages/sec changes against')
+    args = parser.parse_args()
+
+    config = SiteConfig(args.pages, args.links, args.paragraphs, args.latency_ms)
+    results = {}
+    # spawn: every scenario starts from a clean interpreter
+    context = multiprocessing.get_context('spawn')
+    with BlogServer(config) as server:
+        for site in args.sites:
+            for name in args.scenarios:
+                key = f'{name}[{site}]'
+                print(f'Running {key}...', flush=True)
+                with context.Pool(1) as pool:
+                    results[key] = pool.apply(run_scenario, (name, server.base_url, config.to_dict(), site))
+                print(f'  {json.dumps(results[key])}')
+
+    report = {
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'site': config.to_dict(),
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f'Saved results to {os.path.abspath(args.output)}')
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(json.load(f), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -122,3 +122,76 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Shared Playwright browser pool used by the scraper views
+# (see scraper/browser_pool.py for all options)
+
+SCRAPER_BROWSER_POOL = {
+    'size': 2,
+    'max_pages_per_browser': 200,
+    'max_rss_mb': 1500,
+    'render_policy': 'fast',
+}
+
+# Background crawl jobs started from /crawl/; a job holds one pooled
+# browser while it runs, so workers are capped at the browser pool size
+# minus one. Jobs are tracked in memory: serve the UI from one process.
+
+SCRAPER_CRAWL_JOBS = {
+    'workers': 1,
+    'max_jobs': 50,
+}
+
+SCRAPER_WEB_CRAWL_LIMITS = {
+    'default_depth': 2,
+    'default_pages': 50,
+    'max_depth': 5,
+    'max_pages': 1000,
+}
+
+# Cached scrape_blog results: fresh for ttl seconds, then served stale for up
+# to stale_ttl more while one background refresh runs. Stored in the default
+# Django cache (an in-process LRU of max_entries when caching is disabled)
+
+SCRAPER_RESULT_CACHE = {
+    'ttl': 300,
+    'stale_ttl': 3600,
+    'max_entries': 256,
+}
+
+# Frontier shared by `manage.py crawl_worker` processes: sqlite:///<path> for
+# workers on one machine, redis://host:port/db for several machines
+
+SCRAPER_CRAWL_FRONTIER = 'sqlite:///' + str(BASE_DIR / 'crawl_frontier.sqlite3')
+
+# Full-text search over crawled pages (/search/ and /api/search/), kept in
+# FTS5 tables of a database file of its own (not db.sqlite3: the index
+# runs in WAL mode, which applies to the whole file); remove to stop
+# indexing crawls
+
+SCRAPER_SEARCH_INDEX = {
+    'path': str(BASE_DIR / 'search_index.sqlite3'),
+    'batch_size': 500,
+}
+
+# Crawls from /crawl/ and `crawl_and_export --store` are saved as CrawlJob,
+# Page and Link rows, written batch_size rows at a time; page text is stored
+# compressed (zstd with zstandard installed, zlib otherwise)
+
+SCRAPER_CRAWL_STORAGE = {
+    'enabled': True,
+    'batch_size': 500,
+    'store_html': False,
+    'store_links': True,
+}
+
+# How discovered URLs are canonicalized before they are queued (see
+# scraper/canonical.py for all options); drop_params entries ending in '*'
+# are prefixes
+
+SCRAPER_URL_CANONICALIZATION = {
+    'fold_scheme': True,
+    'fold_www': True,
+    'fold_trailing_slash': True,
+    'sort_query': True,
+}
@@ -0,0 +1,51 @@
+import re
+from collections import Counter
+from urllib.parse import urlparse
+
+ENGINES = ('adaptive', 'requests', 'playwright')
+
+# Markup left behind by client-side rendered apps before their JS runs
+SPA_MARKERS = re.compile(
+    r'<div[^>]+id=["\'](?:root|app|__next|__nuxt|___gatsby)["\'][^>]*>\s*</div>'
+    r'|<noscript>[^<]*(?:enable|requires?)\s+javascript',
+    re.IGNORECASE
+)
+
+
+class EngineSelector:
+    """
+    Decide per domain whether pages can be fetched over plain HTTP.
+
+    The first page of a domain is probed with requests; if the extracted
+    content looks empty or SPA-like the domain is escalated to Playwright.
+    The decision is remembered so later pages skip the probe.
+
+    Args:
+        min_words (int): Extracted words below which a page counts as
+            unrendered (default: 50)
+    """
+
+    def __init__(self, min_words=50):
+        self.min_words = min_words
+        self.domain_engines = {}
+        self.stats = Counter()
+
+    def engine_for(self, url):
+        """Remembered engine for url's domain, or None if it must be probed"""
+        return self.domain_engines.get(urlparse(url).netloc.lower())
+
+    def remember(self, url, engine):
+        self.domain_engines[urlparse(url).netloc.lower()] = engine
+
+    def word_count(self, content_data):
+        return sum(block.word_count for block in content_data['content'])
+
+    def needs_rendering(self, html, content_data):
+        """True if a statically fetched page looks like it needs JavaScript"""
+        if not content_data['content']:
+            return True
+        words = self.word_count(content_data)
+        if words < self.min_words:
+            return True
+        # An app shell with a little boilerplate text is still an app shell
+        return bool(SPA_MARKERS.search(html)) and words < self.min_words * 4
@@ -1,3 +1,26 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import CrawlJob, Link, Page
+
+
+@admin.register(CrawlJob)
+class CrawlJobAdmin(admin.ModelAdmin):
+    list_display = ('seed_url', 'status', 'pages_stored', 'links_stored', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    search_fields = ('seed_url',)
+
+
+@admin.register(Page)
+class PageAdmin(admin.ModelAdmin):
+    # The default manager leaves the compressed bodies unloaded in the list
+    list_display = ('url', 'title', 'word_count', 'engine', 'job', 'fetched_at')
+    list_select_related = ('job',)
+    search_fields = ('url', 'title')
+    raw_id_fields = ('job',)
+
+
+@admin.register(Link)
+class LinkAdmin(admin.ModelAdmin):
+    list_display = ('source_url', 'url', 'job')
+    search_fields = ('url', 'source_url')
+    raw_id_fields = ('job',)
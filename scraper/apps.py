@@ -1,6 +1,24 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ScraperConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'scraper'
+
+    def ready(self):
+        from .browser_pool import configure_browser_pool
+        from .canonical import configure_canonicalizer
+        from .jobs import configure_crawl_jobs
+        from .result_cache import configure_result_cache
+        from .search import configure_search_index
+        from .storage import configure_crawl_storage
+
+        # Browsers are launched lazily on the first lease, so management
+        # commands that never scrape do not pay for a Chromium start.
+        configure_browser_pool(**getattr(settings, 'SCRAPER_BROWSER_POOL', {}))
+        configure_canonicalizer(**getattr(settings, 'SCRAPER_URL_CANONICALIZATION', {}))
+        configure_crawl_jobs(**getattr(settings, 'SCRAPER_CRAWL_JOBS', {}))
+        configure_result_cache(**getattr(settings, 'SCRAPER_RESULT_CACHE', {}))
+        configure_search_index(**getattr(settings, 'SCRAPER_SEARCH_INDEX', {}))
+        configure_crawl_storage(**getattr(settings, 'SCRAPER_CRAWL_STORAGE', {}))
@@ -0,0 +1,252 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+
+from .compression import compress, decompress
+from .http_client import decode_body
+
+# Content type of HTML serialized from a rendered Playwright page
+RENDERED_CONTENT_TYPE = 'text/html; charset=utf-8'
+
+# Every record starts with the magic, the metadata length and the body length
+RECORD_MAGIC = b'SCRA'
+_RECORD_HEADER = struct.Struct('>4sIQ')
+
+
+class ArchivedResponse:
+    """One archived response: URL, status, content type, engine, fetch time and raw body"""
+
+    __slots__ = ('url', 'status', 'content_type', 'engine', 'fetched_at', 'body')
+
+    def __init__(self, url, status, content_type, engine, fetched_at, body):
+        self.url = url
+        self.status = status
+        self.content_type = content_type
+        self.engine = engine
+        self.fetched_at = fetched_at
+        self.body = body
+
+    @property
+    def html(self):
+        return decode_body(self.body, self.content_type)
+
+
+class ArchiveWriter:
+    """
+    Append raw responses to a WARC-like archive file.
+
+    Each record is the response metadata as a JSON line plus its body,
+    compressed on its own (see scraper/compression.py), so any record can be
+    read without decompressing the ones before it. Records are only ever
+    appended; the offset and length of each one is appended to a separate
+    index file (<path>.idx) keyed by URL, and the latest record of a URL is
+    the one that counts. The writer is thread-safe, but only one process may
+    append to an archive at a time.
+
+    Args:
+        path (str): Archive file, created if missing
+        codec (str): Body compression, 'zstd', 'zlib' or 'none' (default:
+            zstd when zstandard is installed, zlib otherwise)
+        level (int): Compression level (default: the codec's default)
+        flush_every (int): Records between flushes to disk (default: 100)
+    """
+
+    def __init__(self, path, codec=None, level=None, flush_every=100):
+        self.path = path
+        self.codec = codec
+        self.level = level
+        self.flush_every = max(1, flush_every)
+        self.records_written = 0
+        self._archive = open(path, 'ab')
+        self._index = open(index_path(path), 'a', encoding='utf-8')
+        self._unflushed = 0
+        self._lock = threading.Lock()
+
+    def write(self, url, body, content_type='', status=200, engine=''):
+        """Append one response; body is the raw bytes as received (or rendered HTML)"""
+        if isinstance(body, str):
+            body, content_type = body.encode('utf-8'), RENDERED_CONTENT_TYPE
+        meta = json.dumps({
+            'url': url,
+            'status': status,
+            'content_type': content_type or '',
+            'engine': engine or '',
+            'fetched_at': time.time(),
+        }, ensure_ascii=False).encode('utf-8')
+        payload = compress(bytes(body), self.codec, self.level)
+        record = _RECORD_HEADER.pack(RECORD_MAGIC, len(meta), len(payload)) + meta + payload
+
+        with self._lock:
+            offset = self._archive.tell()
+            self._archive.write(record)
+            # URL last: it is the only field that could contain a tab
+            self._index.write(f'{offset}\t{len(record)}\t{url}\n')
+            self.records_written += 1
+            self._unflushed += 1
+            if self._unflushed >= self.flush_every:
+                self._flush()
+        return offset
+
+    def _flush(self):
+        # The archive goes to disk before the index that points into it
+        self._archive.flush()
+        os.fsync(self._archive.fileno())
+        self._index.flush()
+        self._unflushed = 0
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        with self._lock:
+            if self._archive.closed:
+                return
+            self._flush()
+            self._archive.close()
+            self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class ArchiveReader:
+    """
+    Random access to an archive through its index and a memory map.
+
+    The index is loaded into a dict of URL -> (offset, length); records are
+    sliced out of the memory-mapped archive, so reading a page costs one
+    decompression and no read() calls, and processes reading the same
+    archive share the page cache. Records appended after the reader was
+    opened are not seen.
+
+    Args:
+        path (str): Archive file written by ArchiveWriter
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self._index = self._load_index(size)
+
+    def _load_index(self, size):
+        index = {}
+        path = index_path(self.path)
+        if not os.path.exists(path):
+            return dict(self._scan_index(size))
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                # A line cut short by a crash has no newline; skip it
+                if not line.endswith('\n'):
+                    continue
+                offset, length, url = line[:-1].split('\t', 2)
+                offset, length = int(offset), int(length)
+                if offset + length <= size:
+                    index[url] = (offset, length)
+        return index
+
+    def _scan_index(self, size):
+        offset = 0
+        while offset + _RECORD_HEADER.size <= size:
+            magic, meta_length, body_length = _RECORD_HEADER.unpack_from(self._map, offset)
+            length = _RECORD_HEADER.size + meta_length + body_length
+            if magic != RECORD_MAGIC or offset + length > size:
+                break
+            start = offset + _RECORD_HEADER.size
+            yield json.loads(self._map[start:start + meta_length])['url'], (offset, length)
+            offset += length
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, url):
+        return url in self._index
+
+    def urls(self):
+        return list(self._index)
+
+    def entries(self):
+        """(url, offset, length) of the latest record of every URL, in archive order"""
+        return sorted(((url, offset, length) for url, (offset, length) in self._index.items()), key=lambda entry: entry[1])
+
+    def get(self, url):
+        """The latest ArchivedResponse for url, or None"""
+        location = self._index.get(url)
+        return self.read(*location) if location else None
+
+    def read(self, offset, length):
+        """The ArchivedResponse stored at offset"""
+        magic, meta_length, body_length = _RECORD_HEADER.unpack_from(self._map, offset)
+        if magic != RECORD_MAGIC or _RECORD_HEADER.size + meta_length + body_length != length:
+            raise ValueError(f'No archive record at offset {offset} of {self.path}')
+        start = offset + _RECORD_HEADER.size
+        meta = json.loads(self._map[start:start + meta_length])
+        body = decompress(self._map[start + meta_length:offset + length])
+        return ArchivedResponse(meta['url'], meta['status'], meta['content_type'], meta['engine'], meta['fetched_at'], body)
+
+    def rebuild_index(self):
+        """Rewrite <path>.idx from the archive itself, e.g. after the index was lost"""
+        size = self._map.size() if self._map is not None else 0
+        self._index = dict(self._scan_index(size))
+        with open(index_path(self.path), 'w', encoding='utf-8') as f:
+            for url, offset, length in self.entries():
+                f.write(f'{offset}\t{length}\t{url}\n')
+        return len(self._index)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def index_path(path):
+    return f'{path}.idx'
+
+
+# Per-process state of the re-extraction workers, created on first use
+_worker_scraper = None
+_worker_readers = {}
+
+
+def reextract_worker(path, entries):
+    """
+    Extract a chunk of archived pages inside a worker process.
+
+    Args:
+        path (str): Archive file, memory-mapped once per process
+        entries (list): (url, offset, length) tuples from ArchiveReader.entries()
+
+    Returns:
+        list: (url, extract_page() result or None, error message or None)
+    """
+    global _worker_scraper
+    if _worker_scraper is None:
+        from .utils import WebScraper
+
+        _worker_scraper = WebScraper()
+    reader = _worker_readers.get(path)
+    if reader is None:
+        reader = _worker_readers[path] = ArchiveReader(path)
+
+    results = []
+    for url, offset, length in entries:
+        try:
+            response = reader.read(offset, length)
+            results.append((url, _worker_scraper.extract_page(response.html, url), None))
+        except Exception as e:
+            results.append((url, None, str(e)))
+    return results
@@ -0,0 +1,421 @@
+import asyncio
+import contextlib
+import contextvars
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from playwright.async_api import async_playwright
+
+from .adaptive import ENGINES
+from .dedup import NearDuplicateDetector, page_text
+from .http_client import AsyncHttpClient, HttpStatusError, httpx
+from .metrics import PageMetrics, error_class
+from .render import async_render_page
+from .utils import BROWSER_USER_AGENT, BROWSER_VIEWPORT, BROWSER_HEADERS
+
+# PageMetrics of the page a crawl worker is on; each worker is its own
+# asyncio task and so sees its own value
+_current_page = contextvars.ContextVar('scraper_async_page', default=None)
+# Stages being timed by the current worker, innermost last
+_stage_stack = contextvars.ContextVar('scraper_async_stages', default=None)
+
+
+class AsyncCrawler:
+    """Crawl a website with several pages in flight at once"""
+
+    def __init__(self, scraper, concurrency=8, per_host_concurrency=2):
+        # The WebScraper supplies extraction, link discovery and the
+        # per-domain engine decisions, so results match crawl_website().
+        self.scraper = scraper
+        self.concurrency = max(1, concurrency)
+        self.per_host_concurrency = max(1, per_host_concurrency)
+        self.http = None
+        self.context = None
+        self._playwright = None
+        self._browser = None
+        self._browser_lock = None
+        self._host_slots = defaultdict(lambda: asyncio.Semaphore(self.per_host_concurrency))
+        # Extraction, link learning and search indexing mutate the scraper's
+        # shared state (extractor registry, index writer), so they all run on
+        # this one thread, off the event loop
+        self._extractor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='scraper-async-extract')
+
+    @contextlib.contextmanager
+    def _timed(self, stage):
+        # CrawlMetrics.time() keeps its stack per thread, and every coroutine
+        # shares the loop's thread, so awaited stages are timed here with a
+        # stack per worker task; like time(), nested stages are excluded
+        stack = _stage_stack.get()
+        if stack is None:
+            stack = []
+            _stage_stack.set(stack)
+        stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            self.scraper.metrics.merge_timings({stage: elapsed - nested}, _current_page.get())
+
+    def _add_bytes(self, count):
+        page = _current_page.get()
+        if page is not None:
+            page.bytes += count
+        self.scraper.metrics.add_bytes(count)
+
+    async def _on_thread(self, executor, fn, *args):
+        """Run fn(*args) on executor (None: the loop's default), attributed to the current page"""
+        page = _current_page.get()
+
+        def run():
+            with self.scraper.metrics.attribute_to(page):
+                return fn(*args)
+        return await asyncio.get_running_loop().run_in_executor(executor, run)
+
+    async def _on_extractor(self, fn, *args):
+        """Run fn(*args) on the extraction thread, attributed to the current page"""
+        return await self._on_thread(self._extractor, fn, *args)
+
+    async def extract_page(self, html, url):
+        """WebScraper.extract_page on the extraction thread"""
+        return await self._on_extractor(self.scraper.extract_page, html, url)
+
+    def _index_page(self, index, page_data):
+        with self.scraper.metrics.time('index'):
+            index.add_page(page_data)
+
+    def _close_index(self, index):
+        with self.scraper.metrics.time('index'):
+            return index.close()
+
+    async def get_response(self, url, headers=None):
+        """Raw HttpResponse for url from the async client (or the sync one on a thread)"""
+        with self._timed('fetch'):
+            if self.http is None:
+                response = await asyncio.get_running_loop().run_in_executor(None, self.scraper.http.get, url, headers)
+            else:
+                response = await self.http.get(url, headers=headers)
+        self._add_bytes(len(response.content))
+        return response
+
+    async def fetch_html_requests(self, url):
+        """Async counterpart of WebScraper.fetch_html_requests"""
+        if self.http is None:
+            # Without httpx, run the scraper's pooled sync client on a thread,
+            # where it times the fetch and counts bytes itself
+            return await self._on_thread(None, self.scraper.fetch_html_requests, url)
+        try:
+            with self._timed('fetch'):
+                response = await self.http.get(url)
+            self._add_bytes(len(response.content))
+            response.raise_for_status()
+            await self._archive(url, response)
+            return response.text
+        except HttpStatusError:
+            raise
+        except Exception as e:
+            raise Exception(f"Failed to fetch with requests: {str(e)}")
+
+    async def _archive(self, url, response):
+        # Compression and the file append run on a thread, off the event loop
+        if self.scraper.archive is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.scraper.archive_response, url, response)
+
+    async def fetch_html(self, url):
+        """Async counterpart of WebScraper.fetch_html_playwright"""
+        await self._ensure_browser()
+        page = await self.context.new_page()
+        try:
+            with self._timed('fetch'):
+                html = await async_render_page(page, url, self.scraper.render_policy, self._timed)
+            self._add_bytes(len(html.encode('utf-8')))
+        except Exception as e:
+            raise Exception(f"Failed to fetch with Playwright: {str(e)}")
+        finally:
+            try:
+                await page.close()
+            except Exception:
+                pass
+        if self.scraper.archive is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.scraper.archive.write, url, html, '', 200, 'playwright')
+        return html
+
+    async def fetch_cached(self, url, engine='adaptive'):
+        """Async counterpart of WebScraper.fetch_cached"""
+        cache = self.scraper.http_cache
+        if cache is None or engine == 'playwright':
+            return await self.fetch_page(url, engine)
+
+        loop = asyncio.get_running_loop()
+        key = self.scraper.canonicalizer.key(url)
+        entry = await loop.run_in_executor(None, cache.get, key)
+        try:
+            response = await self.get_response(url, cache.conditional_headers(entry))
+        except Exception:
+            response = None
+
+        if cache.is_fresh(entry, response):
+            cache.hit()
+            return None, entry['page'], 'cache'
+
+        cache.miss()
+        static_html = None
+        if response is not None:
+            # The server answered with an error; a second request would too
+            response.raise_for_status()
+            if 200 <= response.status_code < 300:
+                static_html = response.text
+                await self._archive(url, response)
+        html, page, used_engine = await self.fetch_page(url, engine, static_html)
+        if static_html is not None:
+            await loop.run_in_executor(None, cache.put, key, response, page, used_engine)
+        return html, page, used_engine
+
+    async def fetch_page(self, url, engine='adaptive', static_html=None):
+        """Async counterpart of WebScraper.fetch_adaptive"""
+        selector = self.scraper.engine_selector
+        if engine == 'adaptive':
+            engine = selector.engine_for(url)
+            if engine is None and self.scraper.is_dynamic_site(url):
+                engine = 'playwright'
+
+        if engine in ('requests', 'playwright'):
+            if engine == 'requests':
+                html = static_html if static_html is not None else await self.fetch_html_requests(url)
+            else:
+                html = await self.fetch_html(url)
+            selector.stats[engine] += 1
+            return html, await self.extract_page(html, url), engine
+
+        # Unknown domain: probe over plain HTTP
+        static = None
+        static_words = 0
+        try:
+            html = static_html if static_html is not None else await self.fetch_html_requests(url)
+            page = await self.extract_page(html, url)
+            if not selector.needs_rendering(html, page):
+                selector.remember(url, 'requests')
+                selector.stats['requests'] += 1
+                return html, page, 'requests'
+            static = (html, page, 'requests')
+            static_words = selector.word_count(page)
+        except HttpStatusError:
+            raise
+        except Exception:
+            pass
+
+        try:
+            html = await self.fetch_html(url)
+            page = await self.extract_page(html, url)
+        except Exception:
+            if static is None:
+                raise
+            selector.stats['requests'] += 1
+            return static
+        rendered_words = selector.word_count(page)
+        if static is not None and rendered_words <= static_words:
+            selector.stats['requests'] += 1
+            return static
+        if rendered_words > static_words:
+            selector.remember(url, 'playwright')
+        selector.stats['playwright'] += 1
+        return html, page, 'playwright'
+
+    async def _ensure_browser(self):
+        # Chromium starts on the first page that actually needs rendering
+        async with self._browser_lock:
+            if self.context is not None:
+                return
+            self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=True)
+            self.context = await self._browser.new_context(user_agent=BROWSER_USER_AGENT, viewport=BROWSER_VIEWPORT)
+            await self.context.set_extra_http_headers(BROWSER_HEADERS)
+
+    async def _close(self):
+        self._extractor.shutdown(wait=True)
+        if self.http is not None:
+            await self.http.close()
+        if self.context is not None:
+            await self.context.close()
+            await self._browser.close()
+            await self._playwright.stop()
+
+    async def crawl(self, seed_url, max_depth=5, max_pages=1000, strategy='bfs', engine='adaptive',
+                    dedup=True, prune_duplicates=False, polite=True, sitemaps=False, sitemap_only=False):
+        """
+        Crawl from seed_url and return the crawl_website() result dict.
+
+        Stage timings go to the scraper's current metrics (see
+        WebScraper.instrumented()); crawl_website_async() adds them to the
+        result as "metrics".
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {', '.join(ENGINES)}")
+        metrics = self.scraper.metrics
+        seed_url = self.scraper._normalize_url(seed_url)
+        base_domain_root = self.scraper._get_base_domain_root(seed_url)
+
+        visited = set()
+        all_links = set()
+        pages_data = []
+        engine_counts = Counter()
+        cache = self.scraper.http_cache
+        cache_stats_before = cache.stats() if cache else None
+        extractor_stats_before = self.scraper.extractors.stats()
+        index = self.scraper.search_index.writer() if self.scraper.search_index else None
+        duplicates = NearDuplicateDetector() if dedup or prune_duplicates else None
+        politeness = self.scraper.get_politeness() if polite else None
+        to_visit = self.scraper._new_frontier(strategy, politeness)
+        crawled = set()
+        canonical_duplicates = 0
+        # Sitemap reading is blocking I/O; nothing else runs on the loop yet
+        await asyncio.get_running_loop().run_in_executor(
+            None, self.scraper._seed_frontier, to_visit, seed_url, max_pages, sitemaps, sitemap_only
+        )
+        robots_blocked = 0
+        # Workers wait on this while the frontier is empty but pages are
+        # still in flight and may yet discover new links.
+        frontier_changed = asyncio.Condition()
+        in_flight = 0
+
+        self._browser_lock = asyncio.Lock()
+        if httpx is not None:
+            self.http = AsyncHttpClient(
+                max_connections=self.concurrency * 2,
+                max_keepalive_connections=self.concurrency,
+                max_body_size=self.scraper.http.max_body_size,
+            )
+
+        print(f"Starting async crawl of {seed_url} (domain: {base_domain_root}, max_depth: {max_depth}, "
+              f"max_pages: {max_pages}, concurrency: {self.concurrency}, per_host: {self.per_host_concurrency})")
+
+        async def next_url():
+            nonlocal in_flight
+            async with frontier_changed:
+                while True:
+                    if len(visited) >= max_pages:
+                        return None
+                    if to_visit:
+                        current_url, depth = to_visit.pop()
+                        # Claim a page slot before fetching so max_pages is exact
+                        if current_url in visited or depth > max_depth or self.scraper.canonicalizer.key(current_url) in crawled:
+                            continue
+                        # Skip listing patterns that have only been yielding duplicates
+                        if prune_duplicates and not duplicates.should_expand(current_url):
+                            continue
+                        visited.add(current_url)
+                        in_flight += 1
+                        return current_url, depth
+                    if not in_flight:
+                        return None
+                    await frontier_changed.wait()
+
+        async def worker():
+            nonlocal in_flight, robots_blocked, canonical_duplicates
+            loop = asyncio.get_running_loop()
+            while True:
+                claimed = await next_url()
+                if claimed is None:
+                    return
+                current_url, depth = claimed
+
+                page_metrics = PageMetrics(current_url)
+                _current_page.set(page_metrics)
+                page_links = set()
+
+                # robots.txt is fetched once per host, off the event loop; if
+                # that fails, only this URL fails, not the whole crawl
+                try:
+                    allowed = not politeness or await loop.run_in_executor(None, politeness.allowed, current_url)
+                except Exception as e:
+                    print(f"Error crawling {current_url}: {str(e)}")
+                    page_metrics.error = error_class(e)
+                    metrics.record_page(page_metrics)
+                    async with frontier_changed:
+                        in_flight -= 1
+                        frontier_changed.notify_all()
+                    continue
+                if not allowed:
+                    print(f"Skipping (disallowed by robots.txt): {current_url}")
+                    async with frontier_changed:
+                        robots_blocked += 1
+                        visited.discard(current_url)
+                        in_flight -= 1
+                        frontier_changed.notify_all()
+                    continue
+                print(f"Crawling [{len(visited)}/{max_pages}]: {current_url}")
+
+                try:
+                    async with self._host_slots[urlparse(current_url).netloc]:
+                        if politeness:
+                            with self._timed('politeness_wait'):
+                                await asyncio.sleep(politeness.reserve(current_url))
+                        html, page, used_engine = await self.fetch_cached(current_url, engine)
+                    engine_counts[used_engine] += 1
+                    page_metrics.engine = used_engine
+
+                    page_data, page_links = self.scraper._process_page(html, current_url, base_domain_root, page)
+                    canonical_url = self.scraper._resolve_canonical(current_url, page, crawled)
+                    if canonical_url is None:
+                        print(f"Skipping duplicate of an already crawled canonical page: {current_url}")
+                        canonical_duplicates += 1
+                        page_data, page_links = None, set()
+                    elif page_data:
+                        page_data['url'] = canonical_url
+                    # Pruning learns from every page, even when duplicates are kept
+                    if page_data and duplicates:
+                        duplicate_of = duplicates.check(current_url, page_text(page_data['content']))
+                        if duplicate_of and dedup:
+                            print(f"Skipping near-duplicate of {duplicate_of}: {current_url}")
+                            page_data = None
+                    if page_data:
+                        pages_data.append(page_data)
+                        if index is not None:
+                            await self._on_extractor(self._index_page, index, page_data)
+                    all_links.update(page_links)
+                except Exception as e:
+                    print(f"Error crawling {current_url}: {str(e)}")
+                    page_metrics.error = error_class(e)
+                metrics.record_page(page_metrics)
+
+                async with frontier_changed:
+                    if depth < max_depth and not sitemap_only:
+                        for link_url in page_links:
+                            to_visit.add(link_url, depth + 1)
+                    in_flight -= 1
+                    frontier_changed.notify_all()
+
+        index_counts = None
+        try:
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        finally:
+            if index is not None:
+                index_counts = await self._on_extractor(self._close_index, index)
+            await self._close()
+
+        print(f"Crawl completed. Visited {len(visited)} pages, discovered {len(all_links)} unique links, extracted content from {len(pages_data)} pages.")
+        print(f"Pages per engine: {dict(engine_counts)}")
+
+        result = {
+            "seed_url": seed_url,
+            "total_links": len(all_links),
+            "links": sorted(list(all_links)),
+            "pages": pages_data,
+            "engines": dict(engine_counts),
+            "duplicates": duplicates.duplicates if dedup else 0,
+            "robots_blocked": robots_blocked,
+            "canonical_duplicates": canonical_duplicates,
+            "extractors": self.scraper.extractors.stats(since=extractor_stats_before)
+        }
+        if cache:
+            result["cache"] = {key: value - cache_stats_before[key] for key, value in cache.stats().items()}
+            print(f"HTTP cache: {result['cache']['hits']} hits, {result['cache']['misses']} misses")
+        if index_counts is not None:
+            result["search_index"] = index_counts
+            print(f"Search index: {index_counts}")
+        return result
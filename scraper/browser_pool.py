@@ -0,0 +1,271 @@
+import atexit
+import queue
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from playwright.sync_api import sync_playwright
+
+from .adaptive import EngineSelector
+from .http_cache import HttpCache
+from .http_client import HttpClient
+from .utils import WebScraper, BROWSER_USER_AGENT, BROWSER_VIEWPORT, BROWSER_HEADERS
+
+try:
+    import psutil
+except ImportError:  # Memory-based recycling is skipped without psutil
+    psutil = None
+
+
+class _BrowserWorker(threading.Thread):
+    """
+    Thread that owns one Playwright driver and Chromium browser.
+
+    The sync Playwright API may only be used from the thread that started it,
+    so every browser call for a lease is executed here.
+    """
+
+    def __init__(self, pool, index):
+        super().__init__(name=f'scraper-browser-{index}', daemon=True)
+        self.pool = pool
+        self.tasks = queue.Queue()
+        self.playwright = None
+        self.browser = None
+        # Playwright driver processes started for this worker's browser
+        self.driver_pids = set()
+        self.pages_served = 0
+
+    def run(self):
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                self._close_browser()
+                return
+            fn, future = task
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn())
+            except BaseException as e:
+                future.set_exception(e)
+
+    def call(self, fn, *args, **kwargs):
+        """Run fn on this worker's thread and return its result"""
+        future = Future()
+        self.tasks.put((lambda: fn(*args, **kwargs), future))
+        return future.result()
+
+    def stop(self):
+        self.tasks.put(None)
+
+    def open_scraper(self):
+        """Create a WebScraper bound to a fresh, isolated browser context"""
+        try:
+            context = self._new_context()
+        except Exception:
+            # The browser may have crashed since the last lease; relaunch once
+            self._close_browser()
+            context = self._new_context()
+        return WebScraper(browser=self.browser, context=context, render_policy=self.pool.render_policy,
+                          http_client=self.pool.http, http_cache=self.pool.http_cache,
+                          engine_selector=self.pool.engine_selector)
+
+    def close_scraper(self, scraper):
+        """Dispose of a leased context and recycle the browser if it is worn out"""
+        try:
+            scraper.context.close()
+        except Exception:
+            pass
+        self.pages_served += scraper.pages_fetched
+        reason = self.pool._recycle_reason(self)
+        if reason:
+            print(f"Recycling browser in {self.name} ({reason})")
+            self._close_browser()
+
+    def _new_context(self):
+        if self.browser is None:
+            # Playwright does not expose the browser's PID; the driver it
+            # starts is the new child of this process, and Chromium runs
+            # under the driver. Launches are serialized so that the diff
+            # only ever sees this worker's driver.
+            with self.pool._launch_lock:
+                before = _child_pids()
+                self.playwright = sync_playwright().start()
+                self.browser = self.playwright.chromium.launch(**self.pool.launch_options)
+                self.driver_pids = _child_pids() - before
+            self.pages_served = 0
+        context = self.browser.new_context(user_agent=BROWSER_USER_AGENT, viewport=BROWSER_VIEWPORT)
+        context.set_extra_http_headers(BROWSER_HEADERS)
+        return context
+
+    def _close_browser(self):
+        try:
+            if self.browser:
+                self.browser.close()
+        except Exception:
+            pass
+        try:
+            if self.playwright:
+                self.playwright.stop()
+        except Exception:
+            pass
+        self.browser = None
+        self.playwright = None
+        self.driver_pids = set()
+
+    def rss_mb(self):
+        """Memory used by this worker's browser processes; requires psutil"""
+        total = 0
+        for pid in self.driver_pids:
+            try:
+                processes = psutil.Process(pid).children(recursive=True)
+            except psutil.Error:
+                continue
+            for process in processes:
+                try:
+                    total += process.memory_info().rss
+                except psutil.Error:
+                    continue
+        return total / (1024 * 1024)
+
+
+def _child_pids():
+    if psutil is None:
+        return set()
+    return {child.pid for child in psutil.Process().children()}
+
+
+class _LeasedScraper:
+    """Forwards WebScraper method calls to the browser thread holding the lease"""
+
+    def __init__(self, worker, scraper):
+        self._worker = worker
+        self._scraper = scraper
+
+    def __getattr__(self, name):
+        attr = getattr(self._scraper, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            return self._worker.call(attr, *args, **kwargs)
+        return call
+
+
+class BrowserPool:
+    """
+    Process-wide pool of long-lived Chromium browsers.
+
+    Browsers are launched lazily on first lease and reused across requests;
+    each lease gets its own browser context so cookies and storage never leak
+    between requests.
+
+    Args:
+        size (int): Number of browsers, i.e. concurrent leases (default: 2)
+        max_pages_per_browser (int): Relaunch a browser after it has rendered
+            this many pages (default: 200)
+        max_rss_mb (int): Relaunch a browser when its own processes use
+            more than this much memory; requires psutil (default: None)
+        lease_timeout (float): Seconds to wait for a free browser (default: 60)
+        launch_options (dict): Passed to chromium.launch()
+        render_policy: 'fast', 'legacy' or a RenderPolicy for leased
+            scrapers (default: 'legacy')
+        http_options (dict): HttpClient options for the client shared by
+            all leases
+        http_cache_dir (str): Directory of an HttpCache shared by all
+            leases (default: None, no caching)
+    """
+
+    def __init__(self, size=2, max_pages_per_browser=200, max_rss_mb=None, lease_timeout=60, launch_options=None,
+                 render_policy=None, http_options=None, http_cache_dir=None):
+        self.size = max(1, size)
+        self.max_pages_per_browser = max_pages_per_browser
+        self.max_rss_mb = max_rss_mb
+        self.lease_timeout = lease_timeout
+        self.launch_options = launch_options or {'headless': True}
+        self.render_policy = render_policy
+        # Static fetches from every lease share one set of keep-alive pools
+        self.http = HttpClient(**(http_options or {}))
+        self.http_cache = HttpCache(http_cache_dir) if http_cache_dir else None
+        # Per-domain engine decisions outlive leases, so a domain is probed
+        # once per process rather than once per request
+        self.engine_selector = EngineSelector()
+        self._launch_lock = threading.Lock()
+        self._workers = []
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._workers:
+                return
+            for index in range(self.size):
+                worker = _BrowserWorker(self, index)
+                worker.start()
+                self._workers.append(worker)
+                self._idle.put(worker)
+
+    def shutdown(self):
+        with self._lock:
+            for worker in self._workers:
+                worker.stop()
+            for worker in self._workers:
+                worker.join(timeout=10)
+            self._workers = []
+            self._idle = queue.Queue()
+            self.http.close()
+
+    @contextmanager
+    def lease(self):
+        """
+        Lease a scraper backed by an isolated browser context.
+
+        Usage mirrors the standalone scraper:
+
+            with get_browser_pool().lease() as scraper:
+                data = scraper.scrape_url(url)
+        """
+        self.start()
+        try:
+            worker = self._idle.get(timeout=self.lease_timeout)
+        except queue.Empty:
+            raise Exception(f"No browser available after waiting {self.lease_timeout}s")
+
+        try:
+            scraper = worker.call(worker.open_scraper)
+            try:
+                yield _LeasedScraper(worker, scraper)
+            finally:
+                worker.call(worker.close_scraper, scraper)
+        finally:
+            self._idle.put(worker)
+
+    def _recycle_reason(self, worker):
+        if self.max_pages_per_browser and worker.pages_served >= self.max_pages_per_browser:
+            return f"{worker.pages_served} pages served"
+        if self.max_rss_mb and psutil:
+            rss_mb = worker.rss_mb()
+            if rss_mb > self.max_rss_mb:
+                return f"browser RSS {rss_mb:.0f} MB"
+        return None
+
+
+_pool = None
+_pool_options = {}
+_pool_lock = threading.Lock()
+
+
+def configure_browser_pool(**options):
+    """Set BrowserPool options; called from ScraperConfig.ready()"""
+    global _pool_options
+    _pool_options = options
+
+
+def get_browser_pool():
+    """Return the process-wide BrowserPool, creating it on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool(**_pool_options)
+            atexit.register(_pool.shutdown)
+        return _pool
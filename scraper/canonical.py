@@ -0,0 +1,207 @@
+import re
+import threading
+from functools import lru_cache
+from urllib.parse import unquote_plus, urljoin, urlparse, urlsplit
+
+try:
+    import tldextract
+except ImportError:  # Exact public-suffix handling needs tldextract (pip install tldextract)
+    tldextract = None
+
+DEFAULT_PORTS = {'http': '80', 'https': '443'}
+
+# Tracking and session parameters that never change what a page shows
+DROP_PARAMS = (
+    'utm_*', 'fbclid', 'gclid', 'dclid', 'msclkid', 'yclid', 'mc_cid', 'mc_eid', '_ga', '_hsenc', '_hsmi',
+    'ref_src', 'igshid', 'sessionid', 'session_id', 'sid', 'phpsessid', 'jsessionid', 'aspsessionid', 'cfid', 'cftoken',
+)
+
+# Multi-label public suffixes common enough to matter when tldextract is not
+# installed, including private ones such as blogspot.com: every blog hosted
+# there is a site of its own, as with tldextract's private domains
+MULTI_LABEL_SUFFIXES = frozenset({
+    'co.uk', 'org.uk', 'ac.uk', 'gov.uk', 'me.uk', 'ltd.uk', 'plc.uk', 'net.uk',
+    'com.au', 'net.au', 'org.au', 'edu.au', 'gov.au', 'co.nz', 'org.nz', 'net.nz',
+    'co.jp', 'ne.jp', 'or.jp', 'ac.jp', 'co.kr', 'or.kr', 'co.in', 'net.in', 'org.in', 'gov.in',
+    'com.br', 'net.br', 'org.br', 'com.cn', 'net.cn', 'org.cn', 'com.tw', 'com.hk', 'com.sg', 'com.my',
+    'com.pk', 'org.pk', 'net.pk', 'edu.pk', 'gov.pk', 'com.tr', 'com.mx', 'com.ar', 'co.za', 'co.il',
+    'github.io', 'gitlab.io', 'herokuapp.com', 'blogspot.com', 'netlify.app', 'vercel.app', 'pages.dev',
+})
+
+# Blog hosts that give every blog its own subdomain but are not on the public
+# suffix list; treated as suffixes with or without tldextract
+HOSTED_BLOG_SUFFIXES = frozenset({'wordpress.com', 'substack.com'})
+
+_SESSION_PATH_RE = re.compile(r';(?:jsessionid|phpsessid|sid)=[^/?#]*', re.IGNORECASE)
+_extract = tldextract.TLDExtract(suffix_list_urls=(), include_psl_private_domains=True) if tldextract is not None else None
+
+
+def registrable_domain(host):
+    """
+    The registrable domain of host (example.co.uk for blog.example.co.uk).
+
+    Uses the public suffix list, private domains included, through
+    tldextract when it is installed, otherwise a built-in list of common
+    multi-label suffixes; either way foo.wordpress.com and bar.wordpress.com
+    are different sites.
+    """
+    host = host.lower()
+    if host.count(':') == 1:
+        host = host.split(':')[0]
+    host = host.rstrip('.')
+    if not host or host.replace('.', '').isdigit() or ':' in host or host.startswith('['):
+        return host
+    labels = host.split('.')
+    if len(labels) > 2 and '.'.join(labels[-2:]) in HOSTED_BLOG_SUFFIXES:
+        return '.'.join(labels[-3:])
+    if _extract is not None:
+        parts = _extract(host)
+        return f'{parts.domain}.{parts.suffix}' if parts.domain and parts.suffix else host
+    if len(labels) > 2 and '.'.join(labels[-2:]) in MULTI_LABEL_SUFFIXES:
+        return '.'.join(labels[-3:])
+    return '.'.join(labels[-2:])
+
+
+def in_domain(url, domain):
+    """True if url's host is domain or one of its subdomains"""
+    host = urlparse(url).hostname or ''
+    return host == domain or host.endswith('.' + domain)
+
+
+class UrlCanonicalizer:
+    """
+    Canonical forms of URLs, so link variants of one page are fetched once.
+
+    canonicalize() returns the URL to fetch: lower-case scheme and host,
+    default ports, fragments, tracking/session parameters and session path
+    parameters removed, and the query sorted. key() folds what is only safe
+    to fold for deduplication (http vs https, www., trailing slashes), so
+    frontiers keyed by it queue the first variant seen and skip the rest.
+    Both are memoized in bounded LRUs.
+
+    Args:
+        drop_params (tuple): Query parameters removed; entries ending in '*'
+            are prefixes (default: DROP_PARAMS)
+        keep_blank_params (bool): Keep parameters with empty values (default: True)
+        sort_query (bool): Sort query parameters (default: True)
+        fold_scheme (bool): http and https are the same page (default: True)
+        fold_www (bool): www.host and host are the same page (default: True)
+        fold_trailing_slash (bool): /path/ and /path are the same page (default: True)
+        cache_size (int): URLs memoized per function (default: 100000)
+    """
+
+    def __init__(self, drop_params=DROP_PARAMS, keep_blank_params=True, sort_query=True, fold_scheme=True,
+                 fold_www=True, fold_trailing_slash=True, cache_size=100000):
+        self.drop_exact = frozenset(param.lower() for param in drop_params if not param.endswith('*'))
+        self.drop_prefixes = tuple(param[:-1].lower() for param in drop_params if param.endswith('*'))
+        self.keep_blank_params = keep_blank_params
+        self.sort_query = sort_query
+        self.fold_scheme = fold_scheme
+        self.fold_www = fold_www
+        self.fold_trailing_slash = fold_trailing_slash
+        self.canonicalize = lru_cache(maxsize=cache_size)(self._canonicalize)
+        self.key = lru_cache(maxsize=cache_size)(self._key)
+
+    def _dropped(self, param):
+        param = param.lower()
+        return param in self.drop_exact or param.startswith(self.drop_prefixes)
+
+    def _canonicalize(self, url):
+        # urlsplit keeps ;params in the path, where session ids are removed
+        parsed = urlsplit(url.strip())
+        scheme = parsed.scheme.lower()
+        if scheme not in DEFAULT_PORTS:
+            return parsed._replace(fragment='').geturl()
+
+        try:
+            port = parsed.port
+        except ValueError:
+            return parsed._replace(fragment='').geturl()
+        host = (parsed.hostname or '').rstrip('.')
+        if ':' in host:
+            host = f'[{host}]'
+        if port is not None and str(port) == DEFAULT_PORTS[scheme]:
+            port = None
+        netloc = host if port is None else f'{host}:{port}'
+        if parsed.username:
+            userinfo = parsed.username + (f':{parsed.password}' if parsed.password else '')
+            netloc = f'{userinfo}@{netloc}'
+
+        path = _SESSION_PATH_RE.sub('', parsed.path) or '/'
+        return parsed._replace(scheme=scheme, netloc=netloc, path=path, query=self._query(parsed.query), fragment='').geturl()
+
+    def _query(self, query):
+        """
+        query without dropped parameters, optionally sorted. Parameters are
+        kept exactly as written (encoding, valueless keys such as ?print),
+        since servers may treat ?next=/a and ?next=%2Fa differently.
+        """
+        params = []
+        for param in query.split('&'):
+            if not param:
+                continue
+            name, _, value = param.partition('=')
+            if self._dropped(unquote_plus(name)) or (not self.keep_blank_params and not value):
+                continue
+            params.append(param)
+        if self.sort_query:
+            params.sort(key=lambda param: param.partition('=')[::2])
+        return '&'.join(params)
+
+    def _key(self, url):
+        parsed = urlsplit(self.canonicalize(url))
+        if parsed.scheme not in DEFAULT_PORTS:
+            return parsed.geturl()
+        netloc = parsed.netloc
+        if self.fold_www and netloc.startswith('www.'):
+            netloc = netloc[4:]
+        path = parsed.path
+        if self.fold_trailing_slash and len(path) > 1:
+            path = path.rstrip('/') or '/'
+        scheme = 'https' if self.fold_scheme else parsed.scheme
+        return parsed._replace(scheme=scheme, netloc=netloc, path=path).geturl()
+
+    def same_page(self, url, other):
+        return self.key(url) == self.key(other)
+
+    def canonical_link(self, soup, url):
+        """
+        Canonicalized <link rel="canonical"> target of a parsed page, or None.
+
+        Targets outside url's registrable domain are ignored, since a page
+        cannot be deduplicated against a page the crawl will never fetch.
+        """
+        link = soup.find('link', rel='canonical', href=True)
+        if link is None:
+            return None
+        target = urljoin(url, link['href'].strip())
+        if urlparse(target).scheme not in DEFAULT_PORTS:
+            return None
+        if not in_domain(target, registrable_domain(urlparse(url).hostname or '')):
+            return None
+        return self.canonicalize(target)
+
+    def cache_info(self):
+        return {'canonicalize': self.canonicalize.cache_info()._asdict(), 'key': self.key.cache_info()._asdict()}
+
+
+_canonicalizer = None
+_canonicalizer_options = {}
+_canonicalizer_lock = threading.Lock()
+
+
+def configure_canonicalizer(**options):
+    """Set UrlCanonicalizer rules; called from ScraperConfig.ready()"""
+    global _canonicalizer, _canonicalizer_options
+    with _canonicalizer_lock:
+        _canonicalizer_options = options
+        _canonicalizer = None
+
+
+def get_canonicalizer():
+    """Return the process-wide UrlCanonicalizer, creating it on first use"""
+    global _canonicalizer
+    with _canonicalizer_lock:
+        if _canonicalizer is None:
+            _canonicalizer = UrlCanonicalizer(**_canonicalizer_options)
+        return _canonicalizer
@@ -0,0 +1,58 @@
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # zstd compression needs zstandard (pip install zstandard); zlib is used otherwise
+    zstandard = None
+
+# First byte of every stored payload, so data written with one codec can be
+# read after the default changes
+RAW = b'\x00'
+ZLIB = b'z'
+ZSTD = b's'
+
+CODECS = ('zstd', 'zlib', 'none')
+
+# Below this many bytes compression costs more than it saves
+MIN_COMPRESS_SIZE = 256
+
+
+def default_codec():
+    return 'zstd' if zstandard is not None else 'zlib'
+
+
+def compress(data, codec=None, level=None):
+    """
+    Compress bytes with a one-byte codec header.
+
+    Args:
+        data (bytes): Payload
+        codec (str): 'zstd', 'zlib' or 'none' (default: zstd when zstandard
+            is installed, zlib otherwise)
+        level (int): Compression level (default: 3 for zstd, 6 for zlib)
+    """
+    codec = codec or default_codec()
+    if codec == 'none' or len(data) < MIN_COMPRESS_SIZE:
+        return RAW + data
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ImportError('zstd compression requires zstandard: pip install zstandard')
+        return ZSTD + zstandard.ZstdCompressor(level=3 if level is None else level).compress(data)
+    if codec == 'zlib':
+        return ZLIB + zlib.compress(data, 6 if level is None else level)
+    raise ValueError(f"Unknown codec '{codec}', expected one of {', '.join(CODECS)}")
+
+
+def decompress(data):
+    """Bytes stored by compress(), whichever codec wrote them"""
+    data = bytes(data)
+    header, payload = data[:1], data[1:]
+    if header == RAW:
+        return payload
+    if header == ZLIB:
+        return zlib.decompress(payload)
+    if header == ZSTD:
+        if zstandard is None:
+            raise ImportError('Reading zstd-compressed data requires zstandard: pip install zstandard')
+        return zstandard.ZstdDecompressor().decompress(payload)
+    raise ValueError(f'Unknown compression header {header!r}')
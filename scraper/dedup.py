@@ -0,0 +1,127 @@
+import hashlib
+import re
+from collections import defaultdict
+from urllib.parse import urlparse, parse_qsl
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+DIGITS_RE = re.compile(r'\d+')
+
+FINGERPRINT_BITS = 64
+
+
+def page_text(content_blocks):
+    """Plain text of a page's content blocks"""
+    return ' '.join(block.text for block in content_blocks if block.text)
+
+
+def simhash(text, shingle_size=3):
+    """
+    64-bit SimHash of the word shingles in text, or None if text has fewer
+    than shingle_size words: such pages (e.g. image-only posts) would all
+    share one fingerprint
+    """
+    words = WORD_RE.findall(text.lower())
+    if len(words) < shingle_size:
+        return None
+    shingles = [' '.join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+
+    weights = [0] * FINGERPRINT_BITS
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(FINGERPRINT_BITS):
+            if value >> bit & 1:
+                weights[bit] += 1
+            else:
+                weights[bit] -= 1
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def url_pattern(url):
+    """Coarse URL template, e.g. /tag/python/page/3?utm_source=x -> /tag/*/page/{n}?utm_source"""
+    parsed = urlparse(url)
+    segments = [segment for segment in parsed.path.split('/') if segment]
+    template = []
+    for index, segment in enumerate(segments):
+        if DIGITS_RE.fullmatch(segment):
+            template.append('{n}')
+        elif index == 0:
+            # The first segment usually names the listing type (tag, category, page...)
+            template.append(segment.lower())
+        else:
+            template.append('*')
+    query_keys = sorted({key for key, _ in parse_qsl(parsed.query, keep_blank_values=True)})
+    return '/' + '/'.join(template) + ('?' + '&'.join(query_keys) if query_keys else '')
+
+
+class NearDuplicateDetector:
+    """
+    Detect pages whose extracted text nearly matches an earlier page.
+
+    Fingerprints are 64-bit SimHashes; two pages are near-duplicates when
+    their fingerprints differ in at most max_distance bits. The LSH index
+    splits each fingerprint into max_distance + 1 bands, so any match must
+    share at least one band exactly and only those candidates are compared.
+
+    Args:
+        max_distance (int): Hamming distance treated as duplicate (default: 3)
+        prune_ratio (float): Share of duplicates after which a URL pattern
+            stops being expanded (default: 0.8)
+        prune_min_pages (int): Pages of a pattern seen before pruning can
+            kick in (default: 5)
+    """
+
+    def __init__(self, max_distance=3, prune_ratio=0.8, prune_min_pages=5):
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self.band_bits = FINGERPRINT_BITS // self.bands
+        self.prune_ratio = prune_ratio
+        self.prune_min_pages = prune_min_pages
+        self._index = [defaultdict(list) for _ in range(self.bands)]
+        self._pattern_pages = defaultdict(int)
+        self._pattern_duplicates = defaultdict(int)
+        self.duplicates = 0
+
+    def _band_keys(self, fingerprint):
+        mask = (1 << self.band_bits) - 1
+        return [(fingerprint >> (band * self.band_bits)) & mask for band in range(self.bands)]
+
+    def check(self, url, text, fingerprint=None):
+        """
+        Return the URL this page duplicates, or None after indexing it as new.
+
+        fingerprint, if given, is simhash(text) computed elsewhere (e.g. in
+        an extraction worker process) and text is not hashed again. Pages
+        too short to fingerprint return None and are not indexed or counted
+        towards pruning.
+        """
+        if fingerprint is None:
+            fingerprint = simhash(text or '')
+            if fingerprint is None:
+                return None
+        keys = self._band_keys(fingerprint)
+        pattern = url_pattern(url)
+        self._pattern_pages[pattern] += 1
+
+        for band, key in enumerate(keys):
+            for other_fingerprint, other_url in self._index[band].get(key, ()):
+                if bin(fingerprint ^ other_fingerprint).count('1') <= self.max_distance:
+                    self.duplicates += 1
+                    self._pattern_duplicates[pattern] += 1
+                    return other_url
+
+        for band, key in enumerate(keys):
+            self._index[band][key].append((fingerprint, url))
+        return None
+
+    def should_expand(self, url):
+        """False once url's pattern has mostly produced duplicates"""
+        pattern = url_pattern(url)
+        pages = self._pattern_pages.get(pattern, 0)
+        if pages < self.prune_min_pages:
+            return True
+        return self._pattern_duplicates.get(pattern, 0) / pages < self.prune_ratio
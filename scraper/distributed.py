@@ -0,0 +1,529 @@
+import json
+import sqlite3
+from abc import ABC, abstractmethod
+import time
+import zlib
+from collections import Counter
+from urllib.parse import urlparse
+
+try:
+    import redis
+except ImportError:  # The Redis frontier backend needs redis-py (pip install redis)
+    redis = None
+
+from .dedup import NearDuplicateDetector, page_text
+from .extraction import json_default, load_page
+
+# URLs are hashed by host into this many shards; a worker started with
+# --shard I --shards N owns every shard s with s % N == I, so any N up to
+# VIRTUAL_SHARDS splits a crawl without rehashing what is already queued.
+VIRTUAL_SHARDS = 64
+
+QUEUED = 'queued'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+
+def host_shard(url):
+    """Virtual shard of url's host; every URL of a host lands on the same worker"""
+    return zlib.crc32(urlparse(url).netloc.lower().encode('utf-8')) % VIRTUAL_SHARDS
+
+
+def owned_shards(shard, shards):
+    """Virtual shards handled by worker number shard out of shards"""
+    if not 1 <= shards <= VIRTUAL_SHARDS or not 0 <= shard < shards:
+        raise ValueError(f"Invalid shard {shard}/{shards}, expected 0 <= shard < shards <= {VIRTUAL_SHARDS}")
+    return [s for s in range(VIRTUAL_SHARDS) if s % shards == shard]
+
+
+class FrontierBackend(ABC):
+    """
+    Persistent frontier, visited set and results shared by crawl workers.
+
+    URLs move from queued to leased (claimed by a worker until lease_until)
+    to done or failed. A lease that expires, e.g. because its worker was
+    killed, is handed out again, which is what lets a crawl resume.
+    """
+
+    @abstractmethod
+    def create_crawl(self, crawl_id, seed_url, max_depth, max_pages):
+        """Register a crawl and queue its seed; returns the stored settings if it already exists"""
+
+    @abstractmethod
+    def get_crawl(self, crawl_id):
+        """Dict with seed_url, max_depth and max_pages, or None"""
+
+    @abstractmethod
+    def claim(self, crawl_id, shards, limit, lease_seconds):
+        """Lease up to limit (url, depth) pairs from the given shards"""
+
+    @abstractmethod
+    def complete(self, crawl_id, url, links=(), page_data=None, error=None):
+        """Finish a leased url, queue the (url, depth) links it found and store its page"""
+
+    @abstractmethod
+    def is_finished(self, crawl_id):
+        """True once nothing is queued (within the page budget) or leased"""
+
+    @abstractmethod
+    def stats(self, crawl_id):
+        """URL counts per state"""
+
+    @abstractmethod
+    def iter_pages(self, crawl_id):
+        """Yield the stored page dicts of a crawl"""
+
+    def close(self):
+        pass
+
+
+class SqliteFrontierBackend(FrontierBackend):
+    """
+    Frontier in a SQLite database, for worker processes sharing one disk.
+
+    Claims run in BEGIN IMMEDIATE transactions so concurrent workers never
+    lease the same URL. SQLite locking is unreliable on network filesystems;
+    use the Redis backend to spread a crawl over several machines.
+
+    Args:
+        path (str): Database file, created if missing
+        timeout (float): Seconds to wait for another worker's lock (default: 30)
+    """
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS crawls (
+            crawl_id TEXT PRIMARY KEY,
+            seed_url TEXT NOT NULL,
+            max_depth INTEGER NOT NULL,
+            max_pages INTEGER NOT NULL,
+            claimed INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS urls (
+            crawl_id TEXT NOT NULL,
+            url TEXT NOT NULL,
+            depth INTEGER NOT NULL,
+            shard INTEGER NOT NULL,
+            state TEXT NOT NULL DEFAULT 'queued',
+            lease_until REAL,
+            error TEXT,
+            PRIMARY KEY (crawl_id, url)
+        );
+        CREATE INDEX IF NOT EXISTS urls_claim ON urls (crawl_id, state, shard, depth);
+        CREATE TABLE IF NOT EXISTS pages (
+            crawl_id TEXT NOT NULL,
+            url TEXT NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (crawl_id, url)
+        );
+    '''
+
+    def __init__(self, path, timeout=30):
+        self.path = path
+        # Autocommit mode; transactions are opened explicitly below
+        self._db = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(self.SCHEMA)
+
+    def _write(self, fn, *args):
+        """Run fn(*args) in a write transaction"""
+        self._db.execute('BEGIN IMMEDIATE')
+        try:
+            result = fn(*args)
+        except BaseException:
+            self._db.execute('ROLLBACK')
+            raise
+        self._db.execute('COMMIT')
+        return result
+
+    def create_crawl(self, crawl_id, seed_url, max_depth, max_pages):
+        def create():
+            inserted = self._db.execute(
+                'INSERT OR IGNORE INTO crawls (crawl_id, seed_url, max_depth, max_pages, created_at) VALUES (?, ?, ?, ?, ?)',
+                (crawl_id, seed_url, max_depth, max_pages, time.time())
+            ).rowcount
+            if inserted:
+                self._add_links(crawl_id, [(seed_url, 0)])
+
+        self._write(create)
+        return self.get_crawl(crawl_id)
+
+    def get_crawl(self, crawl_id):
+        row = self._db.execute(
+            'SELECT seed_url, max_depth, max_pages FROM crawls WHERE crawl_id = ?', (crawl_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'seed_url': row[0], 'max_depth': row[1], 'max_pages': row[2]}
+
+    def _add_links(self, crawl_id, links):
+        self._db.executemany(
+            'INSERT OR IGNORE INTO urls (crawl_id, url, depth, shard) VALUES (?, ?, ?, ?)',
+            ((crawl_id, url, depth, host_shard(url)) for url, depth in links)
+        )
+
+    def claim(self, crawl_id, shards, limit, lease_seconds):
+        def claim():
+            now = time.time()
+            in_shards = ','.join('?' * len(shards))
+            # Expired leases first: those pages were already counted against max_pages
+            rows = self._db.execute(
+                f'SELECT url, depth FROM urls WHERE crawl_id = ? AND state = ? AND lease_until < ? '
+                f'AND shard IN ({in_shards}) LIMIT ?',
+                (crawl_id, LEASED, now, *shards, limit)
+            ).fetchall()
+            claimed, max_pages = self._db.execute(
+                'SELECT claimed, max_pages FROM crawls WHERE crawl_id = ?', (crawl_id,)
+            ).fetchone()
+            budget = min(limit - len(rows), max_pages - claimed)
+            if budget > 0:
+                fresh = self._db.execute(
+                    f'SELECT url, depth FROM urls WHERE crawl_id = ? AND state = ? AND shard IN ({in_shards}) '
+                    f'ORDER BY depth LIMIT ?',
+                    (crawl_id, QUEUED, *shards, budget)
+                ).fetchall()
+                self._db.execute('UPDATE crawls SET claimed = claimed + ? WHERE crawl_id = ?', (len(fresh), crawl_id))
+                rows.extend(fresh)
+            self._db.executemany(
+                'UPDATE urls SET state = ?, lease_until = ? WHERE crawl_id = ? AND url = ?',
+                ((LEASED, now + lease_seconds, crawl_id, url) for url, _ in rows)
+            )
+            return rows
+
+        return self._write(claim)
+
+    def complete(self, crawl_id, url, links=(), page_data=None, error=None):
+        def complete():
+            self._add_links(crawl_id, links)
+            self._db.execute(
+                'UPDATE urls SET state = ?, lease_until = NULL, error = ? WHERE crawl_id = ? AND url = ?',
+                (FAILED if error else DONE, error, crawl_id, url)
+            )
+            if page_data:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO pages (crawl_id, url, data) VALUES (?, ?, ?)',
+                    (crawl_id, url, json.dumps(page_data, ensure_ascii=False, default=json_default))
+                )
+
+        self._write(complete)
+
+    def is_finished(self, crawl_id):
+        if self._db.execute(
+            'SELECT 1 FROM urls WHERE crawl_id = ? AND state = ? LIMIT 1', (crawl_id, LEASED)
+        ).fetchone():
+            return False
+        claimed, max_pages = self._db.execute(
+            'SELECT claimed, max_pages FROM crawls WHERE crawl_id = ?', (crawl_id,)
+        ).fetchone()
+        if claimed >= max_pages:
+            return True
+        return not self._db.execute(
+            'SELECT 1 FROM urls WHERE crawl_id = ? AND state = ? LIMIT 1', (crawl_id, QUEUED)
+        ).fetchone()
+
+    def stats(self, crawl_id):
+        counts = dict.fromkeys((QUEUED, LEASED, DONE, FAILED), 0)
+        counts.update(self._db.execute(
+            'SELECT state, COUNT(*) FROM urls WHERE crawl_id = ? GROUP BY state', (crawl_id,)
+        ).fetchall())
+        return counts
+
+    def iter_pages(self, crawl_id):
+        for (data,) in self._db.execute('SELECT data FROM pages WHERE crawl_id = ? ORDER BY rowid', (crawl_id,)):
+            yield load_page(json.loads(data))
+
+    def close(self):
+        self._db.close()
+
+
+class RedisFrontierBackend(FrontierBackend):
+    """
+    Frontier in Redis (or a Redis-compatible server), for workers on several machines.
+
+    Each virtual shard is a FIFO list, so a shard is only ever read by the
+    worker that owns it; the visited set is a Redis set and SADD decides
+    which worker gets to queue a newly discovered URL.
+
+    Args:
+        url (str): Redis URL, e.g. redis://localhost:6379/0
+        prefix (str): Key prefix (default: 'scraper:crawl:')
+    """
+
+    # Reclaims expired leases, pops queued URLs within the page budget and
+    # writes their leases in one script, which Redis runs atomically, so a
+    # worker dying mid-claim can neither lose URLs nor leak budget.
+    # KEYS: meta, leased, then one queue per shard in ARGV[4:]
+    # ARGV: now, lease_until, limit, shards...
+    CLAIM_SCRIPT = """
+        local now = tonumber(ARGV[1])
+        local lease_until = tonumber(ARGV[2])
+        local limit = tonumber(ARGV[3])
+        local owned = {}
+        for i = 4, #ARGV do
+            owned[tonumber(ARGV[i])] = true
+        end
+
+        local rows = {}
+        -- Expired leases first: those pages were already counted against max_pages
+        local leased = redis.call('HGETALL', KEYS[2])
+        for i = 1, #leased, 2 do
+            if #rows >= limit then
+                break
+            end
+            local lease = cjson.decode(leased[i + 1])
+            if owned[lease.shard] and lease.lease_until < now then
+                rows[#rows + 1] = {leased[i], lease.depth, lease.shard}
+            end
+        end
+
+        local budget = tonumber(redis.call('HGET', KEYS[1], 'max_pages')) - tonumber(redis.call('HGET', KEYS[1], 'claimed'))
+        local fresh = 0
+        for k = 3, #KEYS do
+            while #rows < limit and fresh < budget do
+                local item = redis.call('LPOP', KEYS[k])
+                if not item then
+                    break
+                end
+                local entry = cjson.decode(item)
+                rows[#rows + 1] = {entry[1], entry[2], tonumber(ARGV[k + 1])}
+                fresh = fresh + 1
+            end
+        end
+        if fresh > 0 then
+            redis.call('HINCRBY', KEYS[1], 'claimed', fresh)
+        end
+
+        local result = {}
+        for _, row in ipairs(rows) do
+            redis.call('HSET', KEYS[2], row[1], cjson.encode({depth = row[2], shard = row[3], lease_until = lease_until}))
+            result[#result + 1] = row[1]
+            result[#result + 1] = row[2]
+        end
+        return result
+    """
+
+    # Queues newly discovered links and, when url is given, stores the page,
+    # counts it and releases its lease, all in one atomic step: a worker
+    # dying before it runs leaves the lease to expire and the page to be
+    # crawled again, and one dying after it has lost nothing.
+    # KEYS: seen, leased, meta, pages, errors, then one queue per link
+    # ARGV: url ('' when only adding links), meta counter, page JSON (or ''),
+    # error (or ''), then link URL and queue entry pairs
+    COMPLETE_SCRIPT = """
+        for i = 1, (#ARGV - 4) / 2 do
+            if redis.call('SADD', KEYS[1], ARGV[3 + 2 * i]) == 1 then
+                redis.call('RPUSH', KEYS[5 + i], ARGV[4 + 2 * i])
+            end
+        end
+
+        local url = ARGV[1]
+        if url ~= '' then
+            if ARGV[3] ~= '' then
+                redis.call('HSET', KEYS[4], url, ARGV[3])
+            end
+            if ARGV[4] ~= '' then
+                redis.call('HSET', KEYS[5], url, ARGV[4])
+            end
+            redis.call('HINCRBY', KEYS[3], ARGV[2], 1)
+            redis.call('HDEL', KEYS[2], url)
+        end
+    """
+
+    def __init__(self, url, prefix='scraper:crawl:'):
+        if redis is None:
+            raise ImportError('The Redis frontier backend requires redis-py: pip install redis')
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        self._claim_script = self._redis.register_script(self.CLAIM_SCRIPT)
+        self._complete_script = self._redis.register_script(self.COMPLETE_SCRIPT)
+
+    def _key(self, crawl_id, name):
+        return f'{self.prefix}{crawl_id}:{name}'
+
+    def create_crawl(self, crawl_id, seed_url, max_depth, max_pages):
+        meta = self._key(crawl_id, 'meta')
+        if self._redis.hsetnx(meta, 'seed_url', seed_url):
+            self._redis.hset(meta, mapping={'max_depth': max_depth, 'max_pages': max_pages, 'claimed': 0})
+            self._complete(crawl_id, [(seed_url, 0)])
+        return self.get_crawl(crawl_id)
+
+    def get_crawl(self, crawl_id):
+        meta = self._redis.hgetall(self._key(crawl_id, 'meta'))
+        if not meta:
+            return None
+        return {'seed_url': meta['seed_url'], 'max_depth': int(meta['max_depth']), 'max_pages': int(meta['max_pages'])}
+
+    def _complete(self, crawl_id, links, url='', page_data=None, error=None):
+        keys = [self._key(crawl_id, name) for name in ('seen', 'leased', 'meta', 'pages', 'errors')]
+        args = [
+            url,
+            FAILED if error else DONE,
+            json.dumps(page_data, ensure_ascii=False, default=json_default) if page_data else '',
+            error or '',
+        ]
+        for link_url, depth in links:
+            keys.append(self._key(crawl_id, f'queue:{host_shard(link_url)}'))
+            args.extend((link_url, json.dumps([link_url, depth])))
+        self._complete_script(keys=keys, args=args)
+
+    def claim(self, crawl_id, shards, limit, lease_seconds):
+        now = time.time()
+        queues = [self._key(crawl_id, f'queue:{shard}') for shard in shards]
+        result = self._claim_script(
+            keys=[self._key(crawl_id, 'meta'), self._key(crawl_id, 'leased'), *queues],
+            args=[repr(now), repr(now + lease_seconds), limit, *shards],
+        )
+        return [(result[i], int(result[i + 1])) for i in range(0, len(result), 2)]
+
+    def complete(self, crawl_id, url, links=(), page_data=None, error=None):
+        self._complete(crawl_id, links, url, page_data, error)
+
+    def _queued(self, crawl_id):
+        pipe = self._redis.pipeline()
+        for shard in range(VIRTUAL_SHARDS):
+            pipe.llen(self._key(crawl_id, f'queue:{shard}'))
+        return sum(pipe.execute())
+
+    def is_finished(self, crawl_id):
+        if self._redis.hlen(self._key(crawl_id, 'leased')):
+            return False
+        meta = self._redis.hgetall(self._key(crawl_id, 'meta'))
+        return int(meta['claimed']) >= int(meta['max_pages']) or not self._queued(crawl_id)
+
+    def stats(self, crawl_id):
+        meta = self._redis.hgetall(self._key(crawl_id, 'meta'))
+        return {
+            QUEUED: self._queued(crawl_id),
+            LEASED: self._redis.hlen(self._key(crawl_id, 'leased')),
+            DONE: int(meta.get(DONE, 0)),
+            FAILED: int(meta.get(FAILED, 0)),
+        }
+
+    def iter_pages(self, crawl_id):
+        for _, data in self._redis.hscan_iter(self._key(crawl_id, 'pages')):
+            yield load_page(json.loads(data))
+
+    def close(self):
+        self._redis.close()
+
+
+def _sqlite_backend(location):
+    # sqlite:///relative.db or sqlite:////absolute/path.db, as in SQLAlchemy
+    return SqliteFrontierBackend(urlparse(location).path[1:] or 'crawl_frontier.sqlite3')
+
+
+BACKENDS = {
+    'sqlite': _sqlite_backend,
+    'redis': RedisFrontierBackend,
+    'rediss': RedisFrontierBackend,
+}
+
+
+def open_backend(location):
+    """Open a frontier backend from a URL: sqlite:///path/to/db or redis://host:port/db"""
+    scheme = urlparse(location).scheme
+    try:
+        backend_class = BACKENDS[scheme]
+    except KeyError:
+        raise ValueError(f"Unknown frontier backend '{location}', expected one of {', '.join(BACKENDS)} URLs")
+    return backend_class(location)
+
+
+class DistributedCrawler:
+    """
+    One worker of a crawl shared through a FrontierBackend.
+
+    The worker leases batches of URLs from the shards it owns, crawls them
+    with the WebScraper and reports each page back together with the links
+    it found, in one backend call, so a crash never loses discovered links.
+    Because every URL of a host hashes to the same shard, per-host politeness
+    stays within a single worker.
+
+    Near-duplicate detection is per worker: pages duplicating a page seen by
+    another worker are kept.
+
+    Args:
+        scraper (WebScraper): Fetches and extracts pages
+        backend (FrontierBackend): Shared frontier
+        crawl_id (str): Crawl to work on; must have been created
+        shard (int): This worker's number (default: 0)
+        shards (int): Number of workers splitting the crawl (default: 1)
+        batch_size (int): URLs leased per claim (default: 10)
+        lease_seconds (float): Time after which URLs of a silent worker are
+            handed out again (default: 600)
+    """
+
+    def __init__(self, scraper, backend, crawl_id, shard=0, shards=1, batch_size=10, lease_seconds=600):
+        self.scraper = scraper
+        self.backend = backend
+        self.crawl_id = crawl_id
+        self.shards = owned_shards(shard, shards)
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+
+    def run(self, engine='adaptive', dedup=True, poll_interval=2, idle_timeout=None, polite=True):
+        """
+        Crawl until the whole crawl is finished (or idle_timeout seconds pass
+        without any work for this worker). With polite, robots.txt and the
+        per-host rate limits of the scraper's PolitenessScheduler are obeyed;
+        host sharding means no other worker fetches from the same hosts.
+
+        Returns:
+            dict: pages crawled and extracted, errors, duplicates and engines
+                for this worker
+        """
+        crawl = self.backend.get_crawl(self.crawl_id)
+        if crawl is None:
+            raise ValueError(f"Unknown crawl '{self.crawl_id}'")
+        base_domain_root = self.scraper._get_base_domain_root(crawl['seed_url'])
+        max_depth = crawl['max_depth']
+        duplicates = NearDuplicateDetector() if dedup else None
+        politeness = self.scraper.get_politeness() if polite else None
+        summary = {'pages': 0, 'extracted': 0, 'errors': 0, 'duplicates': 0, 'robots_blocked': 0, 'engines': Counter()}
+        idle_since = None
+
+        while True:
+            batch = self.backend.claim(self.crawl_id, self.shards, self.batch_size, self.lease_seconds)
+            if not batch:
+                # Other workers may still discover URLs in our shards
+                if self.backend.is_finished(self.crawl_id):
+                    break
+                idle_since = idle_since or time.time()
+                if idle_timeout is not None and time.time() - idle_since > idle_timeout:
+                    break
+                time.sleep(poll_interval)
+                continue
+            idle_since = None
+
+            for url, depth in batch:
+                if politeness and not politeness.allowed(url):
+                    print(f"Skipping (disallowed by robots.txt): {url}")
+                    summary['robots_blocked'] += 1
+                    self.backend.complete(self.crawl_id, url, error='Disallowed by robots.txt')
+                    continue
+                print(f"Crawling [{self.crawl_id} depth {depth}]: {url}")
+                summary['pages'] += 1
+                try:
+                    if politeness:
+                        politeness.wait(url)
+                    html, content_data, used_engine = self.scraper.fetch_cached(url, engine)
+                    summary['engines'][used_engine] += 1
+                    page_data, page_links = self.scraper._process_page(html, url, base_domain_root, content_data)
+                    if page_data and duplicates:
+                        duplicate_of = duplicates.check(url, page_text(page_data['content']))
+                        if duplicate_of:
+                            print(f"Skipping near-duplicate of {duplicate_of}: {url}")
+                            summary['duplicates'] += 1
+                            page_data = None
+                    links = [(link, depth + 1) for link in page_links] if depth < max_depth else []
+                    self.backend.complete(self.crawl_id, url, links, page_data)
+                    summary['extracted'] += 1 if page_data else 0
+                except Exception as e:
+                    print(f"Error crawling {url}: {str(e)}")
+                    summary['errors'] += 1
+                    self.backend.complete(self.crawl_id, url, error=str(e))
+
+        summary['engines'] = dict(summary['engines'])
+        return summary
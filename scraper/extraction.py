@@ -0,0 +1,174 @@
+import itertools
+import re
+from collections.abc import Mapping
+from html import unescape
+
+from bs4.element import NavigableString, Tag
+from bs4.formatter import HTMLFormatter
+
+EMAIL_RE = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', re.IGNORECASE)
+EMAIL_HIGHLIGHT = r'<span class="email-highlight">\g<0></span>'
+
+ALLOWED_TAGS = frozenset({'a', 'img', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'strong', 'em', 'u', 'code', 'ul', 'ol', 'li', 'blockquote'})
+ALLOWED_ATTRS = {
+    'a': ('href',),
+    'img': ('src', 'alt'),
+}
+BLOCK_TAGS = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'img', 'ul', 'ol', 'blockquote']
+TAG_RE = re.compile(r'<[^>]+>')
+
+_FORMATTER = HTMLFormatter.REGISTRY['minimal']
+
+
+def _open_tag(tag):
+    allowed = ALLOWED_ATTRS.get(tag.name, ())
+    attrs = []
+    # BeautifulSoup's formatter emits attributes sorted by name
+    for key, val in sorted(tag.attrs.items()):
+        if key not in allowed:
+            continue
+        if isinstance(val, (list, tuple)):
+            val = ' '.join(val)
+        attrs.append(f'{key}={_FORMATTER.quoted_attribute_value(_FORMATTER.attribute_value(str(val)))}')
+    attribute_string = ' ' + ' '.join(attrs) if attrs else ''
+    void_slash = (_FORMATTER.void_element_close_prefix or '') if tag.is_empty_element else ''
+    return f'<{tag.name}{attribute_string}{void_slash}>'
+
+
+def sanitize_html(element):
+    """
+    Serialize element keeping only whitelisted tags and attributes.
+
+    Walks the existing tree once instead of serializing the element and
+    re-parsing it; disallowed tags are dropped but their contents kept.
+    """
+    parts = []
+    open_tags = []
+    for node in itertools.chain([element], element.descendants):
+        # Close every tag the walk has left since the previous node
+        while open_tags and node.parent is not open_tags[-1]:
+            closed = open_tags.pop()
+            if closed.name in ALLOWED_TAGS:
+                parts.append(f'</{closed.name}>')
+
+        if isinstance(node, Tag):
+            if node.name in ALLOWED_TAGS:
+                parts.append(_open_tag(node))
+            if not node.is_empty_element:
+                open_tags.append(node)
+        elif isinstance(node, NavigableString):
+            parts.append(node.output_ready(_FORMATTER))
+
+    while open_tags:
+        closed = open_tags.pop()
+        if closed.name in ALLOWED_TAGS:
+            parts.append(f'</{closed.name}>')
+    return ''.join(parts)
+
+
+class ContentBlock(Mapping):
+    """
+    One extracted content block.
+
+    Carries the sanitized HTML together with the plain text, word count and
+    email addresses, all computed once at extraction time so exports and
+    views never reparse the HTML. Slots keep a block to a fixed handful of
+    references instead of a per-block dict.
+
+    Blocks are also read-only mappings (block['html'], block.get('src'),
+    'level' in block) with the keys of the dicts they replace, so templates
+    and older callers keep working. to_dict() / from_dict() convert to and
+    from plain dicts for JSON storage.
+    """
+
+    __slots__ = ('type', 'html', 'text', 'word_count', 'emails', 'level', 'src', 'alt')
+
+    def __init__(self, type, html, text='', emails=(), level=None, src=None, alt=None):
+        self.type = type
+        self.html = html
+        self.text = text
+        self.word_count = len(text.split())
+        self.emails = tuple(emails)
+        self.level = level
+        self.src = src
+        self.alt = alt
+
+    def _keys(self):
+        if self.type == 'heading':
+            return ('type', 'level', 'html', 'text', 'word_count', 'emails')
+        if self.type == 'image':
+            return ('type', 'html', 'src', 'alt', 'text', 'word_count', 'emails')
+        return ('type', 'html', 'text', 'word_count', 'emails')
+
+    def __getitem__(self, key):
+        if key not in self._keys():
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self._keys())
+
+    def __len__(self):
+        return len(self._keys())
+
+    def __repr__(self):
+        return f'ContentBlock({self.to_dict()!r})'
+
+    def to_dict(self):
+        block = {key: getattr(self, key) for key in self._keys()}
+        block['emails'] = list(self.emails)
+        return block
+
+    @classmethod
+    def from_dict(cls, block):
+        """Block from a to_dict() result, or from an older dict without text"""
+        if isinstance(block, cls):
+            return block
+        html = block.get('html', '')
+        text = block['text'] if 'text' in block else ' '.join(unescape(TAG_RE.sub(' ', html)).split())
+        emails = block['emails'] if 'emails' in block else EMAIL_RE.findall(text)
+        return cls(block['type'], html, text, emails, block.get('level'), block.get('src'), block.get('alt'))
+
+
+def blocks_from_dicts(blocks):
+    """ContentBlocks from stored (JSON) block dicts"""
+    return [ContentBlock.from_dict(block) for block in blocks]
+
+
+def json_default(obj):
+    """json.dump() default= hook that stores ContentBlocks as dicts"""
+    if isinstance(obj, ContentBlock):
+        return obj.to_dict()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def load_page(page):
+    """Turn the content of a page dict loaded from JSON back into ContentBlocks"""
+    if page and page.get('content'):
+        page['content'] = blocks_from_dicts(page['content'])
+    return page
+
+
+def _text_block(block_type, element, level=None):
+    text = ' '.join(element.get_text(' ').split())
+    return ContentBlock(block_type, EMAIL_RE.sub(EMAIL_HIGHLIGHT, sanitize_html(element)), text, EMAIL_RE.findall(text), level)
+
+
+def extract_content_blocks(main_content):
+    """Extract structured content blocks from a parsed content element"""
+    content_blocks = []
+
+    for element in main_content.find_all(BLOCK_TAGS):
+        if element.name.startswith('h'):
+            content_blocks.append(_text_block('heading', element, int(element.name[1])))
+        elif element.name == 'p':
+            if element.get_text().strip():
+                content_blocks.append(_text_block('paragraph', element))
+        elif element.name == 'img':
+            src = element.get('src')
+            if src:
+                content_blocks.append(ContentBlock('image', sanitize_html(element), src=src, alt=element.get('alt', '')))
+        else:
+            content_blocks.append(_text_block('block', element))
+
+    return content_blocks
@@ -0,0 +1,266 @@
+import threading
+from collections import Counter, OrderedDict
+from urllib.parse import urlparse
+
+import soupsieve
+
+# Main content containers for sites without an extractor of their own, tried in order
+CONTENT_SELECTORS = [
+    'article', 'main',
+    'div[id="mw-content-text"]',  # Wikipedia
+    'div[data-testid="post-content"]', 'div[data-testid="story-content"]',  # Medium
+    'div[class*="post-content"]', 'div[class*="story-content"]',
+    'section[data-testid="post-content"]',  # Medium alternative
+    'div.entry-content', 'div.post-content', 'div.content',  # WordPress
+    'div.crayons-article__body', 'div.article-body',  # Dev.to
+    'div[class*="content"]', 'div[id*="content"]',
+    # crawl_and_export's former containers; last, so they only catch pages
+    # that every selector above misses
+    'div.blog-post', 'div.post', 'div.article'
+]
+
+
+class SiteExtractor:
+    """
+    Where the main content of one kind of site lives.
+
+    Selectors are compiled once with soupsieve instead of being parsed again
+    on every select_one() call.
+
+    Args:
+        name (str): Name reported in stats
+        selectors (list): Content containers, tried in order
+        domains (tuple): Hosts (and their subdomains) served by this site
+        markers (tuple): Selectors that identify the platform on any host,
+            e.g. WordPress's generator <meta>
+        remove (tuple): Elements dropped from the content before extraction
+    """
+
+    def __init__(self, name, selectors, domains=(), markers=(), remove=()):
+        self.name = name
+        self.domains = tuple(domains)
+        self.selectors = [(selector, soupsieve.compile(selector)) for selector in selectors]
+        self.markers = [soupsieve.compile(marker) for marker in markers]
+        self.remove = soupsieve.compile(', '.join(remove)) if remove else None
+
+    def serves(self, host):
+        return any(host == domain or host.endswith('.' + domain) for domain in self.domains)
+
+    def detect(self, soup):
+        """True if the page carries one of this platform's markers"""
+        head = soup.head or soup
+        return any(marker.select_one(head) for marker in self.markers)
+
+    def clean(self, element):
+        if self.remove is not None:
+            for junk in self.remove.select(element):
+                junk.decompose()
+
+
+SITE_EXTRACTORS = [
+    SiteExtractor('medium', [
+        'div[data-testid="post-content"]', 'div[data-testid="story-content"]',
+        'section[data-testid="post-content"]', 'article section', 'article',
+    ], domains=('medium.com',), markers=('meta[property="al:android:package"][content="com.medium.reader"]',),
+        remove=('div[data-testid="headerSocialShareButton"]', 'div.pw-multi-vote-icon')),
+    SiteExtractor('substack', [
+        'div.available-content', 'div.body.markup', 'article',
+    ], domains=('substack.com',), markers=('link[href*="substackcdn.com"]',),
+        remove=('div.subscription-widget-wrap', 'div.share-dialog')),
+    SiteExtractor('devto', [
+        'div.crayons-article__body', 'div#article-body', 'article',
+    ], domains=('dev.to',)),
+    SiteExtractor('wordpress', [
+        'div.entry-content', 'div.post-content', 'article', 'main',
+    ], domains=('wordpress.com',), markers=('meta[name="generator"][content^="WordPress"]',),
+        remove=('div.sharedaddy', 'div.jp-relatedposts')),
+    SiteExtractor('wikipedia', [
+        'div#mw-content-text div.mw-parser-output', 'div#mw-content-text',
+    ], domains=('wikipedia.org',), remove=('span.mw-editsection', 'sup.reference', 'div.navbox')),
+]
+
+
+class _Choice:
+    """The extractor and selector that found a domain's content"""
+
+    __slots__ = ('extractor', 'selector', 'compiled')
+
+    def __init__(self, extractor, selector, compiled):
+        self.extractor = extractor
+        self.selector = selector
+        self.compiled = compiled
+
+
+class ExtractorRegistry:
+    """
+    Find the main content element of a page, learning per domain what works.
+
+    The first pages of a domain are matched against the site extractor for
+    that domain (by host, or by platform markers such as WordPress's
+    generator tag), then the generic CONTENT_SELECTORS. Once a selector has
+    produced at least min_words of content, later pages of the domain go
+    straight to it; if it stops matching, the full scan runs again.
+
+    Shared by WebScraper and the crawl_and_export command, and thread-safe.
+    stats() reports how often the learned selector was used.
+
+    Args:
+        extractors (list): SiteExtractors, tried before the generic
+            selectors (default: SITE_EXTRACTORS)
+        min_words (int): Words a selector must produce to be learned (default: 50)
+        max_domains (int): Domains remembered, least recently used dropped
+            first (default: 10000)
+    """
+
+    def __init__(self, extractors=None, min_words=50, max_domains=10000):
+        self.extractors = list(SITE_EXTRACTORS if extractors is None else extractors)
+        self.generic = SiteExtractor('generic', CONTENT_SELECTORS)
+        self.min_words = min_words
+        self.max_domains = max_domains
+        self._learned = OrderedDict()
+        self._stats = Counter()
+        self._lock = threading.Lock()
+
+    def register(self, extractor):
+        """Add a SiteExtractor, taking precedence over the ones already registered"""
+        with self._lock:
+            self.extractors.insert(0, extractor)
+            self._learned.clear()
+
+    def extractor_for(self, host, soup):
+        for extractor in self.extractors:
+            if extractor.serves(host):
+                return extractor
+        for extractor in self.extractors:
+            if extractor.markers and extractor.detect(soup):
+                return extractor
+        return self.generic
+
+    def find_main_content(self, soup, body, url, accept=None):
+        """
+        Main content element of a parsed page, with site junk removed.
+
+        With accept, a container only counts as a match if accept(element)
+        is true, e.g. if it has paragraph text; otherwise the next selector
+        is tried.
+
+        Returns:
+            tuple: (element, choice) where choice is passed to learn() once
+            the content is extracted; (body, None) if nothing matched
+        """
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            choice = self._learned.get(host)
+            if choice is not None:
+                self._learned.move_to_end(host)
+
+        if choice is not None:
+            element = choice.compiled.select_one(body)
+            if element is not None:
+                choice.extractor.clean(element)
+                if accept is None or accept(element):
+                    self._count('hits', choice)
+                    return element, choice
+            self._count('misses')
+            with self._lock:
+                self._learned.pop(host, None)
+
+        extractor = self.extractor_for(host, soup)
+        candidates = extractor.selectors if extractor is self.generic else extractor.selectors + self.generic.selectors
+        for selector, compiled in candidates:
+            element = compiled.select_one(body)
+            if element is None:
+                continue
+            extractor.clean(element)
+            if accept is None or accept(element):
+                choice = _Choice(extractor, selector, compiled)
+                self._count('scans', choice)
+                return element, choice
+
+        self._count('fallbacks')
+        return body, None
+
+    def learn(self, url, choice, words):
+        """Remember choice for url's domain if it produced enough content"""
+        if choice is None or words < self.min_words:
+            return
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            if host not in self._learned:
+                self._stats['learned'] += 1
+            self._learned[host] = choice
+            self._learned.move_to_end(host)
+            while len(self._learned) > self.max_domains:
+                self._learned.popitem(last=False)
+
+    def learned(self, url):
+        """(extractor name, selector) learned for url's domain, or None; picklable"""
+        with self._lock:
+            choice = self._learned.get(urlparse(url).netloc.lower())
+        return (choice.extractor.name, choice.selector) if choice is not None else None
+
+    def adopt(self, url, learned):
+        """
+        Use a learned() result from another registry, e.g. an extraction
+        process's, for url's domain; it is not counted as learned again.
+        None forgets what was learned for the domain.
+        """
+        host = urlparse(url).netloc.lower()
+        if learned is None:
+            with self._lock:
+                self._learned.pop(host, None)
+            return
+        name, selector = learned
+        for extractor in self.extractors + [self.generic]:
+            if extractor.name != name:
+                continue
+            candidates = extractor.selectors if extractor is self.generic else extractor.selectors + self.generic.selectors
+            compiled = next((compiled for candidate, compiled in candidates if candidate == selector), None)
+            if compiled is None:
+                return
+            with self._lock:
+                self._learned[host] = _Choice(extractor, selector, compiled)
+                self._learned.move_to_end(host)
+                while len(self._learned) > self.max_domains:
+                    self._learned.popitem(last=False)
+            return
+
+    def merge_stats(self, counts):
+        """Add counters from another registry's stats(since=...), e.g. an extraction process's"""
+        with self._lock:
+            self._stats.update({key: value for key, value in counts.items() if key != 'hit_rate'})
+
+    def _count(self, outcome, choice=None):
+        with self._lock:
+            self._stats[outcome] += 1
+            if choice is not None:
+                self._stats[f'extractor:{choice.extractor.name}'] += 1
+
+    def stats(self, since=None):
+        """
+        Lookup counters: hits (learned selector used), misses (learned
+        selector no longer matched), scans, fallbacks (nothing matched),
+        learned domains, pages per extractor and hit_rate. With since, a
+        previous stats() result, only what happened after it is counted.
+        """
+        with self._lock:
+            counts = Counter(self._stats)
+        if since:
+            counts.subtract({key: value for key, value in since.items() if key != 'hit_rate'})
+        lookups = counts['hits'] + counts['scans'] + counts['fallbacks']
+        result = {key: value for key, value in counts.items() if value}
+        result['hit_rate'] = round(counts['hits'] / lookups, 3) if lookups else None
+        return result
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_extractor_registry():
+    """Return the process-wide ExtractorRegistry, creating it on first use"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ExtractorRegistry()
+        return _registry
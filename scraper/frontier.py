@@ -0,0 +1,78 @@
+import heapq
+import itertools
+from collections import deque
+from urllib.parse import urlparse
+
+STRATEGIES = ('bfs', 'best_first')
+
+
+def default_priority(url, depth):
+    """Prefer shallow pages, then URLs with shorter paths (lower sorts first)"""
+    path_depth = len([segment for segment in urlparse(url).path.split('/') if segment])
+    return (depth, path_depth)
+
+
+class Frontier:
+    """
+    Crawl frontier with constant-time push, pop and membership checks.
+
+    Every URL ever pushed is remembered in a seen-set, so a URL is queued at
+    most once per crawl no matter how many pages link to it.
+
+    Args:
+        strategy (str): 'bfs' for breadth-first order (default) or
+            'best_first' to always pop the lowest-priority URL next
+        priority (callable): priority(url, depth) used by 'best_first';
+            defaults to default_priority()
+        key (callable): Maps a URL to its seen-set entry, e.g.
+            UrlCanonicalizer.key so variants of a URL are queued once
+            (default: the URL itself)
+    """
+
+    def __init__(self, strategy='bfs', priority=None, key=None):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown frontier strategy '{strategy}', expected one of {', '.join(STRATEGIES)}")
+        self.strategy = strategy
+        self.priority = priority or default_priority
+        self.key = key
+        self._seen = set()
+        self._queue = deque() if strategy == 'bfs' else []
+        # Tie-breaker keeps insertion order stable among equal priorities
+        self._counter = itertools.count()
+
+    def add(self, url, depth, priority=None):
+        """Queue url unless it was seen before; returns True if it was queued"""
+        seen_key = self.key(url) if self.key else url
+        if seen_key in self._seen:
+            return False
+        self._seen.add(seen_key)
+        if self.strategy == 'bfs':
+            self._queue.append((url, depth))
+        else:
+            if priority is None:
+                priority = self.priority(url, depth)
+            heapq.heappush(self._queue, (priority, next(self._counter), url, depth))
+        return True
+
+    def pop(self):
+        """Remove and return the next (url, depth) pair"""
+        if self.strategy == 'bfs':
+            return self._queue.popleft()
+        _, _, url, depth = heapq.heappop(self._queue)
+        return url, depth
+
+    def mark_seen(self, url):
+        """Record url as seen without queueing it"""
+        self._seen.add(self.key(url) if self.key else url)
+
+    def seen_count(self):
+        return len(self._seen)
+
+    def __contains__(self, url):
+        return (self.key(url) if self.key else url) in self._seen
+
+    def __len__(self):
+        return len(self._queue)
+
+    def __bool__(self):
+        return bool(self._queue)
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from .extraction import json_default, load_page
+
+
+class HttpCache:
+    """
+    On-disk cache of validators and extraction results, keyed by URL.
+
+    Each entry stores the ETag, Last-Modified and a hash of the raw HTTP body
+    next to the extract_page() result. On a recrawl the page is revalidated
+    with a conditional GET; a 304, or a 200 whose body hashes the same, means
+    the cached extraction is returned without rendering or parsing.
+
+    The cache may be shared by fetch threads; count hits and misses with
+    hit() and miss().
+
+    Args:
+        directory (str): Where entries are written (created if missing)
+    """
+
+    def __init__(self, directory):
+        self.directory = os.path.abspath(directory)
+        os.makedirs(self.directory, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def hit(self):
+        with self._lock:
+            self.hits += 1
+
+    def miss(self):
+        with self._lock:
+            self.misses += 1
+
+    @staticmethod
+    def content_hash(content):
+        return hashlib.sha256(content).hexdigest()
+
+    def _path(self, url):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key[:2], f'{key}.json')
+
+    def get(self, url):
+        """Return the cached entry for url, or None"""
+        try:
+            with open(self._path(url), encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # Guard against (astronomically unlikely) key collisions
+        if entry.get('url') != url:
+            return None
+        load_page(entry.get('page'))
+        return entry
+
+    def conditional_headers(self, entry):
+        """If-None-Match / If-Modified-Since headers for revalidating entry"""
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def is_fresh(self, entry, response):
+        """True if response shows the page has not changed since entry was stored"""
+        if not entry or response is None:
+            return False
+        if response.status_code == 304:
+            return True
+        return response.status_code < 400 and self.content_hash(response.content) == entry.get('content_hash')
+
+    def put(self, url, response, page, engine):
+        """Store validators from response alongside the extraction result"""
+        entry = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'content_hash': self.content_hash(response.content),
+            'engine': engine,
+            'stored_at': time.time(),
+            'page': page,
+        }
+        path = self._path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so concurrent readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, default=json_default)
+            os.replace(tmp_path, path)
+        except Exception:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,203 @@
+import re
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+except ImportError:  # HTTP/2 and the async client need httpx (pip install "httpx[http2]")
+    httpx = None
+
+DEFAULT_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+DEFAULT_MAX_BODY_SIZE = 10 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+CHARSET_HEADER_RE = re.compile(r'charset=["\']?([\w.:-]+)', re.IGNORECASE)
+CHARSET_META_RE = re.compile(rb'<meta[^>]+charset=["\']?([\w.:-]+)', re.IGNORECASE)
+
+
+class ResponseTooLarge(Exception):
+    pass
+
+
+class HttpStatusError(Exception):
+    """The server answered with a 4xx or 5xx status"""
+
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class HttpResponse:
+    """Fully read response body plus the metadata the scraper needs"""
+
+    def __init__(self, url, status_code, headers, content):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self):
+        return decode_body(self.content, self.headers.get('Content-Type', ''))
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise HttpStatusError(f"HTTP {self.status_code} for url: {self.url}", self.status_code)
+
+
+def decode_body(content, content_type):
+    """Decode HTML bytes using the header charset, then <meta charset>, then UTF-8"""
+    match = CHARSET_HEADER_RE.search(content_type) or CHARSET_META_RE.search(content[:4096])
+    encoding = match.group(1) if match else 'utf-8'
+    if isinstance(encoding, bytes):
+        encoding = encoding.decode('ascii', 'replace')
+    try:
+        return content.decode(encoding, errors='replace')
+    except LookupError:
+        return content.decode('utf-8', errors='replace')
+
+
+def _check_declared_size(headers, max_body_size, url):
+    declared = headers.get('Content-Length')
+    if max_body_size and declared and declared.isdigit() and int(declared) > max_body_size:
+        raise ResponseTooLarge(f"{url} declares {declared} bytes, limit is {max_body_size}")
+
+
+def _append_chunk(body, chunk, max_body_size, url):
+    body.extend(chunk)
+    if max_body_size and len(body) > max_body_size:
+        raise ResponseTooLarge(f"{url} exceeded the {max_body_size} byte body limit")
+
+
+class HttpClient:
+    """
+    Pooled HTTP client for the static fetch path.
+
+    Keeps connections alive per host across fetches, lets urllib3 negotiate
+    and decode gzip/deflate (plus brotli/zstd when those packages are
+    installed), and streams bodies so a response larger than max_body_size
+    is abandoned instead of being read into memory.
+
+    Args:
+        timeout (float): Connect/read timeout in seconds (default: 10)
+        max_body_size (int): Largest body accepted, in bytes (default: 10 MB)
+        pool_connections (int): Number of per-host pools kept (default: 20)
+        pool_maxsize (int): Keep-alive connections per host (default: 10)
+        http2 (bool): Use httpx with HTTP/2 instead of requests (default: False)
+        headers (dict): Extra default request headers
+    """
+
+    def __init__(self, timeout=10, max_body_size=DEFAULT_MAX_BODY_SIZE, pool_connections=20, pool_maxsize=10,
+                 http2=False, headers=None):
+        self.timeout = timeout
+        self.max_body_size = max_body_size
+        self.headers = {'User-Agent': DEFAULT_USER_AGENT}
+        self.headers.update(headers or {})
+
+        if http2:
+            if httpx is None:
+                raise ImportError('HTTP/2 support requires httpx: pip install "httpx[http2]"')
+            self._client = httpx.Client(
+                http2=True,
+                headers=self.headers,
+                timeout=timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=pool_connections * pool_maxsize,
+                                    max_keepalive_connections=pool_connections * pool_maxsize),
+            )
+            self._session = None
+        else:
+            self._client = None
+            self._session = requests.Session()
+            self._session.headers.update(self.headers)
+            adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+            self._session.mount('http://', adapter)
+            self._session.mount('https://', adapter)
+
+    def get(self, url, headers=None):
+        """GET url and return an HttpResponse with the full (size-capped) body"""
+        if self._client is not None:
+            with self._client.stream('GET', url, headers=headers) as response:
+                _check_declared_size(response.headers, self.max_body_size, url)
+                body = bytearray()
+                for chunk in response.iter_bytes(CHUNK_SIZE):
+                    _append_chunk(body, chunk, self.max_body_size, url)
+                return HttpResponse(str(response.url), response.status_code, response.headers, bytes(body))
+
+        with self._session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+            _check_declared_size(response.headers, self.max_body_size, url)
+            body = bytearray()
+            for chunk in response.iter_content(CHUNK_SIZE):
+                _append_chunk(body, chunk, self.max_body_size, url)
+            return HttpResponse(response.url, response.status_code, response.headers, bytes(body))
+
+    def iter_bytes(self, url, headers=None):
+        """
+        Yield the body of url in chunks as it arrives.
+
+        Not subject to max_body_size: meant for large documents that are
+        parsed incrementally (e.g. sitemaps) and never held in memory whole.
+        """
+        if self._client is not None:
+            with self._client.stream('GET', url, headers=headers) as response:
+                if response.status_code >= 400:
+                    raise Exception(f"HTTP {response.status_code} for url: {url}")
+                yield from response.iter_bytes(CHUNK_SIZE)
+            return
+
+        with self._session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+            if response.status_code >= 400:
+                raise Exception(f"HTTP {response.status_code} for url: {url}")
+            yield from response.iter_content(CHUNK_SIZE)
+
+    def get_html(self, url):
+        response = self.get(url)
+        response.raise_for_status()
+        return response.text
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+        if self._session is not None:
+            self._session.close()
+
+
+class AsyncHttpClient:
+    """
+    httpx-based async counterpart of HttpClient for concurrent crawls.
+
+    Args are the same as HttpClient; max_connections bounds connections
+    across all hosts and http2 is enabled when the h2 package is installed.
+    """
+
+    def __init__(self, timeout=10, max_body_size=DEFAULT_MAX_BODY_SIZE, max_connections=100,
+                 max_keepalive_connections=20, http2=False, headers=None):
+        if httpx is None:
+            raise ImportError('The async HTTP client requires httpx: pip install "httpx[http2]"')
+        self.max_body_size = max_body_size
+        client_headers = {'User-Agent': DEFAULT_USER_AGENT}
+        client_headers.update(headers or {})
+        self._client = httpx.AsyncClient(
+            http2=http2,
+            headers=client_headers,
+            timeout=timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive_connections),
+        )
+
+    async def get(self, url, headers=None):
+        async with self._client.stream('GET', url, headers=headers) as response:
+            _check_declared_size(response.headers, self.max_body_size, url)
+            body = bytearray()
+            async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                _append_chunk(body, chunk, self.max_body_size, url)
+            return HttpResponse(str(response.url), response.status_code, response.headers, bytes(body))
+
+    async def get_html(self, url):
+        response = await self.get(url)
+        response.raise_for_status()
+        return response.text
+
+    async def close(self):
+        await self._client.aclose()
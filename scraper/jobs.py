@@ -0,0 +1,156 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .browser_pool import get_browser_pool
+from .storage import storage_enabled, store_crawl_result
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class CrawlJob:
+    """A crawl running in the background, with progress visible while it runs"""
+
+    def __init__(self, url, max_depth, max_pages):
+        self.id = uuid.uuid4().hex
+        self.url = url
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.status = QUEUED
+        self.progress = {'pages_done': 0, 'queue_size': 0, 'pages_extracted': 0, 'errors': 0, 'last_error': None}
+        self.result = None
+        self.error = None
+        # Id of the stored scraper.models.CrawlJob, once the result is saved
+        self.stored_id = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def update_progress(self, progress):
+        with self._lock:
+            self.progress = dict(progress)
+
+    def to_dict(self):
+        """JSON-friendly snapshot for the status endpoint (without the result)"""
+        with self._lock:
+            return {
+                'id': self.id,
+                'url': self.url,
+                'status': self.status,
+                'max_depth': self.max_depth,
+                'max_pages': self.max_pages,
+                'progress': dict(self.progress),
+                'error': self.error,
+                'stored_id': self.stored_id,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+            }
+
+
+class CrawlJobManager:
+    """
+    Run crawl jobs on a thread pool so web requests return immediately.
+
+    Each job leases a browser from the shared BrowserPool for the duration of
+    its crawl. Finished jobs are kept in memory (the oldest are evicted past
+    max_jobs) so their results can be viewed and exported without recrawling.
+
+    Jobs live in the memory of the process that runs them, so the web UI
+    needs a single server process (threads are fine, e.g. gunicorn
+    --workers 1 --threads 8): with several, a status poll or export that
+    lands on another process reports an unknown job. Finished crawls are
+    also stored in the database when SCRAPER_CRAWL_STORAGE is enabled and
+    can be read from any process through scraper.models.CrawlJob.
+
+    Args:
+        workers (int): Jobs that may run at once; get_crawl_jobs() caps this
+            at one less than the browser pool size (default: 2)
+        max_jobs (int): Jobs remembered, including finished ones (default: 50)
+    """
+
+    def __init__(self, workers=2, max_jobs=50):
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scraper-crawl-job')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, url, max_depth, max_pages):
+        job = CrawlJob(url, max_depth, max_pages)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._evict()
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _evict(self):
+        # Only finished jobs are dropped; running ones are always kept
+        while len(self._jobs) > self.max_jobs:
+            for job_id, job in self._jobs.items():
+                if job.status in (DONE, FAILED):
+                    del self._jobs[job_id]
+                    break
+            else:
+                return
+
+    def _run(self, job):
+        with job._lock:
+            job.status = RUNNING
+            job.started_at = time.time()
+        try:
+            with get_browser_pool().lease() as scraper:
+                result = scraper.crawl_website(
+                    job.url, max_depth=job.max_depth, max_pages=job.max_pages, progress=job.update_progress
+                )
+        except Exception as e:
+            with job._lock:
+                job.status = FAILED
+                job.error = str(e)
+                job.finished_at = time.time()
+            return
+        stored_id = None
+        if storage_enabled():
+            # The result stays available in memory even if it cannot be stored
+            try:
+                stored_id = store_crawl_result(result, job.max_depth, job.max_pages).id
+            except Exception as e:
+                print(f"Storing crawl of {job.url} failed: {str(e)}")
+        with job._lock:
+            job.result = result
+            job.stored_id = stored_id
+            job.status = DONE
+            job.finished_at = time.time()
+
+
+_manager = None
+_manager_options = {}
+_manager_lock = threading.Lock()
+
+
+def configure_crawl_jobs(**options):
+    """Set CrawlJobManager options; called from ScraperConfig.ready()"""
+    global _manager_options
+    _manager_options = options
+
+
+def get_crawl_jobs():
+    """Return the process-wide CrawlJobManager, creating it on first use"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            options = dict(_manager_options)
+            # Keep a browser free for /scrape/ requests while crawls run
+            pool_size = get_browser_pool().size
+            options['workers'] = max(1, min(options.get('workers', 2), pool_size - 1))
+            _manager = CrawlJobManager(**options)
+        return _manager
@@ -3,21 +3,79 @@ import requests
 from bs4 import BeautifulSoup
 from playwright.sync_api import sync_playwright
 from urllib.parse import urljoin, urlparse
-import pandas as pd
 import os
 
+from scraper.archive import RENDERED_CONTENT_TYPE, ArchiveWriter
+from scraper.canonical import get_canonicalizer, in_domain, registrable_domain
+from scraper.dedup import NearDuplicateDetector
+from scraper.extractors import get_extractor_registry
+from scraper.frontier import STRATEGIES
+from scraper.http_client import HttpClient
+from scraper.metrics import CrawlMetrics, SamplingProfiler, error_class
+from scraper.politeness import PoliteFrontier, PolitenessScheduler
+from scraper.search import IndexedSink, get_search_index
+from scraper.sinks import SINKS, EXPORT_COLUMNS, open_sink
+from scraper.sitemaps import site_urls
+from scraper.storage import CrawlStore, StoredSink
+from scraper.models import CrawlJob
+
+# Rows exported per crawl, pages (and sitemap URLs) a crawl may visit, and the
+# words a page needs beyond this to be exported
+MAX_ROWS = 100
+MAX_PAGES = 1000
+MIN_WORDS = 10
+
+
+def paragraph_text(element, limit=None):
+    """Text of the <p> elements under element, joined by spaces"""
+    paragraphs = element.find_all('p', limit=limit)
+    return ' '.join(text for text in (p.get_text(strip=True) for p in paragraphs) if text)
+
+
+def export_row(page_data):
+    """Row of a pipelined page by the sequential crawl's rule: paragraph text only, None if too short"""
+    content = ' '.join(block.text for block in page_data['content'] if block.type == 'paragraph' and block.text)
+    word_count = len(content.split())
+    if word_count <= MIN_WORDS:
+        return None
+    return dict(zip(EXPORT_COLUMNS, (page_data['url'], page_data['title'], content, word_count)))
+
+
 class Command(BaseCommand):
-    help = 'Crawl website and export extracted content to Excel'
+    help = 'Crawl website and export extracted content to Excel, JSONL or Parquet'
 
     def add_arguments(self, parser):
         parser.add_argument('url', type=str, help='Starting URL to crawl')
         parser.add_argument('--depth', type=int, default=2, help='Maximum crawl depth (default: 2)')
-        parser.add_argument('--output', type=str, default='scraped_content.xlsx', help='Output Excel file (default: scraped_content.xlsx)')
+        parser.add_argument('--output', type=str, default=None, help='Output file (default: scraped_content.<format>)')
+        parser.add_argument('--format', choices=list(SINKS), default='xlsx', help='Output format (default: xlsx)')
+        parser.add_argument('--flush-every', type=int, default=100, help='Rows written between flushes to disk for jsonl and parquet; xlsx is saved when the crawl ends (default: 100)')
+        parser.add_argument('--strategy', choices=STRATEGIES, default='bfs', help='Frontier order (default: bfs)')
+        parser.add_argument('--keep-duplicates', action='store_true', help='Export near-duplicate pages too')
+        parser.add_argument('--prune-duplicates', action='store_true', help='Stop crawling URL patterns that keep producing duplicates')
+        parser.add_argument('--rate', type=float, default=2.0, help='Requests per second per host (default: 2)')
+        parser.add_argument('--ignore-robots', action='store_true', help='Do not check robots.txt or honor Crawl-delay')
+        parser.add_argument('--sitemaps', action='store_true', help="Also seed the crawl from the site's sitemaps, newest pages first")
+        parser.add_argument('--sitemap-only', action='store_true', help='Crawl only the URLs listed in the sitemaps, without following links')
+        parser.add_argument('--workers', type=int, default=0,
+                            help='Extract pages in N processes while fetching continues (default: 0, crawl on one thread)')
+        parser.add_argument('--profile', type=str, default=None,
+                            help='Sample the crawl into this file as collapsed stacks for a flame graph')
+        parser.add_argument('--store', action='store_true',
+                            help='Also save the exported pages and discovered links in the database (see SCRAPER_CRAWL_STORAGE)')
+        parser.add_argument('--archive', type=str, default=None,
+                            help='Append every raw response to this archive, for offline re-extraction with reextract')
+        parser.add_argument('--no-index', action='store_true', help='Do not add exported pages to the full-text search index')
 
     def handle(self, *args, **options):
         url = options['url']
         max_depth = options['depth']
-        output_file = options['output']
+        export_format = options['format']
+        output_file = options['output'] or f'scraped_content.{export_format}'
+        strategy = options['strategy']
+        dedup = not options['keep_duplicates']
+        prune_duplicates = options['prune_duplicates']
+        sitemaps, sitemap_only = options['sitemaps'], options['sitemap_only']
 
         if not url.startswith(('http://', 'https://')):
             self.stdout.write(self.style.ERROR('Invalid URL. Please provide a valid URL starting with http:// or https://'))
@@ -25,25 +83,89 @@ class Command(BaseCommand):
 
         self.stdout.write(f'Starting crawl of {url} with depth {max_depth}')
 
-        crawled_data, links_found = self.crawl_website(url, max_depth)
+        # Rows are written as they are produced, so memory stays flat; jsonl
+        # and parquet output keeps everything flushed so far if the crawl
+        # crashes, while an xlsx workbook is only saved when it ends
+        http = HttpClient()
+        politeness = PolitenessScheduler(http, rate=options['rate'], respect_robots=not options['ignore_robots'])
+        profiler = SamplingProfiler(options['profile']).start() if options['profile'] else None
+        # Exported rows also go to the SCRAPER_SEARCH_INDEX and, with --store,
+        # to the database, both in batched transactions
+        search_index = None if options['no_index'] else get_search_index()
+        index_writer = None
+        store = CrawlStore.create(url, max_depth, MAX_ROWS) if options['store'] else None
+        archive = ArchiveWriter(options['archive']) if options['archive'] else None
+        try:
+            sink = open_sink(export_format, output_file, flush_every=options['flush_every'])
+            if search_index:
+                sink = IndexedSink(sink, search_index)
+                index_writer = sink.writer
+            if store:
+                sink = StoredSink(sink, store)
+            with sink:
+                if options['workers']:
+                    pages_written, links_found, metrics = self.crawl_pipelined(url, max_depth, sink, strategy, dedup, prune_duplicates,
+                                                                               options['workers'], http, politeness, sitemaps, sitemap_only,
+                                                                               archive)
+                else:
+                    pages_written, links_found, metrics = self.crawl_website(url, max_depth, sink, strategy, dedup, prune_duplicates,
+                                                                             politeness, sitemaps, sitemap_only, archive)
+        except Exception as e:
+            if store:
+                store.close(CrawlJob.FAILED, error=str(e))
+            raise
+        finally:
+            http.close()
+            if archive:
+                archive.close()
+                self.stdout.write(f'Archived {archive.records_written} responses to {os.path.abspath(options["archive"])}')
+            if profiler:
+                profiler.stop()
+                self.stdout.write(f"Wrote profile to {os.path.abspath(options['profile'])}")
+
+        self.write_metrics(metrics)
+        if store:
+            store.add_links(links_found)
+            store.close(stats={'metrics': metrics})
+            self.stdout.write(f'Stored {store.pages_stored} pages and {store.links_stored} links as crawl job {store.job.id}')
+        if index_writer:
+            counts = index_writer.counts
+            self.stdout.write(f"Search index: {counts['added']} added, {counts['updated']} updated, "
+                              f"{counts['unchanged']} unchanged")
 
-        if not crawled_data:
+        if not pages_written:
             self.stdout.write(self.style.WARNING('No pages were successfully crawled.'))
             return
 
-        # Create DataFrame
-        df = pd.DataFrame(crawled_data)
-        df.to_excel(output_file, index=False, engine='openpyxl')
-
-        self.stdout.write(self.style.SUCCESS(f'Crawled {len(crawled_data)} pages, found {len(links_found)} unique links.'))
+        self.stdout.write(self.style.SUCCESS(f'Crawled {pages_written} pages, found {len(links_found)} unique links.'))
         self.stdout.write(f'Saved results to {os.path.abspath(output_file)}')
 
-    def crawl_website(self, seed_url, max_depth):
+    def crawl_website(self, seed_url, max_depth, sink, strategy='bfs', dedup=True, prune_duplicates=False, politeness=None,
+                      sitemaps=False, sitemap_only=False, archive=None):
+        canonicalizer = get_canonicalizer()
+        seed_url = canonicalizer.canonicalize(seed_url)
         visited = set()
-        to_visit = [(seed_url, 0)]
-        results = []
+        # Canonical keys of exported pages, including rel=canonical targets
+        crawled = set()
+        # Interleaves hosts and rate-limits each one, queueing each URL variant
+        # once; see scraper/politeness.py and scraper/canonical.py
+        to_visit = PoliteFrontier(politeness or PolitenessScheduler(HttpClient()), strategy, key=canonicalizer.key)
+        politeness = to_visit.scheduler
+        sitemap_urls = []
+        if sitemaps or sitemap_only:
+            sitemap_urls = site_urls(seed_url, politeness.robots.http, politeness, canonicalizer.canonicalize, MAX_PAGES)
+            self.stdout.write(f'Found {len(sitemap_urls)} URLs in sitemaps')
+        if not sitemap_only or not sitemap_urls:
+            to_visit.add(seed_url, 0)
+        for sitemap_url in sitemap_urls:
+            to_visit.add(sitemap_url, 0, priority=(0, -1))
+        pages_written = 0
         links_found = set()
-        base_domain = urlparse(seed_url).netloc
+        base_domain = registrable_domain(urlparse(seed_url).hostname or '')
+        duplicates = NearDuplicateDetector() if dedup or prune_duplicates else None
+        metrics = CrawlMetrics('crawl_and_export')
+        extractors = get_extractor_registry()
+        extractor_stats_before = extractors.stats()
 
         with sync_playwright() as p:
             browser = p.chromium.launch(headless=True)
@@ -51,52 +173,123 @@ class Command(BaseCommand):
                 user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
             )
 
-            while to_visit and len(results) < 100:  # Limit to 100 pages
-                current_url, depth = to_visit.pop(0)
+            while to_visit and pages_written < MAX_ROWS and len(visited) < MAX_PAGES:
+                current_url, depth = to_visit.pop()
 
-                if current_url in visited or depth > max_depth:
+                if current_url in visited or depth > max_depth or canonicalizer.key(current_url) in crawled:
                     continue
 
-                visited.add(current_url)
+                if prune_duplicates and not duplicates.should_expand(current_url):
+                    continue
 
-                try:
-                    page.goto(current_url, wait_until='domcontentloaded', timeout=30000)
-                    html = page.content()
-                    soup = BeautifulSoup(html, 'lxml')
-
-                    # Extract data
-                    title = self.extract_title(soup)
-                    content = self.extract_content(soup)
-                    word_count = len(content.split()) if content else 0
-
-                    if content and word_count > 10:  # Only include pages with meaningful content
-                        results.append({
-                            'URL': current_url,
-                            'Title': title,
-                            'Content': content,
-                            'Word Count': word_count
-                        })
-
-                    self.stdout.write(f'Crawling page {len(results)}/{len(visited)}: {current_url}')
-
-                    # Find links
-                    if depth < max_depth:
-                        for link in soup.find_all('a', href=True):
-                            href = link['href'].strip()
-                            if href and not href.startswith(('#', 'mailto:', 'javascript:')):
-                                full_url = urljoin(current_url, href)
-                                parsed = urlparse(full_url)
-                                if parsed.netloc == base_domain and full_url not in visited and full_url not in [u for u, d in to_visit]:
-                                    to_visit.append((full_url, depth + 1))
-                                    links_found.add(full_url)
-
-                except Exception as e:
-                    self.stdout.write(self.style.WARNING(f'Error crawling {current_url}: {str(e)}'))
+                if not politeness.allowed(current_url):
+                    self.stdout.write(f'Skipping (disallowed by robots.txt): {current_url}')
                     continue
 
+                visited.add(current_url)
+
+                with metrics.page(current_url) as page_metrics:
+                    try:
+                        with metrics.time('politeness_wait'):
+                            politeness.wait(current_url)
+                        with metrics.time('fetch'):
+                            page.goto(current_url, wait_until='domcontentloaded', timeout=30000)
+                            html = page.content()
+                        body = html.encode('utf-8')
+                        metrics.add_bytes(len(body))
+                        page_metrics.engine = 'playwright'
+                        if archive:
+                            archive.write(current_url, body, RENDERED_CONTENT_TYPE, engine='playwright')
+                        with metrics.time('parse'):
+                            soup = BeautifulSoup(html, 'lxml')
+
+                        # Pages declaring an already exported page as canonical are duplicates
+                        canonical_url = canonicalizer.canonical_link(soup, current_url) or current_url
+                        if canonicalizer.key(canonical_url) in crawled:
+                            self.stdout.write(f'Skipping duplicate of canonical {canonical_url}: {current_url}')
+                            continue
+                        crawled.update((canonicalizer.key(canonical_url), canonicalizer.key(current_url)))
+
+                        # Extract data
+                        with metrics.time('extract'):
+                            title = self.extract_title(soup)
+                            content = self.extract_content(soup, current_url)
+                            word_count = len(content.split()) if content else 0
+
+                        duplicate_of = None
+                        if word_count > MIN_WORDS and duplicates:
+                            # Pruning learns from every page, even when duplicates are kept
+                            near_duplicate_of = duplicates.check(current_url, content)
+                            if near_duplicate_of and dedup:
+                                duplicate_of = near_duplicate_of
+                                self.stdout.write(f'Skipping near-duplicate of {duplicate_of}: {current_url}')
+
+                        if word_count > MIN_WORDS and not duplicate_of:  # Only include pages with meaningful content
+                            with metrics.time('export'):
+                                sink.write(dict(zip(EXPORT_COLUMNS, (canonical_url, title, content, word_count))))
+                            pages_written += 1
+
+                        self.stdout.write(f'Crawling page {pages_written}/{len(visited)}: {current_url}')
+
+                        # Find links
+                        if depth < max_depth and not sitemap_only:
+                            with metrics.time('links'):
+                                for full_url in self.find_links(soup, current_url, base_domain):
+                                    if to_visit.add(full_url, depth + 1):
+                                        links_found.add(full_url)
+
+                    except Exception as e:
+                        page_metrics.error = error_class(e)
+                        self.stdout.write(self.style.WARNING(f'Error crawling {current_url}: {str(e)}'))
+                        continue
+
             browser.close()
 
-        return results, links_found
+        if dedup:
+            self.stdout.write(f'Dropped {duplicates.duplicates} near-duplicate pages.')
+        extractor_stats = extractors.stats(since=extractor_stats_before)
+        self.stdout.write(f"Content selectors: {extractor_stats.get('hits', 0)} learned hits, "
+                          f"{extractor_stats.get('scans', 0)} scans (hit rate {extractor_stats['hit_rate']})")
+
+        return pages_written, links_found, metrics.finish()
+
+    def find_links(self, soup, current_url, base_domain):
+        """Canonical absolute links of a parsed page within base_domain and its subdomains"""
+        canonicalizer = get_canonicalizer()
+        page_links = []
+        for link in soup.find_all('a', href=True):
+            href = link['href'].strip()
+            if href and not href.startswith(('#', 'mailto:', 'javascript:')):
+                full_url = canonicalizer.canonicalize(urljoin(current_url, href))
+                if urlparse(full_url).scheme in ('http', 'https') and in_domain(full_url, base_domain):
+                    page_links.append(full_url)
+        return page_links
+
+    def crawl_pipelined(self, seed_url, max_depth, sink, strategy, dedup, prune_duplicates, workers, http, politeness,
+                        sitemaps=False, sitemap_only=False, archive=None):
+        """Crawl with WebScraper's fetch/extract pipeline, streaming pages into sink"""
+        from scraper.utils import WebScraper
+
+        with WebScraper(http_client=http, politeness=politeness, archive=archive) as scraper:
+            # Exported rows are indexed by the IndexedSink, if at all
+            scraper.search_index = None
+            result = scraper.crawl_website_pipelined(
+                seed_url, max_depth=max_depth, max_pages=MAX_PAGES, strategy=strategy, dedup=dedup,
+                prune_duplicates=prune_duplicates, extract_workers=workers, sink=sink,
+                sitemaps=sitemaps, sitemap_only=sitemap_only, export_row=export_row, max_rows=MAX_ROWS
+            )
+        if result['duplicates']:
+            self.stdout.write(f"Dropped {result['duplicates']} near-duplicate pages.")
+        return result['pages_written'], set(result['links']), result['metrics']
+
+    def write_metrics(self, metrics):
+        """Print where the crawl spent its time"""
+        self.stdout.write(f"Downloaded {metrics['bytes_downloaded']} bytes in {metrics['seconds']:.1f}s "
+                          f"({metrics['pages_per_second'] or 0:.2f} pages/s)")
+        for stage, timing in metrics['stages'].items():
+            self.stdout.write(f"  {stage:<16}{timing['seconds']:>10.3f}s  {timing['calls']:>6} calls")
+        if metrics['errors']:
+            self.stdout.write(f"Errors: {metrics['errors']}")
 
     def extract_title(self, soup):
         title_tag = soup.find('title')
@@ -109,33 +302,24 @@ class Command(BaseCommand):
 
         return 'No Title'
 
-    def extract_content(self, soup):
+    def extract_content(self, soup, url):
         # Remove unwanted elements
         for tag in soup(['script', 'style', 'nav', 'header', 'footer', 'aside', 'sidebar', 'ads', 'noscript']):
             tag.decompose()
 
-        # Try to find main content
-        content_selectors = [
-            'article', 'main',
-            'div.content', 'div.post-content', 'div.entry-content', 'div.article-content',
-            'div.blog-post', 'div.post', 'div.article'
-        ]
-
+        # Find main content with the extractors WebScraper uses, learned per
+        # domain; a container without paragraph text falls through to the next
+        extractors = get_extractor_registry()
         content_text = ''
-
-        for selector in content_selectors:
-            main_content = soup.select_one(selector)
-            if main_content:
-                paragraphs = main_content.find_all('p')
-                content_text = ' '.join(p.get_text(strip=True) for p in paragraphs if p.get_text(strip=True))
-                if content_text:
-                    break
+        main_content, choice = extractors.find_main_content(soup, soup.find('body') or soup, url, accept=paragraph_text)
+        if choice is not None:
+            content_text = paragraph_text(main_content)
+            extractors.learn(url, choice, len(content_text.split()))
 
         # Fallback to body paragraphs if no main content found
         if not content_text:
             body = soup.find('body')
             if body:
-                paragraphs = body.find_all('p')[:20]  # Limit to first 20 paragraphs
-                content_text = ' '.join(p.get_text(strip=True) for p in paragraphs if p.get_text(strip=True))
+                content_text = paragraph_text(body, limit=20)  # Limit to first 20 paragraphs
 
         return content_text
\ No newline at end of file
@@ -0,0 +1,83 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from scraper.adaptive import ENGINES
+from scraper.distributed import DistributedCrawler, open_backend
+from scraper.politeness import PolitenessScheduler
+from scraper.sinks import SINKS, open_sink, page_row
+
+
+class Command(BaseCommand):
+    help = 'Work on a crawl shared by several worker processes or machines through a persistent frontier'
+
+    def add_arguments(self, parser):
+        parser.add_argument('crawl_id', type=str, help='Name of the crawl; every worker of a crawl uses the same one')
+        parser.add_argument('--seed', type=str, help='Starting URL; required the first time a crawl is started')
+        parser.add_argument('--depth', type=int, default=2, help='Maximum crawl depth for a new crawl (default: 2)')
+        parser.add_argument('--max-pages', type=int, default=1000, help='Page budget for a new crawl (default: 1000)')
+        parser.add_argument('--shard', type=int, default=0, help="This worker's number, from 0 (default: 0)")
+        parser.add_argument('--shards', type=int, default=1, help='Number of workers splitting the crawl by host (default: 1)')
+        parser.add_argument('--backend', type=str, default=None,
+                            help='Frontier backend URL, sqlite:///path or redis://host:port/db (default: SCRAPER_CRAWL_FRONTIER)')
+        parser.add_argument('--engine', choices=ENGINES, default='adaptive', help='Fetch engine (default: adaptive)')
+        parser.add_argument('--keep-duplicates', action='store_true', help='Keep near-duplicate pages')
+        parser.add_argument('--rate', type=float, default=2.0, help='Requests per second per host (default: 2)')
+        parser.add_argument('--ignore-robots', action='store_true', help='Do not check robots.txt or honor Crawl-delay')
+        parser.add_argument('--batch-size', type=int, default=10, help='URLs leased at a time (default: 10)')
+        parser.add_argument('--lease-seconds', type=int, default=600,
+                            help='Seconds before URLs leased by a dead worker are crawled again (default: 600)')
+        parser.add_argument('--idle-timeout', type=int, default=None,
+                            help='Exit after this many seconds without work, even if other workers are still busy')
+        parser.add_argument('--export', type=str, default=None, help='Instead of crawling, export the pages crawled so far to this file')
+        parser.add_argument('--format', choices=list(SINKS), default='jsonl', help='Export format (default: jsonl)')
+
+    def handle(self, *args, **options):
+        crawl_id = options['crawl_id']
+        location = options['backend'] or getattr(settings, 'SCRAPER_CRAWL_FRONTIER', 'sqlite:///crawl_frontier.sqlite3')
+        backend = open_backend(location)
+        try:
+            if options['export']:
+                self.export(backend, crawl_id, options['export'], options['format'])
+            else:
+                self.work(backend, crawl_id, options)
+        finally:
+            backend.close()
+
+    def work(self, backend, crawl_id, options):
+        from scraper.utils import WebScraper
+
+        if options['seed']:
+            if not options['seed'].startswith(('http://', 'https://')):
+                raise CommandError('Invalid URL. Please provide a valid URL starting with http:// or https://')
+            crawl = backend.create_crawl(crawl_id, options['seed'], options['depth'], options['max_pages'])
+        else:
+            crawl = backend.get_crawl(crawl_id)
+            if crawl is None:
+                raise CommandError(f"Unknown crawl '{crawl_id}', start it with --seed")
+
+        self.stdout.write(f"Worker {options['shard']}/{options['shards']} on crawl {crawl_id} of {crawl['seed_url']} "
+                          f"(depth {crawl['max_depth']}, max {crawl['max_pages']} pages)")
+        with WebScraper() as scraper:
+            scraper.politeness = PolitenessScheduler(scraper.http, rate=options['rate'], respect_robots=not options['ignore_robots'])
+            crawler = DistributedCrawler(
+                scraper, backend, crawl_id, shard=options['shard'], shards=options['shards'],
+                batch_size=options['batch_size'], lease_seconds=options['lease_seconds'],
+            )
+            summary = crawler.run(engine=options['engine'], dedup=not options['keep_duplicates'],
+                                  idle_timeout=options['idle_timeout'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Worker crawled {summary['pages']} pages ({summary['extracted']} with content, "
+            f"{summary['errors']} errors, {summary['duplicates']} near-duplicates)."
+        ))
+        self.stdout.write(f'Crawl state: {backend.stats(crawl_id)}')
+
+    def export(self, backend, crawl_id, output_file, export_format):
+        if backend.get_crawl(crawl_id) is None:
+            raise CommandError(f"Unknown crawl '{crawl_id}'")
+        with open_sink(export_format, output_file) as sink:
+            for page_data in backend.iter_pages(crawl_id):
+                sink.write(page_row(page_data))
+        self.stdout.write(self.style.SUCCESS(f'Exported {sink.rows_written} pages to {os.path.abspath(output_file)}'))
@@ -0,0 +1,68 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from django.core.management.base import BaseCommand, CommandError
+
+from scraper.archive import ArchiveReader, index_path, reextract_worker
+from scraper.sinks import SINKS, open_sink, page_row
+
+
+class Command(BaseCommand):
+    help = 'Re-run content extraction over an archive of raw responses, without touching the network'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archive', type=str, help='Archive written by crawl_and_export --archive (or WebScraper(archive=...))')
+        parser.add_argument('--output', type=str, default=None, help='Output file (default: reextracted.<format>)')
+        parser.add_argument('--format', choices=list(SINKS), default='jsonl', help='Output format (default: jsonl)')
+        parser.add_argument('--workers', type=int, default=0, help='Extraction processes (default: one per CPU core)')
+        parser.add_argument('--chunk-size', type=int, default=200, help='Pages handed to a process at a time (default: 200)')
+        parser.add_argument('--flush-every', type=int, default=1000, help='Rows written between flushes to disk for jsonl and parquet; xlsx is saved at the end (default: 1000)')
+        parser.add_argument('--rebuild-index', action='store_true', help='Rebuild the offset index from the archive first')
+
+    def handle(self, *args, **options):
+        path = options['archive']
+        if not os.path.exists(path):
+            raise CommandError(f'No archive at {path}')
+        export_format = options['format']
+        output_file = options['output'] or f'reextracted.{export_format}'
+        workers = options['workers'] or os.cpu_count() or 1
+        chunk_size = max(1, options['chunk_size'])
+
+        with ArchiveReader(path) as reader:
+            if options['rebuild_index'] or not os.path.exists(index_path(path)):
+                self.stdout.write(f'Rebuilt index of {reader.rebuild_index()} URLs')
+            entries = reader.entries()
+        if not entries:
+            self.stdout.write(self.style.WARNING('The archive is empty.'))
+            return
+
+        self.stdout.write(f'Re-extracting {len(entries)} pages with {workers} processes')
+        started = time.perf_counter()
+        chunks = [entries[start:start + chunk_size] for start in range(0, len(entries), chunk_size)]
+        pages_done = 0
+        pages_written = 0
+        errors = 0
+
+        # Workers memory-map the archive themselves; only offsets and
+        # extracted pages cross the process boundary
+        with ProcessPoolExecutor(max_workers=workers) as executor, \
+                open_sink(export_format, output_file, flush_every=options['flush_every']) as sink:
+            for results in executor.map(reextract_worker, repeat(path), chunks):
+                for url, page, error in results:
+                    pages_done += 1
+                    if error:
+                        errors += 1
+                        self.stdout.write(self.style.WARNING(f'Error extracting {url}: {error}'))
+                    elif page['content']:
+                        sink.write(page_row({'url': url, 'title': page['title'], 'content': page['content']}))
+                        pages_written += 1
+                self.stdout.write(f'Extracted {pages_done}/{len(entries)} pages')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Re-extracted {pages_done} pages in {elapsed:.1f}s ({pages_done / elapsed if elapsed else 0:.1f} pages/s): '
+            f'{pages_written} with content, {errors} errors.'
+        ))
+        self.stdout.write(f'Saved results to {os.path.abspath(output_file)}')
@@ -0,0 +1,351 @@
+import contextlib
+import json
+import logging
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+logger = logging.getLogger(__name__)
+
+# Hot-path stages timed during a crawl, in pipeline order
+STAGES = ('politeness_wait', 'fetch', 'render_wait', 'parse', 'extract', 'links', 'export', 'index')
+
+_NULL_TIMER = contextlib.nullcontext()
+
+
+def error_class(exc):
+    """
+    Name of the exception that actually caused exc.
+
+    The fetch helpers re-raise failures as a plain Exception with a message,
+    so the original error (Timeout, ConnectionError, ...) is found by
+    following the exception chain.
+    """
+    while type(exc) is Exception and (exc.__cause__ or exc.__context__) is not None:
+        exc = exc.__cause__ or exc.__context__
+    return type(exc).__name__
+
+
+class NullMetrics:
+    """Metrics sink used outside instrumented crawls; every call is a no-op"""
+
+    def time(self, stage):
+        return _NULL_TIMER
+
+    def add_bytes(self, count):
+        pass
+
+    def merge_timings(self, timings, page=None):
+        pass
+
+    @contextlib.contextmanager
+    def page(self, url):
+        yield PageMetrics(url)
+
+    def attribute_to(self, page):
+        return _NULL_TIMER
+
+    def record_page(self, page):
+        pass
+
+
+NULL_METRICS = NullMetrics()
+
+
+class PageMetrics:
+    """What one page cost: engine, bytes, error class and seconds per stage"""
+
+    __slots__ = ('url', 'engine', 'bytes', 'error', 'stages', 'started')
+
+    def __init__(self, url):
+        self.url = url
+        self.engine = None
+        self.bytes = 0
+        self.error = None
+        self.stages = defaultdict(float)
+        self.started = time.perf_counter()
+
+
+class CrawlMetrics:
+    """
+    Per-stage timers and counters for one crawl.
+
+    Stage timers nest: time spent in an inner stage (e.g. render_wait inside
+    fetch) is subtracted from the outer one, so the stage totals add up to
+    the time actually spent. Timers are thread-safe, and timings measured in
+    another process can be folded in with merge_timings().
+
+    Every page is emitted as a JSON log line on the 'scraper.metrics' logger
+    and every stage, page, byte and error is also added to the process-wide
+    MetricsRegistry served by the /metrics/ endpoint.
+
+    Args:
+        crawl (str): Crawler name used in logs and metric labels (default: 'crawl')
+        registry (MetricsRegistry): Where totals are exported (default: the
+            process-wide one)
+    """
+
+    def __init__(self, crawl='crawl', registry=None):
+        self.crawl = crawl
+        self.registry = registry or get_metrics_registry()
+        self.stage_seconds = defaultdict(float)
+        self.stage_calls = Counter()
+        self.engines = Counter()
+        self.errors = Counter()
+        self.bytes_downloaded = 0
+        self.pages = 0
+        self.started = time.perf_counter()
+        self.finished = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def time(self, stage):
+        """Time a block as stage, excluding any stages timed inside it"""
+        stack = self._local.__dict__.setdefault('stack', [])
+        stack.append(0.0)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            self._add(stage, elapsed - nested)
+
+    def _add(self, stage, seconds, calls=1):
+        page = getattr(self._local, 'page', None)
+        if page is not None:
+            page.stages[stage] += seconds
+        with self._lock:
+            self.stage_seconds[stage] += seconds
+            self.stage_calls[stage] += calls
+        self.registry.add_stage(self.crawl, stage, seconds, calls)
+
+    def merge_timings(self, timings, page=None):
+        """Add {stage: seconds} measured elsewhere, e.g. in an extraction process"""
+        with self.attribute_to(page):
+            for stage, seconds in timings.items():
+                self._add(stage, seconds)
+
+    def add_bytes(self, count):
+        """Count bytes downloaded for the current page"""
+        page = getattr(self._local, 'page', None)
+        if page is not None:
+            page.bytes += count
+        with self._lock:
+            self.bytes_downloaded += count
+        self.registry.add_bytes(self.crawl, count)
+
+    @contextlib.contextmanager
+    def page(self, url):
+        """
+        Attribute the stages and bytes measured on this thread to url.
+
+        The PageMetrics yielded is filled in by the block (engine, error) and
+        recorded when it exits.
+        """
+        page = PageMetrics(url)
+        try:
+            with self.attribute_to(page):
+                yield page
+        finally:
+            self.record_page(page)
+
+    @contextlib.contextmanager
+    def attribute_to(self, page):
+        """Attribute what this thread measures to page until the block exits"""
+        previous = getattr(self._local, 'page', None)
+        self._local.page = page
+        try:
+            yield page
+        finally:
+            self._local.page = previous
+
+    def record_page(self, page):
+        """Count a finished page and log it as one JSON line"""
+        with self._lock:
+            self.pages += 1
+            if page.engine:
+                self.engines[page.engine] += 1
+            if page.error:
+                self.errors[page.error] += 1
+        self.registry.add_page(self.crawl, page.engine, page.error)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                'event': 'page',
+                'crawl': self.crawl,
+                'url': page.url,
+                'engine': page.engine,
+                'bytes': page.bytes,
+                'error': page.error,
+                'seconds': round(time.perf_counter() - page.started, 6),
+                'stages': {stage: round(seconds, 6) for stage, seconds in page.stages.items()},
+            }))
+
+    def finish(self):
+        """Stop the crawl clock, log the summary and return it"""
+        if self.finished is None:
+            self.finished = time.perf_counter()
+            self.registry.add_crawl(self.crawl, self.finished - self.started)
+        summary = self.summary()
+        logger.info(json.dumps({'event': 'crawl', 'crawl': self.crawl, **summary}))
+        return summary
+
+    def summary(self):
+        """JSON-friendly totals, as added to crawl results under "metrics" """
+        with self._lock:
+            elapsed = (self.finished or time.perf_counter()) - self.started
+            return {
+                'seconds': round(elapsed, 6),
+                'pages': self.pages,
+                'pages_per_second': round(self.pages / elapsed, 3) if elapsed else None,
+                'bytes_downloaded': self.bytes_downloaded,
+                'stages': {
+                    stage: {'seconds': round(self.stage_seconds[stage], 6), 'calls': self.stage_calls[stage]}
+                    for stage in sorted(self.stage_seconds, key=_stage_order)
+                },
+                'engines': dict(self.engines),
+                'errors': dict(self.errors),
+            }
+
+
+def _stage_order(stage):
+    return (STAGES.index(stage) if stage in STAGES else len(STAGES), stage)
+
+
+class MetricsRegistry:
+    """
+    Process-wide crawl counters, rendered in the Prometheus text format.
+
+    Counters only ever grow, so a scraper polling /metrics/ sees rates across
+    crawls, including crawls still in progress.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stage_seconds = Counter()
+        self._stage_calls = Counter()
+        self._pages = Counter()
+        self._errors = Counter()
+        self._bytes = Counter()
+        self._crawls = Counter()
+        self._crawl_seconds = Counter()
+
+    def add_stage(self, crawl, stage, seconds, calls=1):
+        with self._lock:
+            self._stage_seconds[crawl, stage] += seconds
+            self._stage_calls[crawl, stage] += calls
+
+    def add_bytes(self, crawl, count):
+        with self._lock:
+            self._bytes[crawl] += count
+
+    def add_page(self, crawl, engine, error):
+        with self._lock:
+            self._pages[crawl, engine or 'none'] += 1
+            if error:
+                self._errors[crawl, error] += 1
+
+    def add_crawl(self, crawl, seconds):
+        with self._lock:
+            self._crawls[crawl] += 1
+            self._crawl_seconds[crawl] += seconds
+
+    def render_prometheus(self):
+        """Every counter in the Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+
+        def counter(name, help_text, values, labels):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            for key, value in sorted(values.items()):
+                key = key if isinstance(key, tuple) else (key,)
+                label_text = ','.join(f'{label}="{_escape_label(str(part))}"' for label, part in zip(labels, key))
+                value = repr(float(value)) if isinstance(value, float) else str(value)
+                lines.append(f'{name}{{{label_text}}} {value}' if label_text else f'{name} {value}')
+
+        with self._lock:
+            counter('scraper_stage_seconds_total', 'Time spent in each crawl stage.', self._stage_seconds, ('crawl', 'stage'))
+            counter('scraper_stage_calls_total', 'Times each crawl stage ran.', self._stage_calls, ('crawl', 'stage'))
+            counter('scraper_pages_total', 'Pages crawled, by engine.', self._pages, ('crawl', 'engine'))
+            counter('scraper_errors_total', 'Pages that failed, by error class.', self._errors, ('crawl', 'error'))
+            counter('scraper_bytes_downloaded_total', 'Response bytes downloaded.', self._bytes, ('crawl',))
+            counter('scraper_crawls_total', 'Crawls finished.', self._crawls, ('crawl',))
+            counter('scraper_crawl_seconds_total', 'Wall-clock time of finished crawls.', self._crawl_seconds, ('crawl',))
+        return '\n'.join(lines) + '\n'
+
+
+def _escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics_registry():
+    """Return the process-wide MetricsRegistry"""
+    return _registry
+
+
+class SamplingProfiler:
+    """
+    Low-overhead sampling profiler for a single crawl.
+
+    A background thread snapshots the stacks of every other thread every
+    interval seconds; nothing is hooked into the code being profiled. The
+    samples are written as collapsed stacks ("thread;outer;...;inner count"
+    per line), which flamegraph.pl, speedscope and inferno read directly.
+
+        with SamplingProfiler('crawl.folded'):
+            scraper.crawl_website(url)
+
+    Args:
+        path (str): File the collapsed stacks are written to on stop()
+        interval (float): Seconds between samples (default: 0.005)
+    """
+
+    def __init__(self, path, interval=0.005):
+        self.path = path
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='scraper-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.write()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f'{code.co_name} ({code.co_filename}:{code.co_firstlineno})')
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def write(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f'{stack} {count}\n')
@@ -0,0 +1,72 @@
+from django.db import migrations, models
+import django.db.models.deletion
+import scraper.models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CrawlJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seed_url', models.CharField(max_length=2048)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=16)),
+                ('max_depth', models.PositiveIntegerField(default=0)),
+                ('max_pages', models.PositiveIntegerField(default=0)),
+                ('pages_stored', models.PositiveIntegerField(default=0)),
+                ('links_stored', models.PositiveIntegerField(default=0)),
+                ('stats', models.JSONField(blank=True, default=dict)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['seed_url'], name='scraper_crawljob_seed_url')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Page',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.CharField(max_length=2048)),
+                ('title', models.TextField(blank=True)),
+                ('word_count', models.PositiveIntegerField(default=0)),
+                ('content_hash', models.CharField(blank=True, max_length=40)),
+                ('engine', models.CharField(blank=True, max_length=16)),
+                ('fetched_at', models.DateTimeField(auto_now_add=True)),
+                ('text', scraper.models.CompressedTextField(null=True)),
+                ('blocks', scraper.models.CompressedTextField(null=True)),
+                ('html', scraper.models.CompressedTextField(null=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pages', to='scraper.crawljob')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['url'], name='scraper_page_url')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='page',
+            constraint=models.UniqueConstraint(fields=('job', 'url'), name='scraper_page_job_url'),
+        ),
+        migrations.CreateModel(
+            name='Link',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_url', models.CharField(blank=True, max_length=2048)),
+                ('url', models.CharField(max_length=2048)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='links', to='scraper.crawljob')),
+            ],
+            options={
+                'indexes': [
+                    models.Index(fields=['job', 'source_url'], name='scraper_link_job_source'),
+                    models.Index(fields=['url'], name='scraper_link_url'),
+                ],
+            },
+        ),
+    ]
@@ -1,3 +1,150 @@
+import json
+
 from django.db import models
 
-# Create your models here.
+from .compression import compress, decompress
+from .extraction import blocks_from_dicts, json_default
+
+URL_MAX_LENGTH = 2048
+
+
+class CompressedTextField(models.BinaryField):
+    """
+    Text stored compressed (see scraper/compression.py).
+
+    Values are str in Python and compressed bytes in the database; the codec
+    is recorded with every value, so rows written with zlib stay readable
+    after zstandard is installed and vice versa.
+    """
+
+    description = 'Compressed text'
+
+    def __init__(self, *args, codec=None, level=None, **kwargs):
+        self.codec = codec
+        self.level = level
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.codec is not None:
+            kwargs['codec'] = self.codec
+        if self.level is not None:
+            kwargs['level'] = self.level
+        return name, path, args, kwargs
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if isinstance(value, str):
+            value = compress(value.encode('utf-8'), self.codec, self.level)
+        return super().get_db_prep_value(value, connection, prepared)
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return None
+        return decompress(value).decode('utf-8')
+
+    def to_python(self, value):
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return decompress(value).decode('utf-8')
+        return value
+
+
+class CrawlJob(models.Model):
+    """A stored crawl; its pages and links reference it"""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    seed_url = models.CharField(max_length=URL_MAX_LENGTH)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED)
+    max_depth = models.PositiveIntegerField(default=0)
+    max_pages = models.PositiveIntegerField(default=0)
+    pages_stored = models.PositiveIntegerField(default=0)
+    links_stored = models.PositiveIntegerField(default=0)
+    # engines, duplicates, metrics, ... from the crawl result
+    stats = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['seed_url'], name='scraper_crawljob_seed_url')]
+
+    def __str__(self):
+        return f'{self.seed_url} ({self.status})'
+
+
+class PageQuerySet(models.QuerySet):
+    def with_bodies(self):
+        """Also load the compressed text, blocks and HTML in the same query"""
+        return self.defer(None)
+
+
+class PageManager(models.Manager.from_queryset(PageQuerySet)):
+    # Bodies are decompressed on first access instead of for every row listed
+    def get_queryset(self):
+        return super().get_queryset().defer(*Page.BODY_FIELDS)
+
+
+class Page(models.Model):
+    """
+    One crawled page. text, blocks and html are stored compressed and are
+    not loaded by Page.objects until accessed (or .with_bodies() is used).
+    """
+
+    BODY_FIELDS = ('text', 'blocks', 'html')
+
+    job = models.ForeignKey(CrawlJob, on_delete=models.CASCADE, related_name='pages')
+    url = models.CharField(max_length=URL_MAX_LENGTH)
+    title = models.TextField(blank=True)
+    word_count = models.PositiveIntegerField(default=0)
+    content_hash = models.CharField(max_length=40, blank=True)
+    engine = models.CharField(max_length=16, blank=True)
+    fetched_at = models.DateTimeField(auto_now_add=True)
+    text = CompressedTextField(null=True)
+    # JSON list of ContentBlock dicts (see scraper/extraction.py)
+    blocks = CompressedTextField(null=True)
+    html = CompressedTextField(null=True)
+
+    objects = PageManager()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['job', 'url'], name='scraper_page_job_url')]
+        indexes = [models.Index(fields=['url'], name='scraper_page_url')]
+
+    def __str__(self):
+        return self.url
+
+    def content_blocks(self):
+        """The stored ContentBlocks, or [] if only text was stored"""
+        return blocks_from_dicts(json.loads(self.blocks)) if self.blocks else []
+
+    def set_content_blocks(self, blocks):
+        self.blocks = json.dumps(blocks, ensure_ascii=False, default=json_default)
+
+    def to_page_data(self):
+        """The page as crawl_website() returns it"""
+        return {'url': self.url, 'title': self.title, 'content': self.content_blocks()}
+
+
+class Link(models.Model):
+    """
+    A link discovered during a crawl. source_url is the page it was found
+    on, or '' when the crawl only reported the set of discovered links.
+    """
+
+    job = models.ForeignKey(CrawlJob, on_delete=models.CASCADE, related_name='links')
+    source_url = models.CharField(max_length=URL_MAX_LENGTH, blank=True)
+    url = models.CharField(max_length=URL_MAX_LENGTH)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['job', 'source_url'], name='scraper_link_job_source'),
+            models.Index(fields=['url'], name='scraper_link_url'),
+        ]
+
+    def __str__(self):
+        return f'{self.source_url} -> {self.url}'
@@ -0,0 +1,440 @@
+import multiprocessing
+import os
+import queue
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from .adaptive import ENGINES, EngineSelector
+from .archive import RENDERED_CONTENT_TYPE
+from .dedup import NearDuplicateDetector, page_text, simhash
+from .http_client import HttpStatusError, decode_body
+from .metrics import CrawlMetrics, MetricsRegistry, PageMetrics, error_class
+from .sinks import page_row
+
+# Per-process state of the extraction workers, created on first use
+_worker_scraper = None
+_worker_selector = None
+_worker_registry = None
+
+
+def extract_worker(url, body, content_type, min_words=50, fingerprint=False, learned=None):
+    """
+    Parse and extract one page inside an extraction process.
+
+    The page arrives as the raw response bytes (a single copy through the
+    pipe, and smaller than the decoded str) and is decoded here. learned is
+    the parent's ExtractorRegistry.learned() for the URL, so every process
+    starts from the selector any of them found for the domain.
+
+    Returns:
+        tuple: (extract_page() result, needs rendering, word count, simhash
+        or None, {stage: seconds} spent parsing and extracting, extractor
+        stats of this page, learned() for the URL after extraction)
+    """
+    global _worker_scraper, _worker_selector, _worker_registry
+    if _worker_scraper is None:
+        from .utils import WebScraper
+
+        _worker_scraper = WebScraper()
+        _worker_selector = EngineSelector(min_words)
+        # Timings are sent back with each page, so nothing is exported here
+        _worker_registry = MetricsRegistry()
+
+    metrics = _worker_scraper.metrics = CrawlMetrics('extract_worker', _worker_registry)
+    extractors = _worker_scraper.extractors
+    if learned is not None:
+        extractors.adopt(url, learned)
+    extractor_stats_before = extractors.stats()
+    html = decode_body(body, content_type)
+    page = _worker_scraper.extract_page(html, url)
+    needs_rendering = _worker_selector.needs_rendering(html, page)
+    words = _worker_selector.word_count(page)
+    # None too when the page is too short to fingerprint; check() skips those
+    page_hash = simhash(page_text(page['content'])) if fingerprint and page['content'] else None
+    extractor_stats = extractors.stats(since=extractor_stats_before)
+    extractor_stats.pop('hit_rate')
+    return page, needs_rendering, words, page_hash, dict(metrics.stage_seconds), extractor_stats, extractors.learned(url)
+
+
+class _Task:
+    """A URL moving through the pipeline"""
+
+    __slots__ = ('url', 'depth', 'mode', 'response', 'static_words', 'static_page', 'metrics')
+
+    def __init__(self, url, depth):
+        self.url = url
+        self.depth = depth
+        self.mode = None
+        self.response = None
+        self.static_words = None
+        # (page, simhash) of a probe that was sent to rendering
+        self.static_page = None
+        self.metrics = PageMetrics(url)
+
+
+class PipelinedCrawler:
+    """
+    Crawl with fetching, extraction, link discovery and export overlapped.
+
+    Stages are connected by queues:
+
+    - fetch: fetch_workers threads download pages over HTTP (with the HTTP
+      cache's conditional GET when one is set)
+    - extract: a process pool parses and extracts the raw bytes, so lxml and
+      content-block building use every core instead of holding the GIL
+    - link discovery: the calling thread deduplicates pages, feeds new links
+      to the frontier and renders pages that need Playwright (the sync
+      browser is bound to the thread that started it)
+    - sink: a thread collects pages or writes them to an ExportSink, and
+      adds them to the scraper's search index
+
+    At most queue_size pages are between the frontier and link discovery at
+    any time, and the sink queue holds at most queue_size pages, so a slow
+    stage stalls the ones before it instead of letting memory grow.
+
+    Args:
+        scraper (WebScraper): Supplies the HTTP client, cache, browser and
+            per-domain engine decisions
+        extract_workers (int): Extraction processes (default: CPU count)
+        fetch_workers (int): Fetch threads (default: 4)
+        queue_size (int): Pages in flight and sink queue size (default: 32)
+    """
+
+    def __init__(self, scraper, extract_workers=None, fetch_workers=4, queue_size=32):
+        self.scraper = scraper
+        self.extract_workers = extract_workers or os.cpu_count() or 1
+        self.fetch_workers = max(1, fetch_workers)
+        self.queue_size = max(1, queue_size)
+
+    def _fetch(self, task, engine, results, politeness=None):
+        """Fetch stage: decide the engine and download the page, or hand it to rendering"""
+        with self.scraper.metrics.attribute_to(task.metrics):
+            self._fetch_page(task, engine, results, politeness)
+
+    def _fetch_page(self, task, engine, results, politeness):
+        scraper = self.scraper
+        metrics = scraper.metrics
+        if politeness:
+            if not politeness.allowed(task.url):
+                results.put(('blocked', task, None))
+                return
+            with metrics.time('politeness_wait'):
+                politeness.wait(task.url)
+        # Forced Playwright crawls always render and bypass the cache
+        cache = scraper.http_cache if engine != 'playwright' else None
+        mode = engine
+        if mode == 'adaptive':
+            mode = scraper.engine_selector.engine_for(task.url)
+            if mode is None:
+                mode = 'playwright' if scraper.is_dynamic_site(task.url) else 'probe'
+        task.mode = mode
+
+        entry = None
+        headers = None
+        if cache is not None:
+            entry = cache.get(scraper.canonicalizer.key(task.url))
+            headers = cache.conditional_headers(entry)
+
+        response = None
+        error = None
+        # Rendered pages are still revalidated when there is a cache to check
+        if cache is not None or mode != 'playwright':
+            try:
+                with metrics.time('fetch'):
+                    response = scraper.http.get(task.url, headers=headers)
+                metrics.add_bytes(len(response.content))
+            except Exception as e:
+                error = e
+            if cache is not None and cache.is_fresh(entry, response):
+                results.put(('cached', task, entry['page']))
+                return
+            if response is not None and not 200 <= response.status_code < 300:
+                error = HttpStatusError(f"HTTP {response.status_code} for url: {task.url}", response.status_code)
+                response = None
+
+        task.response = response
+        if mode == 'probe' and isinstance(error, HttpStatusError):
+            # The server answered with an error; rendering would not help
+            raise error
+        if mode == 'requests' and response is None:
+            raise Exception(f"Failed to fetch with requests: {str(error)}")
+        results.put(('fetched' if mode != 'playwright' and response is not None else 'render', task, None))
+
+    def crawl(self, seed_url, max_depth=5, max_pages=1000, strategy='bfs', engine='adaptive',
+              dedup=True, prune_duplicates=False, sink=None, progress=None, polite=True, sitemaps=False,
+              sitemap_only=False, export_row=None, max_rows=0):
+        """
+        Crawl from seed_url and return the crawl_website() result dict.
+
+        With a sink, export_row turns each page into its row (None skips the
+        page; default: page_row) and the crawl stops once max_rows rows are
+        written (0: no limit).
+        """
+        export_row = export_row or page_row
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {', '.join(ENGINES)}")
+        scraper = self.scraper
+        selector = scraper.engine_selector
+        cache = scraper.http_cache
+        metrics = scraper.metrics
+        seed_url = scraper._normalize_url(seed_url)
+        base_domain_root = scraper._get_base_domain_root(seed_url)
+
+        visited = set()
+        all_links = set()
+        pages_data = []
+        pages_written = 0
+        engine_counts = Counter()
+        cache_stats_before = cache.stats() if cache else None
+        extractor_stats_before = scraper.extractors.stats()
+        duplicates = NearDuplicateDetector() if dedup or prune_duplicates else None
+        errors = 0
+        last_error = None
+        politeness = scraper.get_politeness() if polite else None
+        to_visit = scraper._new_frontier(strategy, politeness)
+        crawled = set()
+        canonical_duplicates = 0
+        scraper._seed_frontier(to_visit, seed_url, max_pages, sitemaps, sitemap_only)
+        in_flight = 0
+        robots_blocked = 0
+
+        fetch_queue = queue.Queue(maxsize=self.queue_size)
+        # Never holds more than the pages in flight, so it needs no bound of
+        # its own; leaving it unbounded means workers can never block on it
+        results = queue.Queue()
+        sink_queue = queue.Queue(maxsize=self.queue_size)
+
+        def fetch_stage():
+            while True:
+                task = fetch_queue.get()
+                if task is None:
+                    return
+                try:
+                    self._fetch(task, engine, results, politeness)
+                except Exception as e:
+                    results.put(('error', task, e))
+
+        sink_errors = []
+        # Pages are indexed by the sink thread, the only one writing to the index
+        index = scraper.search_index.writer() if scraper.search_index else None
+        index_counts = None
+
+        def sink_stage():
+            nonlocal pages_written, index_counts
+            while True:
+                page_data = sink_queue.get()
+                if page_data is None:
+                    if index is not None:
+                        try:
+                            with metrics.time('index'):
+                                index_counts = index.close()
+                        except Exception as e:
+                            sink_errors.append(e)
+                    return
+                if sink_errors:
+                    # Keep draining so the crawl never blocks on a dead sink
+                    continue
+                try:
+                    with metrics.time('export'):
+                        if sink is None:
+                            pages_data.append(page_data)
+                        else:
+                            if max_rows and pages_written >= max_rows:
+                                continue
+                            row = export_row(page_data)
+                            if row is None:
+                                continue
+                            sink.write(row)
+                    pages_written += 1
+                    if index is not None:
+                        with metrics.time('index'):
+                            index.add_page(page_data)
+                except Exception as e:
+                    sink_errors.append(e)
+
+        # spawn rather than fork: this process runs fetch threads and
+        # possibly a Playwright driver, which must not be copied mid-flight
+        extractor = ProcessPoolExecutor(max_workers=self.extract_workers, mp_context=multiprocessing.get_context('spawn'))
+        # Cancelled by hand on exit: shutdown(cancel_futures=True) needs Python 3.9
+        pending = set()
+
+        def extracted(task, future):
+            pending.discard(future)
+            results.put(('extracted', task, future))
+
+        def extract(task, body, content_type):
+            future = extractor.submit(extract_worker, task.url, body, content_type, selector.min_words, duplicates is not None,
+                                      scraper.extractors.learned(task.url))
+            pending.add(future)
+            future.add_done_callback(lambda done: extracted(task, done))
+
+        def render(task):
+            with metrics.attribute_to(task.metrics):
+                html = scraper.fetch_html_playwright(task.url)
+            task.mode = 'playwright' if task.mode == 'playwright' else 'rendered'
+            extract(task, html.encode('utf-8'), RENDERED_CONTENT_TYPE)
+
+        threads = [threading.Thread(target=fetch_stage, name=f'scraper-fetch-{i}', daemon=True) for i in range(self.fetch_workers)]
+        threads.append(threading.Thread(target=sink_stage, name='scraper-sink', daemon=True))
+        for thread in threads:
+            thread.start()
+
+        print(f"Starting pipelined crawl of {seed_url} (domain: {base_domain_root}, max_depth: {max_depth}, "
+              f"max_pages: {max_pages}, extract_workers: {self.extract_workers}, fetch_workers: {self.fetch_workers})")
+
+        try:
+            while True:
+                # Keep the fetch stage fed up to the in-flight limit
+                rows_left = sink is None or not max_rows or pages_written < max_rows
+                while to_visit and in_flight < self.queue_size and len(visited) < max_pages and rows_left:
+                    current_url, depth = to_visit.pop()
+                    if current_url in visited or depth > max_depth or scraper.canonicalizer.key(current_url) in crawled:
+                        continue
+                    if prune_duplicates and not duplicates.should_expand(current_url):
+                        continue
+                    visited.add(current_url)
+                    in_flight += 1
+                    print(f"Crawling [{len(visited)}/{max_pages}]: {current_url}")
+                    fetch_queue.put(_Task(current_url, depth))
+
+                if not in_flight:
+                    break
+
+                kind, task, payload = results.get()
+                if kind == 'blocked':
+                    print(f"Skipping (disallowed by robots.txt): {task.url}")
+                    robots_blocked += 1
+                    visited.discard(task.url)
+                    in_flight -= 1
+                    continue
+                page = None
+                page_hash = None
+                try:
+                    if kind == 'error':
+                        raise payload
+                    if kind == 'render':
+                        render(task)
+                        continue
+                    if kind == 'fetched':
+                        content_type = task.response.headers.get('Content-Type', '')
+                        scraper.archive_response(task.url, task.response)
+                        extract(task, task.response.content, content_type)
+                        if cache is None:
+                            task.response = None
+                        continue
+                    if kind == 'cached':
+                        cache.hit()
+                        page, used_engine = payload, 'cache'
+                    else:
+                        page, needs_rendering, words, page_hash, timings, extractor_stats, learned = payload.result()
+                        metrics.merge_timings(timings, task.metrics)
+                        # Extraction ran in another process: bring back what it learned
+                        scraper.extractors.merge_stats(extractor_stats)
+                        scraper.extractors.adopt(task.url, learned)
+                        if task.mode == 'probe' and needs_rendering:
+                            # Static probe came back empty or SPA-like: render it
+                            task.static_words = words
+                            task.static_page = (page, page_hash)
+                            try:
+                                render(task)
+                                continue
+                            except Exception:
+                                # Rendering failed: keep the thin static page
+                                task.mode = 'static'
+                        if task.mode == 'probe':
+                            selector.remember(task.url, 'requests')
+                            used_engine = 'requests'
+                        elif task.mode == 'static' or (task.static_page is not None and words <= task.static_words):
+                            # Rendering failed or found nothing more than the probe
+                            page, page_hash = task.static_page
+                            used_engine = 'requests'
+                        elif task.mode == 'rendered':
+                            # Only commit the domain to Playwright if rendering helped
+                            if words > (task.static_words or 0):
+                                selector.remember(task.url, 'playwright')
+                            used_engine = 'playwright'
+                        else:
+                            used_engine = task.mode
+                        selector.stats[used_engine] += 1
+                        if cache is not None and engine != 'playwright':
+                            cache.miss()
+                            if task.response is not None:
+                                cache.put(scraper.canonicalizer.key(task.url), task.response, page, used_engine)
+                    engine_counts[used_engine] += 1
+                    task.metrics.engine = used_engine
+
+                    # Link discovery
+                    page_data, page_links = scraper._process_page(None, task.url, base_domain_root, page)
+                    canonical_url = scraper._resolve_canonical(task.url, page, crawled)
+                    if canonical_url is None:
+                        print(f"Skipping duplicate of an already crawled canonical page: {task.url}")
+                        canonical_duplicates += 1
+                        page_data, page_links = None, set()
+                    elif page_data:
+                        page_data['url'] = canonical_url
+                    # Pruning learns from every page, even when duplicates are kept
+                    if page_data and duplicates:
+                        duplicate_of = duplicates.check(task.url, page_text(page_data['content']) if page_hash is None else None, page_hash)
+                        if duplicate_of and dedup:
+                            print(f"Skipping near-duplicate of {duplicate_of}: {task.url}")
+                            page_data = None
+                    if page_data:
+                        sink_queue.put(page_data)
+                    all_links.update(page_links)
+                    if task.depth < max_depth and not sitemap_only:
+                        for link_url in page_links:
+                            to_visit.add(link_url, task.depth + 1)
+                except Exception as e:
+                    print(f"Error crawling {task.url}: {str(e)}")
+                    errors += 1
+                    last_error = f"{task.url}: {str(e)}"
+                    task.metrics.error = error_class(e)
+
+                # Every path that does not hand the task to another stage ends here
+                metrics.record_page(task.metrics)
+                task.response = None
+                in_flight -= 1
+                if progress:
+                    progress({
+                        'pages_done': len(visited) - in_flight,
+                        'queue_size': len(to_visit),
+                        'pages_extracted': pages_written + sink_queue.qsize(),
+                        'errors': errors,
+                        'last_error': last_error,
+                    })
+        finally:
+            for _ in range(self.fetch_workers):
+                fetch_queue.put(None)
+            sink_queue.put(None)
+            for thread in threads:
+                thread.join()
+            for future in list(pending):
+                future.cancel()
+            extractor.shutdown(wait=True)
+        if sink_errors:
+            raise sink_errors[0]
+
+        print(f"Crawl completed. Visited {len(visited)} pages, discovered {len(all_links)} unique links, extracted content from {pages_written} pages.")
+        print(f"Pages per engine: {dict(engine_counts)}")
+
+        result = {
+            "seed_url": seed_url,
+            "total_links": len(all_links),
+            "links": sorted(list(all_links)),
+            "pages": pages_data,
+            "engines": dict(engine_counts),
+            "duplicates": duplicates.duplicates if dedup else 0,
+            "robots_blocked": robots_blocked,
+            "canonical_duplicates": canonical_duplicates,
+            "extractors": scraper.extractors.stats(since=extractor_stats_before)
+        }
+        if sink is not None:
+            result["pages_written"] = pages_written
+        if cache:
+            result["cache"] = {key: value - cache_stats_before[key] for key, value in cache.stats().items()}
+            print(f"HTTP cache: {result['cache']['hits']} hits, {result['cache']['misses']} misses")
+        if index is not None:
+            result["search_index"] = index_counts
+            print(f"Search index: {index_counts}")
+        return result
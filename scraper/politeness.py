@@ -0,0 +1,258 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+from .frontier import STRATEGIES, default_priority
+
+# Product token matched against robots.txt User-agent lines; sites without
+# a group for it get the '*' rules
+ROBOTS_USER_AGENT = 'blogscraper'
+
+
+class RobotsCache:
+    """
+    robots.txt per host, fetched once and kept for ttl seconds.
+
+    Following RFC 9309, a missing robots.txt (4xx) allows everything, while
+    a server error or unreachable host disallows everything until the entry
+    is retried after error_ttl seconds.
+
+    Args:
+        http_client (HttpClient): Client used to fetch robots.txt
+        user_agent (str): Token matched against User-agent lines
+        ttl (float): Seconds a fetched robots.txt is trusted (default: 86400)
+        error_ttl (float): Seconds before a failed fetch is retried (default: 300)
+        max_hosts (int): Hosts kept, least recently used dropped first (default: 1024)
+    """
+
+    def __init__(self, http_client, user_agent=ROBOTS_USER_AGENT, ttl=86400, error_ttl=300, max_hosts=1024):
+        self.http = http_client
+        self.user_agent = user_agent
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.max_hosts = max_hosts
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # One fetch per host even when several threads ask at once
+        self._host_locks = {}
+
+    def _fetch(self, origin):
+        parser = RobotFileParser(origin + '/robots.txt')
+        try:
+            response = self.http.get(origin + '/robots.txt')
+        except Exception:
+            parser.disallow_all = True
+            return parser, self.error_ttl
+        if response.status_code >= 500:
+            parser.disallow_all = True
+            return parser, self.error_ttl
+        if response.status_code >= 400:
+            parser.allow_all = True
+        else:
+            parser.parse(response.text.splitlines())
+        return parser, self.ttl
+
+    def get(self, url):
+        """RobotFileParser for url's host, fetching robots.txt if needed"""
+        parsed = urlparse(url)
+        origin = f'{parsed.scheme}://{parsed.netloc.lower()}'
+        with self._lock:
+            entry = self._entries.get(origin)
+            if entry and entry[1] > time.time():
+                self._entries.move_to_end(origin)
+                return entry[0]
+            host_lock = self._host_locks.setdefault(origin, threading.Lock())
+
+        with host_lock:
+            with self._lock:
+                entry = self._entries.get(origin)
+            if entry and entry[1] > time.time():
+                return entry[0]
+            parser, ttl = self._fetch(origin)
+            with self._lock:
+                self._entries[origin] = (parser, time.time() + ttl)
+                self._entries.move_to_end(origin)
+                while len(self._entries) > self.max_hosts:
+                    old_origin, _ = self._entries.popitem(last=False)
+                    self._host_locks.pop(old_origin, None)
+            return parser
+
+    def allowed(self, url):
+        return self.get(url).can_fetch(self.user_agent, url)
+
+    def crawl_delay(self, url):
+        """Crawl-delay in seconds for url's host, or None"""
+        delay = self.get(url).crawl_delay(self.user_agent)
+        return float(delay) if delay is not None else None
+
+    def sitemaps(self, url):
+        """Sitemap URLs listed in url's robots.txt"""
+        return self.get(url).site_maps() or []
+
+
+class _TokenBucket:
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def ready_at(self, now):
+        self.refill(now)
+        return now if self.tokens >= 1 else now + (1 - self.tokens) / self.rate
+
+
+class PolitenessScheduler:
+    """
+    Per-host rate limits plus robots.txt rules for the crawlers.
+
+    Each host gets a token bucket refilled at rate requests per second and
+    holding up to burst requests; a robots.txt Crawl-delay lowers the rate
+    for its host to one request per delay. reserve() takes a token and
+    returns how long the caller must wait before using it.
+
+    Args:
+        http_client (HttpClient): Client used to fetch robots.txt
+        rate (float): Requests per second per host (default: 2)
+        burst (int): Requests a host may receive back to back (default: 2)
+        respect_robots (bool): Check robots.txt and honor Crawl-delay (default: True)
+        robots_ttl (float): Seconds robots.txt is cached (default: 86400)
+        max_crawl_delay (float): Cap for Crawl-delay values (default: 30)
+    """
+
+    def __init__(self, http_client, rate=2.0, burst=2, respect_robots=True, robots_ttl=86400, max_crawl_delay=30):
+        self.rate = rate
+        self.burst = burst
+        self.respect_robots = respect_robots
+        self.max_crawl_delay = max_crawl_delay
+        self.robots = RobotsCache(http_client, ttl=robots_ttl)
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def allowed(self, url):
+        """False if robots.txt disallows url"""
+        return not self.respect_robots or self.robots.allowed(url)
+
+    def _bucket(self, host, url=None):
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            rate, burst = self.rate, self.burst
+            if self.respect_robots and url is not None:
+                delay = self.robots.crawl_delay(url)
+                if delay:
+                    rate, burst = min(rate, 1 / min(delay, self.max_crawl_delay)), 1
+            bucket = self._buckets[host] = _TokenBucket(rate, burst)
+        return bucket
+
+    def ready_at(self, host):
+        """time.monotonic() at which host may get its next request"""
+        with self._lock:
+            bucket = self._buckets.get(host)
+            return bucket.ready_at(time.monotonic()) if bucket else 0
+
+    def reserve(self, url):
+        """Take a request slot for url's host; returns seconds to wait before fetching"""
+        host = urlparse(url).netloc.lower()
+        if host not in self._buckets:
+            # Fetch robots.txt (for Crawl-delay) outside the scheduler lock
+            self.allowed(url)
+        with self._lock:
+            bucket = self._bucket(host, url)
+            now = time.monotonic()
+            bucket.refill(now)
+            bucket.tokens -= 1
+            return 0 if bucket.tokens >= 0 else -bucket.tokens / bucket.rate
+
+    def wait(self, url):
+        """Block until url's host may be fetched"""
+        delay = self.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+
+
+class PoliteFrontier:
+    """
+    Frontier that interleaves hosts according to a PolitenessScheduler.
+
+    URLs are queued per host (in 'bfs' or 'best_first' order within a host).
+    pop() takes the best URL among hosts that may be fetched right away and
+    only falls back to the host that becomes ready soonest, so one slow or
+    rate-limited host does not hold up the rest of the crawl. Interface and
+    seen-set semantics match Frontier.
+
+    Args:
+        scheduler (PolitenessScheduler): Source of per-host readiness
+        strategy (str): 'bfs' (default) or 'best_first'
+        priority (callable): priority(url, depth) used by 'best_first'
+        key (callable): Maps a URL to its seen-set entry (default: the URL)
+    """
+
+    def __init__(self, scheduler, strategy='bfs', priority=None, key=None):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown frontier strategy '{strategy}', expected one of {', '.join(STRATEGIES)}")
+        self.scheduler = scheduler
+        self.strategy = strategy
+        self.priority = priority or default_priority
+        self.key = key
+        self._seen = set()
+        self._hosts = {}
+        self._size = 0
+        self._counter = itertools.count()
+
+    def add(self, url, depth, priority=None):
+        """Queue url unless it was seen before; returns True if it was queued"""
+        seen_key = self.key(url) if self.key else url
+        if seen_key in self._seen:
+            return False
+        self._seen.add(seen_key)
+        if self.strategy == 'bfs':
+            key = depth
+        else:
+            key = priority if priority is not None else self.priority(url, depth)
+        heapq.heappush(self._hosts.setdefault(urlparse(url).netloc.lower(), []), (key, next(self._counter), url, depth))
+        self._size += 1
+        return True
+
+    def pop(self):
+        """Remove and return the next (url, depth) pair, preferring hosts that are ready"""
+        if not self._size:
+            raise IndexError('pop from an empty frontier')
+        now = time.monotonic()
+        best = None
+        for host, queue in self._hosts.items():
+            ready_at = self.scheduler.ready_at(host)
+            candidate = (ready_at > now, ready_at if ready_at > now else 0, queue[0][:2], host)
+            if best is None or candidate < best:
+                best = candidate
+        host = best[3]
+        queue = self._hosts[host]
+        _, _, url, depth = heapq.heappop(queue)
+        if not queue:
+            del self._hosts[host]
+        self._size -= 1
+        return url, depth
+
+    def mark_seen(self, url):
+        self._seen.add(self.key(url) if self.key else url)
+
+    def seen_count(self):
+        return len(self._seen)
+
+    def __contains__(self, url):
+        return (self.key(url) if self.key else url) in self._seen
+
+    def __len__(self):
+        return self._size
+
+    def __bool__(self):
+        return bool(self._size)
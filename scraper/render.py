@@ -0,0 +1,229 @@
+import asyncio
+import contextlib
+import time
+from urllib.parse import urlparse
+
+from .metrics import NULL_METRICS
+
+LOAD_MORE_SELECTORS = [
+    'button:has-text("Load more")',
+    'button:has-text("Load More")',
+    'button:has-text("Show more")',
+    '.load-more',
+    '[data-testid="load-more"]'
+]
+
+# Analytics and ad hosts whose requests never contribute to page content
+TRACKER_HOSTS = (
+    'google-analytics.com', 'googletagmanager.com', 'doubleclick.net', 'googlesyndication.com',
+    'adservice.google.com', 'facebook.net', 'connect.facebook.net', 'hotjar.com', 'segment.io',
+    'scorecardresearch.com', 'quantserve.com', 'taboola.com', 'outbrain.com', 'criteo.com',
+)
+
+SCROLL_TO_BOTTOM_JS = "window.scrollTo(0, document.body.scrollHeight);"
+
+# Resolves once the DOM has gone quiet_ms without a mutation, or after
+# timeout_ms at the latest. Returns the milliseconds spent waiting.
+WAIT_FOR_DOM_SETTLE_JS = """
+([quietMs, timeoutMs]) => new Promise(resolve => {
+    const start = performance.now();
+    let quietTimer = null;
+    let capTimer = null;
+    let observer = null;
+    const done = () => {
+        if (observer) observer.disconnect();
+        clearTimeout(quietTimer);
+        clearTimeout(capTimer);
+        resolve(performance.now() - start);
+    };
+    observer = new MutationObserver(() => {
+        clearTimeout(quietTimer);
+        quietTimer = setTimeout(done, quietMs);
+    });
+    observer.observe(document.documentElement, {childList: true, subtree: true, characterData: true});
+    quietTimer = setTimeout(done, quietMs);
+    capTimer = setTimeout(done, timeoutMs);
+})
+"""
+
+
+class RenderPolicy:
+    """
+    Timing and resource policy for rendering a page with Playwright.
+
+    Args:
+        block_resources (iterable): Playwright resource types to abort,
+            e.g. 'image', 'media', 'font', 'stylesheet'
+        block_trackers (bool): Abort requests to known analytics/ad hosts
+        wait_for_network_idle (bool): Wait for 'networkidle' after navigation
+        network_idle_timeout (int): Milliseconds to wait for 'networkidle'
+        settle (str): 'fixed' sleeps for the *_wait durations below;
+            'mutation' waits until the DOM stops changing instead
+        settle_quiet_ms (int): DOM quiet period that counts as settled
+        settle_timeout_ms (int): Upper bound on each settle wait
+        scroll_wait (float): Seconds after scrolling ('fixed' settle only)
+        load_more_wait (float): Seconds after clicking "Load more" ('fixed' only)
+        final_wait (float): Seconds after the final scroll ('fixed' only)
+        click_load_more (bool): Try to click a "Load more" button
+        navigation_timeout (int): Milliseconds allowed for page.goto()
+    """
+
+    def __init__(self, block_resources=(), block_trackers=False, wait_for_network_idle=True,
+                 network_idle_timeout=15000, settle='fixed', settle_quiet_ms=500, settle_timeout_ms=5000,
+                 scroll_wait=1.0, load_more_wait=1.0, final_wait=0.5, click_load_more=True,
+                 navigation_timeout=30000):
+        if settle not in ('fixed', 'mutation'):
+            raise ValueError(f"Unknown settle mode '{settle}', expected 'fixed' or 'mutation'")
+        self.block_resources = frozenset(block_resources)
+        self.block_trackers = block_trackers
+        self.wait_for_network_idle = wait_for_network_idle
+        self.network_idle_timeout = network_idle_timeout
+        self.settle = settle
+        self.settle_quiet_ms = settle_quiet_ms
+        self.settle_timeout_ms = settle_timeout_ms
+        self.scroll_wait = scroll_wait
+        self.load_more_wait = load_more_wait
+        self.final_wait = final_wait
+        self.click_load_more = click_load_more
+        self.navigation_timeout = navigation_timeout
+
+    @classmethod
+    def legacy(cls):
+        """Fixed sleeps and full resource loading (the original behaviour)"""
+        return cls()
+
+    @classmethod
+    def fast(cls):
+        """Skip images, media, fonts and trackers; wait for DOM quiescence"""
+        return cls(
+            block_resources=('image', 'media', 'font'),
+            block_trackers=True,
+            wait_for_network_idle=False,
+            settle='mutation',
+            settle_quiet_ms=300,
+            settle_timeout_ms=3000,
+        )
+
+    @classmethod
+    def resolve(cls, policy):
+        """Accept a RenderPolicy, 'fast', 'legacy' or None (legacy)"""
+        if policy is None or policy == 'legacy':
+            return cls.legacy()
+        if policy == 'fast':
+            return cls.fast()
+        if isinstance(policy, cls):
+            return policy
+        raise ValueError(f"Unknown render policy {policy!r}, expected 'fast', 'legacy' or a RenderPolicy")
+
+    @property
+    def routes_requests(self):
+        return bool(self.block_resources) or self.block_trackers
+
+    def should_block(self, request):
+        if request.resource_type in self.block_resources:
+            return True
+        if self.block_trackers:
+            host = urlparse(request.url).hostname or ''
+            return any(host == tracker or host.endswith('.' + tracker) for tracker in TRACKER_HOSTS)
+        return False
+
+
+def render_page(page, url, policy, metrics=NULL_METRICS):
+    """
+    Navigate page to url and return its HTML once rendering has settled.
+
+    Time spent waiting for the network or DOM to settle is timed as the
+    'render_wait' stage of metrics.
+    """
+    if policy.routes_requests:
+        page.route('**/*', lambda route: route.abort() if policy.should_block(route.request) else route.continue_())
+
+    # Navigate and wait for network idle
+    page.goto(url, wait_until='domcontentloaded', timeout=policy.navigation_timeout)
+    if policy.wait_for_network_idle:
+        try:
+            with metrics.time('render_wait'):
+                page.wait_for_load_state('networkidle', timeout=policy.network_idle_timeout)
+        except Exception:
+            # If networkidle times out, just continue
+            pass
+
+    def settle(seconds):
+        with metrics.time('render_wait'):
+            if policy.settle == 'mutation':
+                page.evaluate(WAIT_FOR_DOM_SETTLE_JS, [policy.settle_quiet_ms, policy.settle_timeout_ms])
+            elif seconds:
+                time.sleep(seconds)
+
+    # Scroll to bottom to trigger lazy loading
+    page.evaluate(SCROLL_TO_BOTTOM_JS)
+    settle(policy.scroll_wait)
+
+    # Try to find and click "Load more" buttons (quick check)
+    if policy.click_load_more:
+        for selector in LOAD_MORE_SELECTORS:
+            try:
+                load_button = page.query_selector(selector)
+                if load_button and load_button.is_visible():
+                    load_button.click()
+                    settle(policy.load_more_wait)
+                    break
+            except Exception:
+                continue
+
+    # Additional scroll
+    page.evaluate(SCROLL_TO_BOTTOM_JS)
+    settle(policy.final_wait)
+
+    return page.content()
+
+
+async def async_render_page(page, url, policy, timed=None):
+    """
+    Async counterpart of render_page() for playwright.async_api pages.
+
+    timed(stage), if given, returns a context manager timing its block as
+    stage (e.g. AsyncCrawler._timed); waits are timed as 'render_wait'.
+    """
+    timed = timed or contextlib.nullcontext
+    if policy.routes_requests:
+        async def handle_route(route):
+            if policy.should_block(route.request):
+                await route.abort()
+            else:
+                await route.continue_()
+        await page.route('**/*', handle_route)
+
+    await page.goto(url, wait_until='domcontentloaded', timeout=policy.navigation_timeout)
+    if policy.wait_for_network_idle:
+        try:
+            with timed('render_wait'):
+                await page.wait_for_load_state('networkidle', timeout=policy.network_idle_timeout)
+        except Exception:
+            pass
+
+    async def settle(seconds):
+        with timed('render_wait'):
+            if policy.settle == 'mutation':
+                await page.evaluate(WAIT_FOR_DOM_SETTLE_JS, [policy.settle_quiet_ms, policy.settle_timeout_ms])
+            elif seconds:
+                await asyncio.sleep(seconds)
+
+    await page.evaluate(SCROLL_TO_BOTTOM_JS)
+    await settle(policy.scroll_wait)
+
+    if policy.click_load_more:
+        for selector in LOAD_MORE_SELECTORS:
+            try:
+                load_button = await page.query_selector(selector)
+                if load_button and await load_button.is_visible():
+                    await load_button.click()
+                    await settle(policy.load_more_wait)
+                    break
+            except Exception:
+                continue
+
+    await page.evaluate(SCROLL_TO_BOTTOM_JS)
+    await settle(policy.final_wait)
+
+    return await page.content()
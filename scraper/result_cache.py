@@ -0,0 +1,154 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from .canonical import get_canonicalizer
+
+
+class LRUCache:
+    """Bounded, thread-safe in-process cache with the get/set subset of Django's API"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value, timeout=None):
+        # Entries carry their own timestamps, so timeout is not needed here
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+
+def _django_cache(alias):
+    """The configured Django cache, or None outside a configured Django project"""
+    try:
+        from django.conf import settings
+        if not settings.configured:
+            return None
+        from django.core.cache import caches
+        from django.core.cache.backends.dummy import DummyCache
+        cache = caches[alias]
+    except Exception:
+        return None
+    return None if isinstance(cache, DummyCache) else cache
+
+
+class ScrapeResultCache:
+    """
+    Cache scrape_url() results with a TTL and stale-while-revalidate.
+
+    Fresh results (younger than ttl) are returned directly. Stale results
+    (up to ttl + stale_ttl old) are returned immediately while a single
+    background refresh runs. Concurrent misses for the same URL collapse into
+    one fetch that every caller waits on. Error results are never cached.
+
+    Args:
+        ttl (float): Seconds a result is fresh (default: 300)
+        stale_ttl (float): Extra seconds a stale result may be served while
+            it is refreshed (default: 3600)
+        max_entries (int): Size of the in-process LRU used when Django's
+            cache is unavailable (default: 256)
+        cache_alias (str): Django cache to use (default: 'default')
+    """
+
+    def __init__(self, ttl=300, stale_ttl=3600, max_entries=256, cache_alias='default', key_prefix='scraper:result:'):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.key_prefix = key_prefix
+        self.backend = _django_cache(cache_alias) or LRUCache(max_entries)
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def _key(self, url):
+        # Link variants of a page (tracking parameters, www., ...) share an entry
+        return self.key_prefix + hashlib.sha1(get_canonicalizer().key(url).encode('utf-8')).hexdigest()
+
+    def get_or_fetch(self, url, fetch):
+        """Return the cached result for url, calling fetch() when needed"""
+        key = self._key(url)
+        entry = self.backend.get(key)
+        if entry is not None:
+            age = time.time() - entry['stored_at']
+            if age < self.ttl:
+                return entry['result']
+            if age < self.ttl + self.stale_ttl:
+                self._refresh_in_background(key, fetch)
+                return entry['result']
+        return self._fetch_once(key, fetch)
+
+    def _fetch_once(self, key, fetch):
+        """Run fetch() once per key; concurrent callers wait for the same result"""
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = {'done': threading.Event(), 'result': None, 'error': None}
+
+        if not leader:
+            flight['done'].wait()
+            if flight['error'] is not None:
+                raise flight['error']
+            return flight['result']
+        return self._run(key, flight, fetch)
+
+    def _run(self, key, flight, fetch):
+        """Run fetch() for a flight registered in _inflight, then release it"""
+        try:
+            flight['result'] = fetch()
+            if not flight['result'].get('error'):
+                self.backend.set(key, {'result': flight['result'], 'stored_at': time.time()}, self.ttl + self.stale_ttl)
+            return flight['result']
+        except Exception as e:
+            flight['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight['done'].set()
+
+    def _refresh_in_background(self, key, fetch):
+        def refresh(flight):
+            try:
+                self._run(key, flight, fetch)
+            except Exception as e:
+                print(f"Background refresh failed: {str(e)}")
+
+        # Claimed and started under the lock, so concurrent stale hits start one refresh
+        with self._lock:
+            if key in self._inflight:
+                return
+            flight = self._inflight[key] = {'done': threading.Event(), 'result': None, 'error': None}
+            threading.Thread(target=refresh, args=(flight,), name='scraper-cache-refresh', daemon=True).start()
+
+
+_result_cache = None
+_result_cache_options = {}
+_result_cache_lock = threading.Lock()
+
+
+def configure_result_cache(**options):
+    """Set ScrapeResultCache options; called from ScraperConfig.ready()"""
+    global _result_cache, _result_cache_options
+    with _result_cache_lock:
+        _result_cache_options = options
+        _result_cache = None
+
+
+def get_result_cache():
+    """Return the process-wide ScrapeResultCache, creating it on first use"""
+    global _result_cache
+    with _result_cache_lock:
+        if _result_cache is None:
+            _result_cache = ScrapeResultCache(**_result_cache_options)
+        return _result_cache
@@ -0,0 +1,355 @@
+import hashlib
+import html
+import re
+import sqlite3
+import threading
+import time
+
+from .dedup import page_text
+
+# Control characters cannot occur in extracted text, so they safely delimit
+# matches in snippets until the text around them has been HTML-escaped
+_MATCH_START = '\x02'
+_MATCH_END = '\x03'
+_QUERY_TERM_RE = re.compile(r'"[^"]*"|[^\s"]+')
+_WORD_RE = re.compile(r'\w+')
+
+
+def fts_query(text):
+    """
+    FTS5 MATCH expression for a search box query.
+
+    Words must all match (prefix matches with a trailing '*'), "quoted text"
+    is a phrase and OR / NOT between terms work as in FTS5. Everything else
+    FTS5 would treat as syntax is quoted away, so no user input is a syntax
+    error. Returns '' for a query without any words.
+    """
+    terms = []
+    for term in _QUERY_TERM_RE.findall(text):
+        if term in ('OR', 'NOT'):
+            if terms and terms[-1] not in ('OR', 'NOT'):
+                terms.append(term)
+            continue
+        words = _WORD_RE.findall(term)
+        if not words:
+            continue
+        phrase = '"' + ' '.join(words) + '"'
+        if term.endswith('*') and not term.startswith('"'):
+            phrase += '*'
+        terms.append(phrase)
+    while terms and terms[-1] in ('OR', 'NOT'):
+        terms.pop()
+    return ' '.join(terms)
+
+
+def content_hash(title, text):
+    return hashlib.sha1(f'{title}\0{text}'.encode('utf-8')).hexdigest()
+
+
+class SearchIndex:
+    """
+    Full-text index of crawled pages in an SQLite FTS5 table.
+
+    Pages are keyed by URL and stored with a hash of their title and text,
+    so re-indexing a recrawled page that has not changed is a lookup rather
+    than a rewrite. Writes go through IndexWriter, which commits a batch of
+    pages per transaction. Search results are ranked with BM25 (title
+    matches weigh more than body matches) and come with a highlighted
+    snippet.
+
+    Every thread gets its own connection; the database runs in WAL mode, so
+    searches are not blocked by a crawl that is indexing. The index creates
+    its own tables and WAL mode applies to the whole file, so it belongs in
+    a database file of its own rather than in the Django database.
+
+    Args:
+        path (str): SQLite database file, created if missing
+        batch_size (int): Pages per write transaction (default: 500)
+        title_weight (float): BM25 weight of title matches relative to
+            body matches (default: 5.0)
+        snippet_tokens (int): Tokens of context per snippet (default: 24)
+        timeout (float): Seconds to wait for another writer's lock (default: 30)
+    """
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS scraper_search_page (
+            id INTEGER PRIMARY KEY,
+            url TEXT NOT NULL UNIQUE,
+            content_hash TEXT NOT NULL,
+            word_count INTEGER NOT NULL,
+            indexed_at REAL NOT NULL
+        );
+        CREATE VIRTUAL TABLE IF NOT EXISTS scraper_search_fts USING fts5(
+            url UNINDEXED, title, content,
+            tokenize = 'porter unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        );
+    '''
+
+    def __init__(self, path, batch_size=500, title_weight=5.0, snippet_tokens=24, timeout=30):
+        self.path = str(path)
+        self.batch_size = max(1, batch_size)
+        self.title_weight = title_weight
+        self.snippet_tokens = max(1, min(snippet_tokens, 64))
+        self.timeout = timeout
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _db(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            # Autocommit mode; write transactions are opened explicitly
+            db = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._ensure_schema(db)
+            self._local.db = db
+        return db
+
+    def _ensure_schema(self, db):
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            try:
+                db.executescript(self.SCHEMA)
+            except sqlite3.OperationalError as e:
+                if 'fts5' in str(e):
+                    raise RuntimeError('The search index requires an SQLite build with FTS5') from e
+                raise
+            # Weights per column (url, title, content); ORDER BY rank uses them
+            db.execute(
+                "INSERT INTO scraper_search_fts (scraper_search_fts, rank) VALUES ('rank', ?)",
+                (f'bm25(0.0, {float(self.title_weight)}, 1.0)',)
+            )
+            self._schema_ready = True
+
+    def writer(self):
+        """An IndexWriter committing batch_size pages per transaction"""
+        return IndexWriter(self, self.batch_size)
+
+    def upsert(self, pages):
+        """
+        Index (url, title, text) tuples in one transaction.
+
+        Returns:
+            dict: Pages "added", "updated" and "unchanged" (same content hash)
+        """
+        # The last version of a URL within a batch wins
+        latest = {url: (title or '', text or '') for url, title, text in pages}
+        counts = {'added': 0, 'updated': 0, 'unchanged': 0}
+        if not latest:
+            return counts
+
+        db = self._db()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            existing = {}
+            urls = list(latest)
+            for start in range(0, len(urls), 500):
+                chunk = urls[start:start + 500]
+                existing.update((url, (page_id, stored_hash)) for url, page_id, stored_hash in db.execute(
+                    f"SELECT url, id, content_hash FROM scraper_search_page WHERE url IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ))
+
+            now = time.time()
+            for url, (title, text) in latest.items():
+                digest = content_hash(title, text)
+                word_count = len(text.split())
+                page_id, stored_hash = existing.get(url, (None, None))
+                if stored_hash == digest:
+                    counts['unchanged'] += 1
+                    continue
+                if page_id is None:
+                    page_id = db.execute(
+                        'INSERT INTO scraper_search_page (url, content_hash, word_count, indexed_at) VALUES (?, ?, ?, ?)',
+                        (url, digest, word_count, now)
+                    ).lastrowid
+                    counts['added'] += 1
+                else:
+                    db.execute(
+                        'UPDATE scraper_search_page SET content_hash = ?, word_count = ?, indexed_at = ? WHERE id = ?',
+                        (digest, word_count, now, page_id)
+                    )
+                    db.execute('DELETE FROM scraper_search_fts WHERE rowid = ?', (page_id,))
+                    counts['updated'] += 1
+                db.execute(
+                    'INSERT INTO scraper_search_fts (rowid, url, title, content) VALUES (?, ?, ?, ?)',
+                    (page_id, url, title, text)
+                )
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+        return counts
+
+    def delete(self, url):
+        """Remove url from the index; returns True if it was indexed"""
+        db = self._db()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute('SELECT id FROM scraper_search_page WHERE url = ?', (url,)).fetchone()
+            if row is not None:
+                db.execute('DELETE FROM scraper_search_fts WHERE rowid = ?', row)
+                db.execute('DELETE FROM scraper_search_page WHERE id = ?', row)
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+        return row is not None
+
+    def search(self, query, limit=20, offset=0):
+        """
+        Pages matching query (see fts_query()), best first.
+
+        Returns:
+            dict: {
+                "query": query,
+                "results": [{"url", "title", "snippet", "score"}, ...] where
+                    snippet is HTML-escaped with matches wrapped in <mark>,
+                "has_more": True if there are results after this page,
+                "took_ms": milliseconds spent searching
+            }
+        """
+        started = time.perf_counter()
+        match = fts_query(query)
+        results = []
+        rows = []
+        if match:
+            rows = self._db().execute(
+                'SELECT url, title, snippet(scraper_search_fts, -1, ?, ?, ?, ?), rank '
+                'FROM scraper_search_fts WHERE scraper_search_fts MATCH ? ORDER BY rank LIMIT ? OFFSET ?',
+                (_MATCH_START, _MATCH_END, '…', self.snippet_tokens, match, limit + 1, offset)
+            ).fetchall()
+            for url, title, snippet, rank in rows[:limit]:
+                results.append({
+                    'url': url,
+                    'title': title,
+                    'snippet': html.escape(snippet).replace(_MATCH_START, '<mark>').replace(_MATCH_END, '</mark>'),
+                    # bm25() is lower for better matches; flip it so higher is better
+                    'score': round(-rank, 4),
+                })
+        return {
+            'query': query,
+            'results': results,
+            'has_more': len(rows) > limit,
+            'took_ms': round((time.perf_counter() - started) * 1000, 2),
+        }
+
+    def stats(self):
+        pages, words = self._db().execute(
+            'SELECT COUNT(*), COALESCE(SUM(word_count), 0) FROM scraper_search_page'
+        ).fetchone()
+        return {'pages': pages, 'words': words}
+
+    def optimize(self):
+        """Merge the FTS5 index into one segment; worth running after a large crawl"""
+        self._db().execute("INSERT INTO scraper_search_fts (scraper_search_fts) VALUES ('optimize')")
+
+    def close(self):
+        """Close the calling thread's connection"""
+        db = getattr(self._local, 'db', None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+
+class IndexWriter:
+    """
+    Buffers pages for a SearchIndex and writes them batch_size at a time.
+
+    Use it as a context manager, or call close(), so the last partial batch
+    is written. counts holds the added/updated/unchanged totals so far.
+    """
+
+    def __init__(self, index, batch_size=500):
+        self.index = index
+        self.batch_size = max(1, batch_size)
+        self.counts = {'added': 0, 'updated': 0, 'unchanged': 0}
+        self._batch = []
+
+    def add(self, url, title, text):
+        self._batch.append((url, title, text))
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def add_page(self, page_data):
+        """Index a crawl_website() page under its URL"""
+        self.add(page_data['url'], page_data['title'], page_text(page_data['content']))
+
+    def flush(self):
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, []
+        for outcome, count in self.index.upsert(batch).items():
+            self.counts[outcome] += count
+
+    def close(self):
+        self.flush()
+        return self.counts
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class IndexedSink:
+    """
+    Wraps an ExportSink so every exported row is also indexed.
+
+    Rows are indexed under their URL, Title and Content columns (see
+    scraper/sinks.py) through an IndexWriter, which is flushed when the
+    sink is closed.
+    """
+
+    def __init__(self, sink, index, columns=('URL', 'Title', 'Content')):
+        self.sink = sink
+        self.writer = index.writer()
+        self.url_column, self.title_column, self.text_column = columns
+
+    @property
+    def rows_written(self):
+        return self.sink.rows_written
+
+    def write(self, row):
+        self.sink.write(row)
+        self.writer.add(row[self.url_column], row[self.title_column], row[self.text_column])
+
+    def flush(self):
+        self.sink.flush()
+        self.writer.flush()
+
+    def close(self):
+        try:
+            self.sink.close()
+        finally:
+            self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+_search_index = None
+_search_index_options = {}
+_search_index_lock = threading.Lock()
+
+
+def configure_search_index(**options):
+    """Set SearchIndex options; called from ScraperConfig.ready()"""
+    global _search_index_options
+    _search_index_options = options
+
+
+def get_search_index():
+    """Return the process-wide SearchIndex, or None if no index path is configured"""
+    global _search_index
+    with _search_index_lock:
+        if _search_index is None and _search_index_options.get('path'):
+            _search_index = SearchIndex(**_search_index_options)
+        return _search_index
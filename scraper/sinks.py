@@ -0,0 +1,154 @@
+from abc import ABC, abstractmethod
+import json
+import os
+
+from .dedup import page_text
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export needs pyarrow (pip install pyarrow)
+    pa = None
+    pq = None
+
+EXPORT_COLUMNS = ['URL', 'Title', 'Content', 'Word Count']
+
+
+def page_row(page_data):
+    """Export row for a crawl_website() page: URL, title, plain text and word count"""
+    content = page_text(page_data['content'])
+    word_count = sum(block.word_count for block in page_data['content'])
+    return dict(zip(EXPORT_COLUMNS, (page_data['url'], page_data['title'], content, word_count)))
+
+
+class ExportSink(ABC):
+    """
+    Write export rows to disk as they are produced.
+
+    Rows are dicts keyed by the sink's columns. Subclasses implement
+    _write_row() and _flush(); flush() is called every flush_every rows so
+    a crash late in a crawl keeps everything written so far, for formats
+    that can be written incrementally (not xlsx, see XlsxSink).
+    """
+
+    def __init__(self, path, columns=None, flush_every=100):
+        self.path = path
+        self.columns = list(columns or EXPORT_COLUMNS)
+        self.flush_every = max(1, flush_every)
+        self.rows_written = 0
+        self._unflushed = 0
+
+    def write(self, row):
+        self._write_row(row)
+        self.rows_written += 1
+        self._unflushed += 1
+        if self._unflushed >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        self._flush()
+        self._unflushed = 0
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @abstractmethod
+    def _write_row(self, row):
+        """Write one row; it reaches disk by the next _flush() at the latest"""
+
+    def _flush(self):
+        pass
+
+
+class XlsxSink(ExportSink):
+    """
+    Excel output using openpyxl's write-only mode.
+
+    Rows are streamed to a temporary file instead of being kept as cell
+    objects, so memory stays flat; the workbook itself is only assembled on
+    close(), which is a limitation of the xlsx format.
+    """
+
+    def __init__(self, path, columns=None, flush_every=100, sheet_name='Extracted Content'):
+        super().__init__(path, columns, flush_every)
+        from openpyxl import Workbook
+
+        self._workbook = Workbook(write_only=True)
+        self._sheet = self._workbook.create_sheet(sheet_name)
+        self._sheet.append(self.columns)
+
+    def _write_row(self, row):
+        self._sheet.append([row.get(column) for column in self.columns])
+
+    def close(self):
+        self._workbook.save(self.path)
+
+
+class JsonlSink(ExportSink):
+    """One JSON object per line, flushed to disk every flush_every rows"""
+
+    def __init__(self, path, columns=None, flush_every=100):
+        super().__init__(path, columns, flush_every)
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def _write_row(self, row):
+        self._file.write(json.dumps({column: row.get(column) for column in self.columns}, ensure_ascii=False))
+        self._file.write('\n')
+
+    def _flush(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        super().close()
+        self._file.close()
+
+
+class ParquetSink(ExportSink):
+    """Parquet output written one row group per flush_every rows"""
+
+    def __init__(self, path, columns=None, flush_every=1000):
+        if pa is None:
+            raise ImportError('Parquet export requires pyarrow: pip install pyarrow')
+        super().__init__(path, columns, flush_every)
+        self._batch = []
+        self._writer = None
+
+    def _write_row(self, row):
+        self._batch.append(row)
+
+    def _flush(self):
+        if not self._batch:
+            return
+        table = pa.Table.from_pydict({column: [row.get(column) for row in self._batch] for column in self.columns})
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self.path, table.schema)
+        self._writer.write_table(table)
+        self._batch = []
+
+    def close(self):
+        super().close()
+        if self._writer is not None:
+            self._writer.close()
+
+
+SINKS = {
+    'xlsx': XlsxSink,
+    'jsonl': JsonlSink,
+    'parquet': ParquetSink,
+}
+
+
+def open_sink(export_format, path, **options):
+    """Create the sink registered for export_format ('xlsx', 'jsonl' or 'parquet')"""
+    try:
+        sink_class = SINKS[export_format]
+    except KeyError:
+        raise ValueError(f"Unknown export format '{export_format}', expected one of {', '.join(SINKS)}")
+    return sink_class(path, **options)
@@ -0,0 +1,193 @@
+import heapq
+import itertools
+import zlib
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+from lxml import etree
+
+from .canonical import in_domain, registrable_domain
+
+# Tried on every host in addition to the Sitemap: lines of robots.txt
+WELL_KNOWN_SITEMAPS = ('/sitemap.xml', '/sitemap_index.xml')
+GZIP_MAGIC = b'\x1f\x8b'
+# Decompressed bytes read from one sitemap; the protocol allows 50 MB, this
+# guards against gzip bombs
+MAX_SITEMAP_BYTES = 200 * 1024 * 1024
+# Largest piece inflated at a time
+CHUNK_OUTPUT = 256 * 1024
+
+
+def discover_sitemaps(seed_url, robots=None):
+    """Sitemap URLs for seed_url's host: robots.txt Sitemap: lines, then well-known paths"""
+    parsed = urlparse(seed_url)
+    origin = f'{parsed.scheme}://{parsed.netloc}'
+    sitemaps = list(robots.sitemaps(seed_url)) if robots else []
+    sitemaps.extend(origin + path for path in WELL_KNOWN_SITEMAPS)
+    return list(dict.fromkeys(sitemaps))
+
+
+def parse_lastmod(value):
+    """W3C datetime (2024-05-01, 2024-05-01T10:00:00Z, ...) as a UTC timestamp, or None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.endswith('Z'):
+        # fromisoformat() only accepts 'Z' from Python 3.11 on
+        value = value[:-1] + '+00:00'
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def _gunzip(chunks, max_bytes=MAX_SITEMAP_BYTES):
+    """Pass chunks through, inflating them first if the body is gzipped"""
+    decompressor = None
+    total = 0
+    for chunk in chunks:
+        if decompressor is None and total == 0 and chunk[:2] == GZIP_MAGIC:
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if decompressor is not None:
+            # Bounded output per step, so a tiny chunk cannot expand unchecked
+            data = decompressor.decompress(chunk, CHUNK_OUTPUT)
+            while data:
+                total += len(data)
+                if total > max_bytes:
+                    raise Exception(f"Sitemap exceeds {max_bytes} bytes uncompressed")
+                yield data
+                data = decompressor.decompress(decompressor.unconsumed_tail, CHUNK_OUTPUT)
+        else:
+            total += len(chunk)
+            if total > max_bytes:
+                raise Exception(f"Sitemap exceeds {max_bytes} bytes")
+            yield chunk
+
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def parse_sitemap(chunks):
+    """
+    Incrementally parse sitemap XML from an iterable of byte chunks.
+
+    Each <url> or <sitemap> entry is yielded as soon as it is complete and
+    then freed, so memory does not grow with the size of the sitemap.
+
+    Yields:
+        tuple: ('url' or 'sitemap', loc, lastmod string or None)
+    """
+    # No entity expansion or network access: sitemaps are untrusted input
+    parser = etree.XMLPullParser(events=('end',), resolve_entities=False, no_network=True)
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from _read_entries(parser)
+    parser.close()
+    yield from _read_entries(parser)
+
+
+def _read_entries(parser):
+    for _, element in parser.read_events():
+        if not isinstance(element.tag, str):
+            continue
+        kind = _local_name(element.tag)
+        if kind not in ('url', 'sitemap'):
+            continue
+        loc = lastmod = None
+        for child in element:
+            if not isinstance(child.tag, str):
+                continue
+            name = _local_name(child.tag)
+            if name == 'loc':
+                loc = (child.text or '').strip()
+            elif name == 'lastmod':
+                lastmod = child.text
+        # Free the finished entry and everything parsed before it
+        element.clear()
+        while element.getprevious() is not None:
+            del element.getparent()[0]
+        if loc:
+            yield kind, loc, lastmod
+
+
+class SitemapReader:
+    """
+    Read the page URLs of one or more sitemaps, following sitemap indexes.
+
+    Bodies are streamed from the HTTP client, inflated on the fly when they
+    are gzipped (.xml.gz) and parsed incrementally.
+
+    Args:
+        http_client (HttpClient): Client to stream sitemaps with
+        politeness (PolitenessScheduler): Optional rate limiter for the fetches
+        max_sitemaps (int): Sitemap files read at most, indexes included (default: 1000)
+    """
+
+    def __init__(self, http_client, politeness=None, max_sitemaps=1000):
+        self.http = http_client
+        self.politeness = politeness
+        self.max_sitemaps = max_sitemaps
+        self.sitemaps_read = 0
+
+    def iter_urls(self, sitemap_urls):
+        """Yield (loc, lastmod timestamp or None) for every page listed in the sitemaps"""
+        pending = list(sitemap_urls)
+        seen = set(pending)
+        while pending and self.sitemaps_read < self.max_sitemaps:
+            sitemap_url = pending.pop(0)
+            if self.politeness:
+                if not self.politeness.allowed(sitemap_url):
+                    continue
+                self.politeness.wait(sitemap_url)
+            self.sitemaps_read += 1
+            try:
+                for kind, loc, lastmod in parse_sitemap(_gunzip(self.http.iter_bytes(sitemap_url))):
+                    if kind == 'sitemap':
+                        if loc not in seen:
+                            seen.add(loc)
+                            pending.append(loc)
+                    else:
+                        yield loc, parse_lastmod(lastmod)
+            except Exception as e:
+                # Missing well-known sitemaps are normal; broken ones are skipped
+                print(f"Skipping sitemap {sitemap_url}: {str(e)}")
+
+
+def most_recent(entries, limit=None):
+    """
+    URLs of (url, lastmod) entries, most recently modified first.
+
+    Undated URLs follow the dated ones in sitemap order. With a limit only
+    that many URLs are kept while streaming, so memory stays bounded.
+    """
+    order = itertools.count()
+    # Larger keys are kept: dated before undated, newer first, earlier position first
+    keyed = ((lastmod is not None, lastmod or 0, -next(order), url) for url, lastmod in entries)
+    if limit is None:
+        ranked = sorted(keyed, reverse=True)
+    else:
+        ranked = heapq.nlargest(limit, keyed)
+    return [url for _, _, _, url in ranked]
+
+
+def site_urls(seed_url, http_client, politeness, canonicalize, limit=None):
+    """
+    In-domain page URLs from the sitemaps of seed_url's host, newest first.
+
+    Sitemaps come from robots.txt Sitemap: lines and well-known paths;
+    indexes are followed and gzipped sitemaps streamed. URLs are passed
+    through canonicalize, and with a limit only the limit most recently
+    modified ones are kept.
+    """
+    base_domain = registrable_domain(urlparse(seed_url).hostname or '')
+    reader = SitemapReader(http_client, politeness)
+    entries = (
+        (canonicalize(loc), lastmod)
+        for loc, lastmod in reader.iter_urls(discover_sitemaps(seed_url, politeness.robots))
+        if in_domain(loc, base_domain)
+    )
+    return most_recent(entries, limit)
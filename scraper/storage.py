@@ -0,0 +1,207 @@
+import hashlib
+import threading
+
+from django.db import transaction
+from django.utils import timezone
+
+from .dedup import page_text
+from .models import CrawlJob, Link, Page
+
+
+class CrawlStore:
+    """
+    Write a crawl's pages and links to the database in batches.
+
+    Pages and links are buffered and written with bulk_create, batch_size
+    rows per INSERT, one transaction per flush, so storing a large crawl
+    costs a few statements per batch rather than several per page. Page
+    text, content blocks and HTML are compressed by their fields.
+
+        with CrawlStore.create(seed_url, max_depth=2, max_pages=100) as store:
+            for page_data in scraper.iter_crawl(seed_url):
+                store.add_page(page_data)
+
+    Args:
+        job (CrawlJob): Job the pages belong to
+        batch_size (int): Rows per bulk_create batch and per flush (default: 500)
+        store_html (bool): Keep the raw HTML passed to add_page() (default: False)
+        store_links (bool): Keep discovered links (default: True)
+    """
+
+    def __init__(self, job, batch_size=500, store_html=False, store_links=True):
+        self.job = job
+        self.batch_size = max(1, batch_size)
+        self.store_html = store_html
+        self.store_links = store_links
+        self.pages_stored = 0
+        self.links_stored = 0
+        self._pages = []
+        self._links = []
+
+    @classmethod
+    def create(cls, seed_url, max_depth=0, max_pages=0, **options):
+        """A store for a new, running CrawlJob; options default to SCRAPER_CRAWL_STORAGE"""
+        job = CrawlJob.objects.create(seed_url=seed_url, max_depth=max_depth, max_pages=max_pages, status=CrawlJob.RUNNING)
+        return cls(job, **{**get_storage_options(), **options})
+
+    def add_page(self, page_data, html=None, links=(), engine=''):
+        """Buffer a crawl_website() page, with the links found on it"""
+        text = page_text(page_data['content'])
+        page = Page(
+            job=self.job,
+            url=page_data['url'],
+            title=page_data.get('title') or '',
+            word_count=sum(block.word_count for block in page_data['content']),
+            content_hash=hashlib.sha1(text.encode('utf-8')).hexdigest(),
+            engine=engine or '',
+            text=text,
+            html=html if self.store_html else None,
+        )
+        page.set_content_blocks(page_data['content'])
+        self._add(page, links, page.url)
+
+    def add_row(self, url, title, text, html=None, links=(), engine=''):
+        """Buffer a page that only has plain text, e.g. an export row"""
+        page = Page(
+            job=self.job,
+            url=url,
+            title=title or '',
+            word_count=len(text.split()) if text else 0,
+            content_hash=hashlib.sha1((text or '').encode('utf-8')).hexdigest(),
+            engine=engine or '',
+            text=text,
+            html=html if self.store_html else None,
+        )
+        self._add(page, links, url)
+
+    def add_links(self, urls, source_url=''):
+        """Buffer links discovered on source_url ('' if not known)"""
+        if self.store_links:
+            self._links.extend(Link(job=self.job, source_url=source_url, url=url) for url in urls)
+            if len(self._links) >= self.batch_size:
+                self.flush()
+
+    def _add(self, page, links, source_url):
+        self._pages.append(page)
+        self.add_links(links, source_url)
+        if len(self._pages) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._pages and not self._links:
+            return
+        pages, self._pages = self._pages, []
+        links, self._links = self._links, []
+        with transaction.atomic():
+            # A URL already stored for this job (e.g. a resumed crawl) is kept
+            # as is, so only the rows the job gained count as stored
+            pages_added = 0
+            if pages:
+                pages_before = self.job.pages.count()
+                Page.objects.bulk_create(pages, batch_size=self.batch_size, ignore_conflicts=True)
+                pages_added = self.job.pages.count() - pages_before
+            Link.objects.bulk_create(links, batch_size=self.batch_size)
+        self.pages_stored += pages_added
+        self.links_stored += len(links)
+
+    def close(self, status=CrawlJob.DONE, stats=None, error=''):
+        """Write what is buffered and mark the job finished"""
+        self.flush()
+        self.job.status = status
+        self.job.pages_stored = self.pages_stored
+        self.job.links_stored = self.links_stored
+        self.job.error = error
+        self.job.finished_at = timezone.now()
+        if stats is not None:
+            self.job.stats = stats
+        self.job.save(update_fields=['status', 'pages_stored', 'links_stored', 'error', 'finished_at', 'stats'])
+        return self.job
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.close(CrawlJob.FAILED, error=str(exc_val))
+
+
+class StoredSink:
+    """
+    Wraps an ExportSink so every exported row is also stored as a Page.
+
+    Rows only carry URL, Title and Content (see scraper/sinks.py), so pages
+    are stored as plain text without content blocks or HTML.
+    """
+
+    def __init__(self, sink, store, columns=('URL', 'Title', 'Content')):
+        self.sink = sink
+        self.store = store
+        self.url_column, self.title_column, self.text_column = columns
+
+    @property
+    def rows_written(self):
+        return self.sink.rows_written
+
+    def write(self, row):
+        self.sink.write(row)
+        self.store.add_row(row[self.url_column], row[self.title_column], row[self.text_column])
+
+    def flush(self):
+        self.sink.flush()
+        self.store.flush()
+
+    def close(self):
+        try:
+            self.sink.close()
+        finally:
+            self.store.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def store_crawl_result(result, max_depth=0, max_pages=0, **options):
+    """
+    Store a crawl_website() result as a new CrawlJob.
+
+    The result's links are stored without a source page, and its statistics
+    (engines, duplicates, metrics, ...) as the job's stats.
+    """
+    stats = {key: value for key, value in result.items() if key not in ('seed_url', 'links', 'pages')}
+    store = CrawlStore.create(result['seed_url'], max_depth, max_pages, **options)
+    try:
+        for page_data in result['pages']:
+            store.add_page(page_data)
+        store.add_links(result['links'])
+    except Exception as e:
+        store.close(CrawlJob.FAILED, error=str(e))
+        raise
+    return store.close(stats=stats)
+
+
+_storage_options = None
+_storage_options_lock = threading.Lock()
+
+
+def configure_crawl_storage(**options):
+    """Set CrawlStore options (batch_size, store_html, store_links); called from ScraperConfig.ready()"""
+    global _storage_options
+    with _storage_options_lock:
+        _storage_options = options
+
+
+def get_storage_options():
+    """CrawlStore options from SCRAPER_CRAWL_STORAGE, without 'enabled'"""
+    with _storage_options_lock:
+        return {key: value for key, value in (_storage_options or {}).items() if key != 'enabled'}
+
+
+def storage_enabled():
+    """True if crawls started from the web UI are stored (SCRAPER_CRAWL_STORAGE['enabled'])"""
+    with _storage_options_lock:
+        return bool(_storage_options and _storage_options.get('enabled', True))
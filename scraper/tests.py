@@ -1,3 +1,463 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import uuid
+from unittest import mock
+
+from bs4 import BeautifulSoup
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
 
-# Create your tests here.
+from . import canonical
+from .canonical import UrlCanonicalizer, in_domain, registrable_domain
+from .compression import RAW, ZLIB, compress
+from .dedup import NearDuplicateDetector, simhash
+from .distributed import (
+    DONE, LEASED, QUEUED, RedisFrontierBackend, SqliteFrontierBackend, host_shard, owned_shards, redis,
+)
+from .extractors import ExtractorRegistry
+from .http_cache import HttpCache
+from .http_client import HttpResponse, HttpStatusError
+from .models import CrawlJob, Page
+from .result_cache import ScrapeResultCache
+from .search import SearchIndex, fts_query
+from .storage import CrawlStore
+from .utils import WebScraper
+
+
+class UrlCanonicalizerTests(TestCase):
+    def setUp(self):
+        self.canonicalizer = UrlCanonicalizer()
+
+    def test_lowercases_scheme_and_host_and_drops_default_port_and_fragment(self):
+        self.assertEqual(self.canonicalizer.canonicalize('HTTPS://Example.COM:443/Post#comments'), 'https://example.com/Post')
+
+    def test_drops_tracking_parameters_and_sorts_query(self):
+        self.assertEqual(
+            self.canonicalizer.canonicalize('https://example.com/p?utm_source=x&b=2&fbclid=y&a=1'),
+            'https://example.com/p?a=1&b=2'
+        )
+
+    def test_removes_session_id_path_parameter(self):
+        self.assertEqual(self.canonicalizer.canonicalize('https://ex.com/p;jsessionid=abc?x=1'), 'https://ex.com/p?x=1')
+
+    def test_keeps_other_path_parameters(self):
+        self.assertEqual(self.canonicalizer.canonicalize('https://ex.com/p;v=1'), 'https://ex.com/p;v=1')
+
+    def test_keeps_query_encoding_and_valueless_keys(self):
+        self.assertEqual(
+            self.canonicalizer.canonicalize('https://ex.com/login?next=/a/b&print&q=a%2Fb'),
+            'https://ex.com/login?next=/a/b&print&q=a%2Fb'
+        )
+
+    def test_drops_blank_parameters_when_configured(self):
+        canonicalizer = UrlCanonicalizer(keep_blank_params=False)
+        self.assertEqual(canonicalizer.canonicalize('https://ex.com/?a&b=&c=1'), 'https://ex.com/?c=1')
+
+    def test_key_folds_scheme_www_and_trailing_slash(self):
+        self.assertTrue(self.canonicalizer.same_page('http://www.example.com/post/', 'https://example.com/post'))
+        self.assertFalse(self.canonicalizer.same_page('https://example.com/post', 'https://example.com/other'))
+
+    def test_key_folding_can_be_turned_off(self):
+        canonicalizer = UrlCanonicalizer(fold_scheme=False, fold_www=False, fold_trailing_slash=False)
+        self.assertFalse(canonicalizer.same_page('http://www.example.com/post/', 'https://example.com/post'))
+
+    def test_leaves_non_http_urls_alone(self):
+        self.assertEqual(self.canonicalizer.canonicalize('mailto:someone@example.com'), 'mailto:someone@example.com')
+
+    def test_invalid_port_does_not_raise(self):
+        self.assertEqual(self.canonicalizer.canonicalize('https://example.com:99999/a#x'), 'https://example.com:99999/a')
+
+    def test_registrable_domain(self):
+        self.assertEqual(registrable_domain('blog.example.co.uk'), 'example.co.uk')
+        self.assertEqual(registrable_domain('www.example.com:8080'), 'example.com')
+        self.assertEqual(registrable_domain('127.0.0.1'), '127.0.0.1')
+
+    def test_hosted_blogs_are_separate_sites(self):
+        # The same with tldextract's public suffix list and with the built-in one
+        for extract in {canonical._extract, None}:
+            with self.subTest(tldextract=extract is not None), mock.patch.object(canonical, '_extract', extract):
+                self.assertEqual(registrable_domain('foo.wordpress.com'), 'foo.wordpress.com')
+                self.assertNotEqual(registrable_domain('foo.blogspot.com'), registrable_domain('bar.blogspot.com'))
+                self.assertEqual(registrable_domain('www.example.github.io'), 'example.github.io')
+                self.assertEqual(registrable_domain('blog.example.co.uk'), 'example.co.uk')
+
+    def test_in_domain_matches_subdomains_only(self):
+        self.assertTrue(in_domain('https://blog.example.com/a', 'example.com'))
+        self.assertFalse(in_domain('https://notexample.com/a', 'example.com'))
+
+
+SEED = 'https://example.com/'
+ALL_SHARDS = owned_shards(0, 1)
+
+
+class FrontierBackendTestsMixin:
+    """Lease behaviour every FrontierBackend must share; subclasses set up self.backend"""
+
+    def test_create_crawl_queues_seed_once(self):
+        self.backend.create_crawl('c', SEED, 2, 10)
+        self.assertEqual(self.backend.create_crawl('c', 'https://other.com/', 5, 50), {'seed_url': SEED, 'max_depth': 2, 'max_pages': 10})
+        self.assertEqual(self.backend.stats('c')[QUEUED], 1)
+
+    def test_claim_leases_each_url_once(self):
+        self.backend.create_crawl('c', SEED, 2, 10)
+        self.assertEqual(self.backend.claim('c', ALL_SHARDS, 5, 60), [(SEED, 0)])
+        self.assertEqual(self.backend.claim('c', ALL_SHARDS, 5, 60), [])
+        self.assertEqual(self.backend.stats('c')[LEASED], 1)
+        self.assertFalse(self.backend.is_finished('c'))
+
+    def test_claim_only_reads_owned_shards(self):
+        self.backend.create_crawl('c', SEED, 2, 10)
+        other = [shard for shard in ALL_SHARDS if shard != host_shard(SEED)]
+        self.assertEqual(self.backend.claim('c', other, 5, 60), [])
+        self.assertEqual(self.backend.claim('c', [host_shard(SEED)], 5, 60), [(SEED, 0)])
+
+    def test_expired_lease_is_claimed_again_without_spending_budget(self):
+        self.backend.create_crawl('c', SEED, 2, 2)
+        self.assertEqual(self.backend.claim('c', ALL_SHARDS, 5, -1), [(SEED, 0)])
+        self.assertEqual(self.backend.claim('c', ALL_SHARDS, 5, 60), [(SEED, 0)])
+        self.backend.complete('c', SEED, [(f'{SEED}{i}', 1) for i in range(3)])
+        # One page of the budget of two is left
+        self.assertEqual(len(self.backend.claim('c', ALL_SHARDS, 5, 60)), 1)
+
+    def test_claim_stops_at_max_pages(self):
+        self.backend.create_crawl('c', SEED, 2, 2)
+        self.backend.claim('c', ALL_SHARDS, 1, 60)
+        self.backend.complete('c', SEED, [(f'{SEED}{i}', 1) for i in range(5)])
+        self.assertEqual(len(self.backend.claim('c', ALL_SHARDS, 5, 60)), 1)
+        self.assertEqual(self.backend.claim('c', ALL_SHARDS, 5, 60), [])
+
+    def test_complete_queues_new_links_and_stores_page(self):
+        self.backend.create_crawl('c', SEED, 2, 10)
+        self.backend.claim('c', ALL_SHARDS, 1, 60)
+        page = {'url': SEED, 'title': 'Home', 'content': []}
+        self.backend.complete('c', SEED, [(SEED, 1), (SEED + 'a', 1)], page)
+        self.assertEqual(self.backend.claim('c', ALL_SHARDS, 5, 60), [(SEED + 'a', 1)])
+        self.backend.complete('c', SEED + 'a', error='HTTP 404')
+        self.assertTrue(self.backend.is_finished('c'))
+        self.assertEqual(self.backend.stats('c')[DONE], 1)
+        self.assertEqual(list(self.backend.iter_pages('c')), [page])
+
+
+class SqliteFrontierBackendTests(FrontierBackendTestsMixin, TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.backend = SqliteFrontierBackend(os.path.join(self.directory, 'frontier.sqlite3'))
+
+    def tearDown(self):
+        self.backend.close()
+        shutil.rmtree(self.directory)
+
+
+@unittest.skipUnless(redis is not None and os.environ.get('SCRAPER_TEST_REDIS_URL'), 'needs redis-py and SCRAPER_TEST_REDIS_URL')
+class RedisFrontierBackendTests(FrontierBackendTestsMixin, TestCase):
+    def setUp(self):
+        self.backend = RedisFrontierBackend(os.environ['SCRAPER_TEST_REDIS_URL'], prefix=f'scraper:test:{uuid.uuid4().hex}:')
+
+    def tearDown(self):
+        keys = list(self.backend._redis.scan_iter(f'{self.backend.prefix}*'))
+        if keys:
+            self.backend._redis.delete(*keys)
+        self.backend.close()
+
+
+class FtsQueryTests(TestCase):
+    def test_words_are_quoted_terms(self):
+        self.assertEqual(fts_query('python async'), '"python" "async"')
+
+    def test_phrases_prefixes_and_operators_are_kept(self):
+        self.assertEqual(fts_query('"async io" pyth* OR rust NOT go'), '"async io" "pyth"* OR "rust" NOT "go"')
+
+    def test_fts5_syntax_is_quoted_away(self):
+        self.assertEqual(fts_query('title:foo NEAR(a b) c++ AND (x'), '"title foo" "NEAR a" "b" "c" "AND" "x"')
+
+    def test_unbalanced_quote(self):
+        self.assertEqual(fts_query('"async io'), '"async" "io"')
+
+    def test_dangling_operators_are_dropped(self):
+        self.assertEqual(fts_query('OR a OR OR b NOT'), '"a" OR "b"')
+
+    def test_query_without_words_is_empty(self):
+        self.assertEqual(fts_query('*** -- "" :'), '')
+
+
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.index = SearchIndex(os.path.join(self.directory, 'search.sqlite3'))
+        self.index.upsert([
+            ('https://ex.com/a', 'Async IO in Python', 'Event loops and coroutines explained.'),
+            ('https://ex.com/b', 'Rust ownership', 'Borrowing rules, with a note on Python.'),
+        ])
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.directory)
+
+    def test_title_matches_rank_first(self):
+        urls = [result['url'] for result in self.index.search('python')['results']]
+        self.assertEqual(urls, ['https://ex.com/a', 'https://ex.com/b'])
+
+    def test_hostile_queries_do_not_raise(self):
+        for query in ('"', 'NEAR(', 'content:*', '(((', 'a AND', '^python', '"unterminated'):
+            self.assertIsInstance(self.index.search(query)['results'], list)
+
+    def test_snippets_are_escaped(self):
+        self.index.upsert([('https://ex.com/c', 'Tags', 'Use <script> tags sparingly')])
+        snippet = self.index.search('script')['results'][0]['snippet']
+        self.assertIn('&lt;<mark>script</mark>&gt;', snippet)
+
+    def test_unchanged_pages_are_not_rewritten(self):
+        counts = self.index.upsert([
+            ('https://ex.com/a', 'Async IO in Python', 'Event loops and coroutines explained.'),
+            ('https://ex.com/b', 'Rust ownership', 'Borrowing rules changed.'),
+        ])
+        self.assertEqual(counts, {'added': 0, 'updated': 1, 'unchanged': 1})
+
+
+class NearDuplicateDetectorTests(TestCase):
+    text = 'Event loops schedule coroutines and callbacks on a single thread.'
+
+    def test_near_duplicates_are_reported(self):
+        duplicates = NearDuplicateDetector()
+        self.assertIsNone(duplicates.check('https://ex.com/a', self.text))
+        self.assertEqual(duplicates.check('https://ex.com/b', self.text), 'https://ex.com/a')
+        self.assertEqual(duplicates.duplicates, 1)
+
+    def test_pages_without_words_are_not_duplicates(self):
+        duplicates = NearDuplicateDetector(prune_min_pages=1)
+        for url in ('https://ex.com/p/1', 'https://ex.com/p/2', 'https://ex.com/p/3'):
+            self.assertIsNone(duplicates.check(url, ''))
+            self.assertIsNone(duplicates.check(url, 'Two words'))
+        self.assertEqual(duplicates.duplicates, 0)
+        self.assertIsNone(simhash('Two words'))
+        # Nothing was counted towards pruning the pattern either
+        self.assertTrue(duplicates.should_expand('https://ex.com/p/4'))
+        self.assertIsNone(duplicates.check('https://ex.com/p/5', self.text))
+
+
+class ExtractorRegistryTests(TestCase):
+    def setUp(self):
+        self.registry = ExtractorRegistry(extractors=[])
+
+    def find(self, html, url='https://ex.com/post'):
+        soup = BeautifulSoup(html, 'lxml')
+        return self.registry.find_main_content(soup, soup.body, url)
+
+    def test_broad_content_selectors_come_before_post_containers(self):
+        element, choice = self.find('<body><div class="post">Teaser</div><div class="page-content">Body</div></body>')
+        self.assertEqual(element['class'], ['page-content'])
+        self.assertEqual(choice.selector, 'div[class*="content"]')
+
+    def test_post_containers_catch_pages_nothing_else_matches(self):
+        element, _ = self.find('<body><div class="blog-post">Body</div></body>')
+        self.assertEqual(element['class'], ['blog-post'])
+
+    def test_rejected_container_falls_through_to_the_next_selector(self):
+        soup = BeautifulSoup('<body><article><div>No paragraphs</div></article><main><p>Body</p></main></body>', 'lxml')
+        has_paragraph = lambda element: element.find('p') is not None
+        element, choice = self.registry.find_main_content(soup, soup.body, 'https://ex.com/post', accept=has_paragraph)
+        self.assertEqual(element.name, 'main')
+        self.assertEqual(choice.selector, 'main')
+
+    def test_learned_selector_is_used_for_later_pages(self):
+        _, choice = self.find('<body><article>Body</article></body>')
+        self.registry.learn('https://ex.com/post', choice, words=100)
+        self.find('<body><article>Other</article></body>', 'https://ex.com/other')
+        self.assertEqual(self.registry.stats()['hits'], 1)
+
+    def test_learned_selector_carries_over_to_another_registry(self):
+        _, choice = self.find('<body><article>Body</article></body>')
+        self.registry.learn('https://ex.com/post', choice, words=100)
+        other = ExtractorRegistry(extractors=[])
+        other.adopt('https://ex.com/other', self.registry.learned('https://ex.com/post'))
+        self.assertEqual(other.learned('https://ex.com/other'), ('generic', 'article'))
+        self.assertNotIn('learned', other.stats())
+        other.adopt('https://ex.com/other', None)
+        self.assertIsNone(other.learned('https://ex.com/other'))
+
+    def test_merge_stats_adds_counters(self):
+        self.find('<body><article>Body</article></body>')
+        other = ExtractorRegistry(extractors=[])
+        other.merge_stats(self.registry.stats())
+        self.assertEqual(other.stats()['scans'], 1)
+        self.assertEqual(other.stats()['hit_rate'], 0.0)
+
+
+ARTICLE_HTML = ('<html><head><title>Post</title></head><body><article><p>'
+                + 'Cached words. ' * 40 + '</p></article></body></html>').encode('utf-8')
+
+
+class FakeHttpClient:
+    """Answers every GET with the next response and records the headers sent"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers=None):
+        self.requests.append(headers or {})
+        return self.responses.pop(0)
+
+    def close(self):
+        pass
+
+
+def response(status_code, content=b'', **headers):
+    return HttpResponse('https://ex.com/post', status_code, {'Content-Type': 'text/html', **headers}, content)
+
+
+class ScrapeResultCacheTests(TestCase):
+    def test_concurrent_stale_hits_start_one_refresh(self):
+        cache = ScrapeResultCache(ttl=0, cache_alias='missing')
+        cache.backend.set(cache._key('https://ex.com/post'), {'result': {'title': 'old'}, 'stored_at': time.time()})
+        release, calls = threading.Event(), []
+
+        def fetch():
+            calls.append(1)
+            release.wait(5)
+            return {'title': 'new'}
+
+        callers = [threading.Thread(target=cache.get_or_fetch, args=('https://ex.com/post', fetch)) for _ in range(8)]
+        for caller in callers:
+            caller.start()
+        for caller in callers:
+            caller.join()
+        release.set()
+        self.assertEqual(len(calls), 1)
+
+
+class HttpCacheTests(TestCase):
+    url = 'https://ex.com/post'
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = HttpCache(os.path.join(self.directory, 'cache'))
+        self.index = SearchIndex(os.path.join(self.directory, 'search.sqlite3'))
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.directory)
+
+    def scraper(self, http):
+        return WebScraper(http_client=http, http_cache=self.cache, search_index=self.index,
+                          extractors=ExtractorRegistry(extractors=[]))
+
+    def fetch(self, *responses, url=url):
+        http = FakeHttpClient(*responses)
+        return self.scraper(http).fetch_cached(url, engine='requests'), http.requests
+
+    def test_validators_are_sent_when_revalidating(self):
+        self.cache.put(self.url, response(200, ARTICLE_HTML, ETag='"v1"', **{'Last-Modified': 'Mon, 05 Oct 2026 10:00:00 GMT'}),
+                       {'url': self.url, 'title': 'Post', 'content': []}, 'requests')
+        headers = self.cache.conditional_headers(self.cache.get(self.url))
+        self.assertEqual(headers, {'If-None-Match': '"v1"', 'If-Modified-Since': 'Mon, 05 Oct 2026 10:00:00 GMT'})
+        self.assertEqual(self.cache.conditional_headers(None), {})
+
+    def test_not_modified_serves_the_cached_page(self):
+        (_, page, _), _ = self.fetch(response(200, ARTICLE_HTML, ETag='"v1"'))
+        (html, cached, engine), requests = self.fetch(response(304))
+        self.assertEqual((html, engine), (None, 'cache'))
+        self.assertEqual(requests, [{'If-None-Match': '"v1"'}])
+        self.assertTrue(page['content'])
+        self.assertEqual(cached['title'], page['title'])
+        self.assertEqual([block.text for block in cached['content']], [block.text for block in page['content']])
+        self.assertEqual(self.cache.stats(), {'hits': 1, 'misses': 1})
+
+    def test_identical_body_without_validators_is_a_hit(self):
+        self.fetch(response(200, ARTICLE_HTML))
+        (_, _, engine), _ = self.fetch(response(200, ARTICLE_HTML))
+        self.assertEqual(engine, 'cache')
+
+    def test_changed_body_is_extracted_and_stored_again(self):
+        self.fetch(response(200, ARTICLE_HTML, ETag='"v1"'))
+        changed = ARTICLE_HTML.replace(b'Cached', b'Fresh')
+        (html, page, engine), _ = self.fetch(response(200, changed, ETag='"v2"'))
+        self.assertEqual(engine, 'requests')
+        self.assertIn('Fresh words.', html)
+        self.assertEqual(self.cache.get(self.url)['etag'], '"v2"')
+        self.assertEqual(self.cache.get(self.url)['content_hash'], HttpCache.content_hash(changed))
+
+    def test_error_responses_are_never_fresh(self):
+        self.fetch(response(200, ARTICLE_HTML))
+        entry = self.cache.get(self.url)
+        self.assertFalse(self.cache.is_fresh(entry, response(500, ARTICLE_HTML)))
+        self.assertFalse(self.cache.is_fresh(entry, None))
+        self.assertFalse(self.cache.is_fresh(None, response(304)))
+
+    def test_link_variants_share_an_entry(self):
+        self.fetch(response(200, ARTICLE_HTML, ETag='"v1"'))
+        (_, _, engine), requests = self.fetch(response(304), url=self.url + '?utm_source=feed')
+        self.assertEqual(engine, 'cache')
+        self.assertEqual(requests, [{'If-None-Match': '"v1"'}])
+
+    def test_error_status_is_not_fetched_twice(self):
+        http = FakeHttpClient(response(404))
+        with self.assertRaises(HttpStatusError):
+            self.scraper(http).fetch_cached(self.url, engine='requests')
+        self.assertEqual(len(http.requests), 1)
+        self.assertIsNone(self.cache.get(self.url))
+
+    def test_forced_playwright_skips_the_conditional_get(self):
+        http = FakeHttpClient()
+        scraper = self.scraper(http)
+        scraper.fetch_html_playwright = lambda url: ARTICLE_HTML.decode('utf-8')
+        _, _, engine = scraper.fetch_cached(self.url, engine='playwright')
+        self.assertEqual((engine, http.requests), ('playwright', []))
+
+
+class CompressedTextFieldTests(TestCase):
+    def setUp(self):
+        self.job = CrawlJob.objects.create(seed_url='https://ex.com/')
+
+    def stored_bytes(self, page, column='text'):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT {column} FROM scraper_page WHERE id = %s', [page.pk])
+            return bytes(cursor.fetchone()[0])
+
+    def test_text_round_trips_compressed(self):
+        text = 'Long enough to be worth compressing. ' * 50
+        page = Page.objects.create(job=self.job, url='https://ex.com/a', text=text, html='<p>é</p>')
+        stored = self.stored_bytes(page)
+        self.assertNotEqual(stored[:1], RAW)
+        self.assertLess(len(stored), len(text))
+        loaded = Page.objects.get(pk=page.pk)
+        self.assertEqual((loaded.text, loaded.html, loaded.blocks), (text, '<p>é</p>', None))
+
+    def test_rows_written_with_another_codec_stay_readable(self):
+        page = Page.objects.create(job=self.job, url='https://ex.com/a')
+        text = 'Written before zstandard was installed. ' * 20
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE scraper_page SET text = %s WHERE id = %s', [compress(text.encode('utf-8'), 'zlib'), page.pk])
+        self.assertEqual(self.stored_bytes(page)[:1], ZLIB)
+        self.assertEqual(Page.objects.get(pk=page.pk).text, text)
+
+    def test_bodies_are_deferred_until_accessed(self):
+        Page.objects.create(job=self.job, url='https://ex.com/a', text='Body')
+        page = Page.objects.get(url='https://ex.com/a')
+        self.assertEqual(page.get_deferred_fields(), set(Page.BODY_FIELDS))
+        self.assertEqual(Page.objects.with_bodies().get(url='https://ex.com/a').get_deferred_fields(), set())
+        self.assertEqual(page.text, 'Body')
+
+
+class MigrationTests(TestCase):
+    def test_models_match_migrations(self):
+        # Raises SystemExit if a model change has no migration
+        call_command('makemigrations', 'scraper', check=True, dry_run=True, verbosity=0)
+
+
+class CrawlStoreTests(TestCase):
+    def test_pages_already_stored_are_not_counted(self):
+        store = CrawlStore.create('https://ex.com/', max_pages=10)
+        store.add_row('https://ex.com/a', 'A', 'First')
+        store.flush()
+        store.add_row('https://ex.com/a', 'A', 'Again')
+        store.add_row('https://ex.com/b', 'B', 'Second')
+        job = store.close()
+        self.assertEqual(job.pages_stored, 2)
+        self.assertEqual(job.pages.count(), 2)
+        self.assertEqual(job.max_pages, 10)
@@ -4,4 +4,8 @@ from . import views
 urlpatterns = [
     path('scrape/', views.scrape_blog, name='scrape_blog'),
     path('crawl/', views.crawl_links, name='crawl_links'),
+    path('crawl/jobs/<str:job_id>/', views.crawl_job_status, name='crawl_job_status'),
+    path('metrics/', views.metrics, name='metrics'),
+    path('search/', views.search, name='search'),
+    path('api/search/', views.search_api, name='search_api'),
 ]
\ No newline at end of file
@@ -1,26 +1,117 @@
-import requests
 from bs4 import BeautifulSoup
 from playwright.sync_api import sync_playwright
-import re
 from urllib.parse import urljoin, urlparse
-import time
+import asyncio
+import contextlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from .adaptive import EngineSelector, ENGINES
+from .canonical import get_canonicalizer, in_domain, registrable_domain
+from .dedup import NearDuplicateDetector, page_text
+from .extraction import extract_content_blocks
+from .extractors import CONTENT_SELECTORS, get_extractor_registry  # noqa: F401 (CONTENT_SELECTORS re-exported)
+from .frontier import Frontier
+from .http_client import HttpClient, HttpStatusError
+from .metrics import NULL_METRICS, CrawlMetrics, SamplingProfiler, error_class
+from .politeness import PoliteFrontier, PolitenessScheduler
+from .render import RenderPolicy, render_page
+from .search import get_search_index
+from .sitemaps import site_urls
+
+# Browser fingerprint shared by every Playwright page the scraper opens
+BROWSER_USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+BROWSER_VIEWPORT = {'width': 1280, 'height': 720}
+BROWSER_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip, deflate',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+}
 
 class WebScraper:
-    def __init__(self):
+    def __init__(self, browser=None, context=None, render_policy=None, http_client=None, http_cache=None,
+                 politeness=None, extractors=None, canonicalizer=None, search_index=None, archive=None,
+                 engine_selector=None):
+        # A browser or context passed in (e.g. leased from BrowserPool) is
+        # owned by the caller and is left running on exit.
         self.playwright = None
-        self.browser = None
+        self.browser = browser
+        self.context = context
+        self._owns_browser = browser is None and context is None
+        self.pages_fetched = 0
+        # Per-domain engine decisions; pass a shared one (e.g. BrowserPool's)
+        # so they outlive this scraper
+        self.engine_selector = engine_selector or EngineSelector()
+        # 'fast' blocks heavy resources and waits for the DOM to settle
+        # instead of sleeping; see scraper/render.py
+        self.render_policy = RenderPolicy.resolve(render_policy)
+        # Pooled keep-alive client for the static path; a shared client
+        # passed in is left open on exit
+        self._owns_http = http_client is None
+        self.http = http_client or HttpClient()
+        # Optional HttpCache: unchanged pages are served from it on recrawls
+        self.http_cache = http_cache
+        # Per-host rate limits and robots.txt for polite crawls; created on
+        # first use unless a (possibly shared) PolitenessScheduler is passed
+        self.politeness = politeness
+        # Finds each page's main content and learns the right selector per
+        # domain; the process-wide registry unless one is passed
+        self.extractors = extractors or get_extractor_registry()
+        # Canonical URL forms, so link variants of a page are fetched once
+        self.canonicalizer = canonicalizer or get_canonicalizer()
+        # Full-text SearchIndex that crawled pages are written to; the
+        # process-wide one (if configured) unless one is passed
+        self.search_index = search_index or get_search_index()
+        # Optional ArchiveWriter keeping every raw response, so extraction
+        # can be re-run offline (see scraper/archive.py)
+        self.archive = archive
+        # Stage timers of the crawl in progress; a no-op outside crawls
+        self.metrics = NULL_METRICS
 
     def __enter__(self):
-        self.playwright = sync_playwright().start()
-        self.browser = self.playwright.chromium.launch(headless=True)
+        # Chromium is launched on the first Playwright fetch, so crawls that
+        # stay on the static path never start a browser.
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._owns_http:
+            self.http.close()
+        if not self._owns_browser:
+            return
         if self.browser:
             self.browser.close()
         if self.playwright:
             self.playwright.stop()
 
+    def _ensure_browser(self):
+        if self.browser is None and self.context is None:
+            self.playwright = sync_playwright().start()
+            self.browser = self.playwright.chromium.launch(headless=True)
+
+    def get_politeness(self):
+        """The PolitenessScheduler used by polite crawls"""
+        if self.politeness is None:
+            self.politeness = PolitenessScheduler(self.http)
+        return self.politeness
+
+    def sitemap_urls(self, seed_url, limit=None):
+        """In-domain page URLs from the sitemaps of seed_url's host, newest first; see sitemaps.site_urls()"""
+        return site_urls(seed_url, self.http, self.get_politeness(), self._normalize_url, limit)
+
+    def _seed_frontier(self, to_visit, seed_url, max_pages, sitemaps, sitemap_only):
+        """Queue the seed URL and, if asked, the sitemap URLs of its host"""
+        sitemap_urls = self.sitemap_urls(seed_url, max_pages) if sitemaps or sitemap_only else []
+        if sitemaps or sitemap_only:
+            print(f"Found {len(sitemap_urls)} URLs in sitemaps")
+        if not sitemap_only or not sitemap_urls:
+            to_visit.add(seed_url, 0)
+        for url in sitemap_urls:
+            # Ahead of everything else for 'best_first', newest first
+            to_visit.add(url, 0, priority=(0, -1))
+
     def is_dynamic_site(self, url):
         """Check if site likely needs JavaScript rendering"""
         dynamic_indicators = ['medium.com', 'substack.com', 'dev.to', 'twitter.com', 'facebook.com']
@@ -28,77 +119,48 @@ class WebScraper:
         return any(indicator in domain for indicator in dynamic_indicators)
 
     def fetch_html_requests(self, url):
-        """Fetch HTML using requests for static sites"""
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
+        """Fetch HTML using the pooled HTTP client for static sites"""
         try:
-            response = requests.get(url, headers=headers, timeout=10)
+            with self.metrics.time('fetch'):
+                response = self.http.get(url)
+            self.metrics.add_bytes(len(response.content))
             response.raise_for_status()
+            self.archive_response(url, response)
             return response.text
+        except HttpStatusError:
+            raise
         except Exception as e:
             raise Exception(f"Failed to fetch with requests: {str(e)}")
 
+    def archive_response(self, url, response):
+        """Append a successful HttpResponse to the archive, if one is set"""
+        if self.archive is not None:
+            self.archive.write(url, response.content, response.headers.get('Content-Type', ''), response.status_code, 'requests')
+
     def fetch_html_playwright(self, url):
         """Fetch HTML using Playwright for dynamic sites with enhanced loading"""
         try:
-            # Create page with stealth options
-            page = self.browser.new_page(
-                user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                viewport={'width': 1280, 'height': 720}
-            )
-
-            # Set additional headers to appear more like a real browser
-            page.set_extra_http_headers({
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-                'Accept-Encoding': 'gzip, deflate',
-                'DNT': '1',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1',
-            })
-
-            # Navigate and wait for network idle
-            page.goto(url, wait_until='domcontentloaded', timeout=30000)
-            try:
-                page.wait_for_load_state('networkidle', timeout=15000)
-            except:
-                # If networkidle times out, just continue
-                pass
-
-            # Scroll to bottom to trigger lazy loading
-            page.evaluate("""
-                window.scrollTo(0, document.body.scrollHeight);
-            """)
-            time.sleep(1)  # Wait for lazy content to load
-
-            # Try to find and click "Load more" buttons (quick check)
-            load_more_selectors = [
-                'button:has-text("Load more")',
-                'button:has-text("Load More")',
-                'button:has-text("Show more")',
-                '.load-more',
-                '[data-testid="load-more"]'
-            ]
-
-            for selector in load_more_selectors:
-                try:
-                    load_button = page.query_selector(selector)
-                    if load_button and load_button.is_visible():
-                        load_button.click()
-                        time.sleep(1)  # Brief wait for new content
-                        break
-                except:
-                    continue
-
-            # Additional scroll
-            page.evaluate("""
-                window.scrollTo(0, document.body.scrollHeight);
-            """)
-            time.sleep(0.5)
-
-            html = page.content()
+            self._ensure_browser()
+            self.pages_fetched += 1
+            if self.context:
+                # Leased contexts are created with the stealth options already
+                page = self.context.new_page()
+            else:
+                # Create page with stealth options
+                page = self.browser.new_page(
+                    user_agent=BROWSER_USER_AGENT,
+                    viewport=BROWSER_VIEWPORT
+                )
+
+                # Set additional headers to appear more like a real browser
+                page.set_extra_http_headers(BROWSER_HEADERS)
+
+            with self.metrics.time('fetch'):
+                html = render_page(page, url, self.render_policy, self.metrics)
+            self.metrics.add_bytes(len(html.encode('utf-8')))
             page.close()
+            if self.archive is not None:
+                self.archive.write(url, html, engine='playwright')
             return html
         except Exception as e:
             try:
@@ -107,10 +169,147 @@ class WebScraper:
                 pass
             raise Exception(f"Failed to fetch with Playwright: {str(e)}")
 
+    def fetch_cached(self, url, engine='adaptive'):
+        """
+        fetch_adaptive() backed by the HTTP cache, if one is configured.
+
+        Entries are keyed by the canonical URL, so link variants share one.
+        A cached page is revalidated with a conditional GET; if the server
+        answers 304 or returns an identical body, the cached extraction is
+        returned with engine 'cache' and html None. Otherwise the body just
+        downloaded is reused by the static path and the result is stored,
+        and an error status is raised without fetching the page again.
+        engine='playwright' always renders and bypasses the cache.
+        """
+        if self.http_cache is None or engine == 'playwright':
+            return self.fetch_adaptive(url, engine)
+
+        key = self.canonicalizer.key(url)
+        entry = self.http_cache.get(key)
+        try:
+            with self.metrics.time('fetch'):
+                response = self.http.get(url, headers=self.http_cache.conditional_headers(entry))
+            self.metrics.add_bytes(len(response.content))
+        except Exception:
+            # Let the regular fetch path surface the error or fall back
+            response = None
+
+        if self.http_cache.is_fresh(entry, response):
+            self.http_cache.hit()
+            return None, entry['page'], 'cache'
+
+        self.http_cache.miss()
+        static_html = None
+        if response is not None:
+            # The server answered with an error; a second request would too
+            response.raise_for_status()
+            if 200 <= response.status_code < 300:
+                static_html = response.text
+                self.archive_response(url, response)
+        html, page, used_engine = self.fetch_adaptive(url, engine, static_html)
+        if static_html is not None:
+            self.http_cache.put(key, response, page, used_engine)
+        return html, page, used_engine
+
+    def fetch_adaptive(self, url, engine='adaptive', static_html=None):
+        """
+        Fetch and extract url with the cheapest engine that yields content.
+
+        With engine='adaptive' the page is fetched over plain HTTP first and
+        re-rendered with Playwright only if the extracted content looks empty
+        or SPA-like; the choice is remembered per domain. static_html, if
+        given, is an already downloaded body used instead of a new request.
+
+        Returns:
+            tuple: (html, extract_page() result, engine used)
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {', '.join(ENGINES)}")
+        if engine == 'adaptive':
+            engine = self.engine_selector.engine_for(url)
+            if engine is None and self.is_dynamic_site(url):
+                engine = 'playwright'
+
+        if engine in ('requests', 'playwright'):
+            if engine == 'requests':
+                html = static_html if static_html is not None else self.fetch_html_requests(url)
+            else:
+                html = self.fetch_html_playwright(url)
+            self.engine_selector.stats[engine] += 1
+            return html, self.extract_page(html, url), engine
+
+        # Unknown domain: probe over plain HTTP
+        static = None
+        static_words = 0
+        try:
+            html = static_html if static_html is not None else self.fetch_html_requests(url)
+            content_data = self.extract_page(html, url)
+            if not self.engine_selector.needs_rendering(html, content_data):
+                self.engine_selector.remember(url, 'requests')
+                self.engine_selector.stats['requests'] += 1
+                return html, content_data, 'requests'
+            static = (html, content_data, 'requests')
+            static_words = self.engine_selector.word_count(content_data)
+        except HttpStatusError:
+            # The server answered with an error; a browser would get it too
+            raise
+        except Exception:
+            pass
+
+        try:
+            html = self.fetch_html_playwright(url)
+            content_data = self.extract_page(html, url)
+        except Exception:
+            if static is None:
+                raise
+            # Rendering failed: the thin static page beats no page at all
+            self.engine_selector.stats['requests'] += 1
+            return static
+        rendered_words = self.engine_selector.word_count(content_data)
+        if static is not None and rendered_words <= static_words:
+            # Rendering found nothing more; keep the page already fetched
+            self.engine_selector.stats['requests'] += 1
+            return static
+        # Only commit the domain to Playwright if rendering actually helped;
+        # a genuinely thin page should not decide for the whole site.
+        if rendered_words > static_words:
+            self.engine_selector.remember(url, 'playwright')
+        self.engine_selector.stats['playwright'] += 1
+        return html, content_data, 'playwright'
+
     def extract_content(self, html, url):
         """Extract valuable content from HTML"""
-        soup = BeautifulSoup(html, 'lxml')
+        page = self.extract_page(html, url)
+        return {
+            'title': page['title'],
+            'content': page['content']
+        }
 
+    def extract_page(self, html, url):
+        """
+        Extract title, content blocks and outgoing links from a single parse.
+
+        Returns:
+            dict: {'title': ..., 'content': [...], 'links': [normalized absolute URLs]},
+            plus 'canonical' when the page has an in-domain <link rel="canonical">
+        """
+        metrics = self.metrics
+        with metrics.time('parse'):
+            soup = BeautifulSoup(html, 'lxml')
+
+        # Links come from the whole page, before layout elements are removed
+        with metrics.time('links'):
+            links = self._collect_links(soup, url)
+            canonical = self.canonicalizer.canonical_link(soup, url)
+
+        with metrics.time('extract'):
+            page = self._extract_main_content(soup, url, links)
+        if canonical:
+            page['canonical'] = canonical
+        return page
+
+    def _extract_main_content(self, soup, url, links):
+        """Title and content blocks of a parsed page, with links passed through"""
         # Remove scripts and styles
         for script in soup(["script", "style"]):
             script.decompose()
@@ -118,32 +317,14 @@ class WebScraper:
         # Get body
         body = soup.find('body')
         if not body:
-            return {'title': 'No Title', 'content': []}
+            return {'title': 'No Title', 'content': [], 'links': links}
 
         # Remove layout elements
         for elem in body.find_all(['header', 'nav', 'footer', 'aside', 'sidebar']):
             elem.decompose()
 
-        # Find main content
-        main_content = None
-        content_selectors = [
-            'article', 'main',
-            'div[id="mw-content-text"]',  # Wikipedia
-            'div[data-testid="post-content"]', 'div[data-testid="story-content"]',  # Medium
-            'div[class*="post-content"]', 'div[class*="story-content"]',
-            'section[data-testid="post-content"]',  # Medium alternative
-            'div.entry-content', 'div.post-content', 'div.content',  # WordPress
-            'div.crayons-article__body', 'div.article-body',  # Dev.to
-            'div[class*="content"]', 'div[id*="content"]'
-        ]
-
-        for selector in content_selectors:
-            main_content = body.select_one(selector)
-            if main_content:
-                break
-
-        if not main_content:
-            main_content = body
+        # Find main content, straight from the selector learned for this domain if any
+        main_content, choice = self.extractors.find_main_content(soup, body, url)
 
         # Extract title
         title_elem = soup.find('title')
@@ -151,211 +332,413 @@ class WebScraper:
 
         # Clean and extract content
         content_blocks = self._extract_content_blocks(main_content)
+        self.extractors.learn(url, choice, sum(block.word_count for block in content_blocks))
 
         return {
             'title': title,
-            'content': content_blocks
+            'content': content_blocks,
+            'links': links
         }
 
     def _extract_content_blocks(self, main_content):
         """Extract structured content blocks"""
-        email_regex = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        emails = set()
-
-        def clean_html(html_str):
-            soup_temp = BeautifulSoup(html_str, 'lxml')
-            allowed_tags = {'a', 'img', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'strong', 'em', 'u', 'code', 'ul', 'ol', 'li', 'blockquote'}
-            allowed_attrs = {
-                'a': ['href'],
-                'img': ['src', 'alt'],
-            }
+        return extract_content_blocks(main_content)
 
-            for tag in soup_temp.find_all():
-                if tag.name not in allowed_tags:
-                    tag.unwrap()
-                    continue
-                # Remove unwanted attributes
-                attrs_to_remove = []
-                for attr in tag.attrs:
-                    if attr not in allowed_attrs.get(tag.name, []):
-                        attrs_to_remove.append(attr)
-                for attr in attrs_to_remove:
-                    del tag[attr]
-
-            return str(soup_temp)
-
-        content_blocks = []
-
-        for element in main_content.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'img', 'ul', 'ol', 'blockquote']):
-            if element.name.startswith('h'):
-                level = int(element.name[1])
-                html = clean_html(str(element))
-                text = element.get_text()
-                found_emails = re.findall(email_regex, text, re.IGNORECASE)
-                emails.update(found_emails)
-                highlighted_html = re.sub(email_regex, r'<span class="email-highlight">\g<0></span>', html, flags=re.IGNORECASE)
-                content_blocks.append({
-                    'type': 'heading',
-                    'level': level,
-                    'html': highlighted_html
-                })
-            elif element.name == 'p':
-                html = clean_html(str(element))
-                text = element.get_text()
-                if text.strip():
-                    found_emails = re.findall(email_regex, text, re.IGNORECASE)
-                    emails.update(found_emails)
-                    highlighted_html = re.sub(email_regex, r'<span class="email-highlight">\g<0></span>', html, flags=re.IGNORECASE)
-                    content_blocks.append({
-                        'type': 'paragraph',
-                        'html': highlighted_html
-                    })
-            elif element.name == 'img':
-                src = element.get('src')
-                alt = element.get('alt', '')
-                if src:
-                    html = clean_html(str(element))
-                    content_blocks.append({
-                        'type': 'image',
-                        'html': html,
-                        'src': src,
-                        'alt': alt
-                    })
-            elif element.name in ['ul', 'ol', 'blockquote']:
-                html = clean_html(str(element))
-                text = element.get_text()
-                found_emails = re.findall(email_regex, text, re.IGNORECASE)
-                emails.update(found_emails)
-                highlighted_html = re.sub(email_regex, r'<span class="email-highlight">\g<0></span>', html, flags=re.IGNORECASE)
-                content_blocks.append({
-                    'type': 'block',
-                    'html': highlighted_html
-                })
-
-        return content_blocks
-
-    def crawl_website(self, seed_url, max_depth=5, max_pages=1000):
+    def crawl_website(self, seed_url, max_depth=5, max_pages=1000, strategy='bfs', engine='adaptive',
+                      dedup=True, prune_duplicates=False, progress=None, polite=True, sitemaps=False,
+                      sitemap_only=False, profile=None):
         """
         Robustly crawl website to discover all links and extract content.
 
+        Collects every page from iter_crawl(); use that directly to process
+        pages as they arrive without holding the whole crawl in memory.
+
         Args:
             seed_url (str): Starting URL to crawl
             max_depth (int): Maximum crawl depth (default: 5)
             max_pages (int): Maximum number of pages to crawl (default: 1000)
+            strategy (str): Frontier order, 'bfs' or 'best_first' (default: 'bfs')
+            engine (str): 'adaptive', 'requests' or 'playwright' (default: 'adaptive')
+            dedup (bool): Drop pages whose text nearly duplicates an earlier
+                page (default: True)
+            prune_duplicates (bool): Stop crawling URL patterns that keep
+                producing duplicates, e.g. tag or pagination listings (default: False)
+            progress (callable): Called after every page with a dict of
+                pages_done, queue_size, pages_extracted, errors and last_error
+            polite (bool): Obey robots.txt and per-host rate limits, taking
+                URLs from whichever host is ready first (default: True)
+            sitemaps (bool): Also seed the crawl with the site's sitemap URLs,
+                most recently modified first (default: False)
+            sitemap_only (bool): Crawl only the sitemap URLs, without
+                following links (default: False)
+            profile (str): Sample the crawl's stacks into this file as
+                collapsed stacks for a flame graph (default: None, off)
 
         Returns:
             dict: {
                 "seed_url": seed_url,
                 "total_links": len(all_links),
                 "links": list(all_links),
-                "pages": list of page data with content
+                "pages": list of page data with content,
+                "engines": pages fetched per engine ('cache' for cache hits),
+                "duplicates": near-duplicate pages dropped,
+                "robots_blocked": URLs skipped because robots.txt disallows them,
+                "canonical_duplicates": pages whose rel=canonical target was
+                    already crawled,
+                "extractors": learned-selector hits, scans and hit_rate
+                    (see scraper/extractors.py),
+                "cache": {"hits": ..., "misses": ...} when an HTTP cache is set,
+                "search_index": pages added, updated and unchanged in the
+                    full-text index, when one is set (see scraper/search.py),
+                "metrics": per-stage seconds, bytes downloaded, engines and
+                    error classes (see scraper/metrics.py)
             }
         """
-        # Normalize seed URL
-        seed_url = self._normalize_url(seed_url)
-
-        # Initialize data structures
-        visited = set()
-        to_visit = [(seed_url, 0)]  # (url, depth)
         all_links = set()
-        pages_data = []
+        stats = {}
+        pages_data = list(self.iter_crawl(seed_url, max_depth, max_pages, strategy, engine, dedup, prune_duplicates, progress,
+                                          polite, sitemaps, sitemap_only, profile, links=all_links, stats=stats))
+        return {
+            "seed_url": stats['seed_url'],
+            "total_links": len(all_links),
+            "links": sorted(list(all_links)),
+            "pages": pages_data,
+            **{key: value for key, value in stats.items() if key != 'seed_url'},
+        }
 
-        # Get base domain for subdomain allowance
-        parsed_seed = urlparse(seed_url)
-        base_domain = parsed_seed.netloc
-        base_domain_parts = base_domain.split('.')
-        if len(base_domain_parts) > 2:
-            # For subdomains like blog.example.com, allow *.example.com
-            base_domain_root = '.'.join(base_domain_parts[-2:])
-        else:
-            base_domain_root = base_domain
+    def iter_crawl(self, seed_url, max_depth=5, max_pages=1000, strategy='bfs', engine='adaptive', dedup=True,
+                   prune_duplicates=False, progress=None, polite=True, sitemaps=False, sitemap_only=False, profile=None,
+                   links=None, stats=None):
+        """
+        Crawl like crawl_website(), yielding each page as soon as it is extracted.
+
+        Only the frontier and the set of visited URLs are kept for the whole
+        crawl, so memory depends on the frontier rather than on how much
+        content has been crawled. Pages the caller has consumed are not
+        referenced again. Stopping iteration early ends the crawl.
+
+        Args are the same as crawl_website(), plus:
+            links (set): If given, every in-domain link discovered is added
+                to it (default: None, links are not kept)
+            stats (dict): If given, filled in when the crawl ends with
+                seed_url, engines, duplicates, robots_blocked, metrics,
+                search_index and cache, as in the crawl_website() result
+
+        Yields:
+            dict: {"url": ..., "title": ..., "content": [...]} for every page
+            with content that is not a near-duplicate
+        """
+        index = self.search_index.writer() if self.search_index else contextlib.nullcontext()
+        with self.instrumented('crawl_website', profile) as metrics, index:
+            # Normalize seed URL
+            seed_url = self._normalize_url(seed_url)
+
+            # Initialize data structures
+            visited = set()
+            # Canonical keys of recorded pages, including rel=canonical targets
+            crawled = set()
+            politeness = self.get_politeness() if polite else None
+            to_visit = self._new_frontier(strategy, politeness)
+            self._seed_frontier(to_visit, seed_url, max_pages, sitemaps, sitemap_only)
+            pages_extracted = 0
+            engine_counts = Counter()
+            cache_stats_before = self.http_cache.stats() if self.http_cache else None
+            extractor_stats_before = self.extractors.stats()
+            duplicates = NearDuplicateDetector() if dedup or prune_duplicates else None
+            errors = 0
+            last_error = None
+            robots_blocked = 0
+            canonical_duplicates = 0
+
+            # Get base domain for subdomain allowance
+            base_domain_root = self._get_base_domain_root(seed_url)
+
+            print(f"Starting crawl of {seed_url} (domain: {base_domain_root}, max_depth: {max_depth}, max_pages: {max_pages})")
+
+            while to_visit and len(visited) < max_pages:
+                current_url, depth = to_visit.pop()
+
+                # Skip if already visited (directly or as another page's canonical) or too deep
+                if current_url in visited or depth > max_depth or self.canonicalizer.key(current_url) in crawled:
+                    continue
 
-        print(f"Starting crawl of {seed_url} (domain: {base_domain_root}, max_depth: {max_depth}, max_pages: {max_pages})")
+                # Skip listing patterns that have only been yielding duplicates
+                if prune_duplicates and not duplicates.should_expand(current_url):
+                    continue
 
-        while to_visit and len(visited) < max_pages:
-            current_url, depth = to_visit.pop(0)
+                if politeness and not politeness.allowed(current_url):
+                    print(f"Skipping (disallowed by robots.txt): {current_url}")
+                    robots_blocked += 1
+                    continue
 
-            # Skip if already visited or too deep
-            if current_url in visited or depth > max_depth:
-                continue
+                visited.add(current_url)
+                print(f"Crawling [{len(visited)}/{min(max_pages, len(to_visit) + len(visited))}]: {current_url}")
+
+                page_data = None
+                with metrics.page(current_url) as page_metrics:
+                    try:
+                        if politeness:
+                            with metrics.time('politeness_wait'):
+                                politeness.wait(current_url)
+                        html, content_data, used_engine = self.fetch_cached(current_url, engine)
+                        engine_counts[used_engine] += 1
+                        page_metrics.engine = used_engine
+
+                        page_data, page_links = self._process_page(html, current_url, base_domain_root, content_data)
+                        canonical_url = self._resolve_canonical(current_url, content_data, crawled)
+                        # Neither the HTML nor the full extraction outlive the page
+                        html = content_data = None
+
+                        if canonical_url is None:
+                            print(f"Skipping duplicate of an already crawled canonical page: {current_url}")
+                            canonical_duplicates += 1
+                            page_data, page_links = None, set()
+                        elif page_data:
+                            page_data['url'] = canonical_url
+
+                        # Pruning learns from every page, even when duplicates are kept
+                        if page_data and duplicates:
+                            duplicate_of = duplicates.check(current_url, page_text(page_data['content']))
+                            if duplicate_of and dedup:
+                                print(f"Skipping near-duplicate of {duplicate_of}: {current_url}")
+                                page_data = None
+
+                        if links is not None:
+                            links.update(page_links)
+
+                        # Add new links to visit queue if within depth limit
+                        if depth < max_depth and not sitemap_only:
+                            for link_url in page_links:
+                                to_visit.add(link_url, depth + 1)
+
+                    except Exception as e:
+                        print(f"Error crawling {current_url}: {str(e)}")
+                        errors += 1
+                        page_metrics.error = error_class(e)
+                        last_error = f"{current_url}: {str(e)}"
 
-            visited.add(current_url)
-            print(f"Crawling [{len(visited)}/{min(max_pages, len(to_visit) + len(visited))}]: {current_url}")
+                # Only include pages with meaningful content
+                if page_data:
+                    pages_extracted += 1
+
+                if progress:
+                    progress({
+                        'pages_done': len(visited),
+                        'queue_size': len(to_visit),
+                        'pages_extracted': pages_extracted,
+                        'errors': errors,
+                        'last_error': last_error,
+                    })
 
-            try:
-                # Always use Playwright for robust dynamic content handling
-                html = self.fetch_html_playwright(current_url)
+                if page_data:
+                    if self.search_index:
+                        with metrics.time('index'):
+                            index.add_page(page_data)
+                    yield page_data
+                    page_data = None
+
+            links_note = f", discovered {len(links)} unique links" if links is not None else ''
+            print(f"Crawl completed. Visited {len(visited)} pages{links_note}, extracted content from {pages_extracted} pages.")
+            print(f"Pages per engine: {dict(engine_counts)}")
+
+            crawl_stats = {
+                "seed_url": seed_url,
+                "engines": dict(engine_counts),
+                "duplicates": duplicates.duplicates if dedup else 0,
+                "robots_blocked": robots_blocked,
+                "canonical_duplicates": canonical_duplicates,
+                "extractors": self.extractors.stats(since=extractor_stats_before)
+            }
+            if self.http_cache:
+                crawl_stats["cache"] = {key: value - cache_stats_before[key] for key, value in self.http_cache.stats().items()}
+                print(f"HTTP cache: {crawl_stats['cache']['hits']} hits, {crawl_stats['cache']['misses']} misses")
+            if self.search_index:
+                with metrics.time('index'):
+                    crawl_stats["search_index"] = index.close()
+                print(f"Search index: {crawl_stats['search_index']}")
+            crawl_stats["metrics"] = metrics.finish()
+            if stats is not None:
+                stats.update(crawl_stats)
+
+    @contextlib.contextmanager
+    def instrumented(self, crawl, profile=None):
+        """
+        Time the stages of one crawl in self.metrics.
 
-                # Parse with BeautifulSoup
-                soup = BeautifulSoup(html, 'lxml')
+        Yields the crawl's CrawlMetrics; with profile set to a path, the
+        crawl is also run under the SamplingProfiler, written to that path.
+        """
+        metrics = CrawlMetrics(crawl)
+        previous, self.metrics = self.metrics, metrics
+        profiler = SamplingProfiler(profile).start() if profile else None
+        try:
+            yield metrics
+        finally:
+            if profiler:
+                profiler.stop()
+            self.metrics = previous
+
+    def crawl_website_async(self, seed_url, max_depth=5, max_pages=1000, concurrency=8, per_host_concurrency=2, strategy='bfs', engine='adaptive',
+                            dedup=True, prune_duplicates=False, polite=True, sitemaps=False, sitemap_only=False, profile=None):
+        """
+        Crawl website with many pages rendering concurrently.
 
-                # Extract content
-                content_data = self.extract_content(html, current_url)
+        Static pages are fetched with the async HTTP client (httpx) and
+        rendered pages with the Playwright async API in a browser of its own,
+        so it does not require entering the scraper's context manager first.
 
-                # Only include pages with meaningful content
-                if content_data['content']:
-                    pages_data.append({
-                        'url': current_url,
-                        'title': content_data['title'],
-                        'content': content_data['content']
-                    })
+        Args:
+            seed_url (str): Starting URL to crawl
+            max_depth (int): Maximum crawl depth (default: 5)
+            max_pages (int): Maximum number of pages to crawl (default: 1000)
+            concurrency (int): Pages in flight across all hosts (default: 8)
+            per_host_concurrency (int): Pages in flight per host (default: 2)
+            strategy (str): Frontier order, 'bfs' or 'best_first' (default: 'bfs')
+            engine (str): 'adaptive', 'requests' or 'playwright' (default: 'adaptive')
+            dedup (bool): Drop near-duplicate pages (default: True)
+            prune_duplicates (bool): Stop crawling URL patterns that keep
+                producing duplicates (default: False)
+            polite (bool): Obey robots.txt and per-host rate limits (default: True)
+            sitemaps (bool): Also seed from the site's sitemaps (default: False)
+            sitemap_only (bool): Crawl only sitemap URLs (default: False)
+            profile (str): Collapsed-stack profile output path (default: None, off)
 
-                # Extract all links
-                page_links = set()
-                for link in soup.find_all('a', href=True):
-                    href = link['href'].strip()
+        Returns:
+            dict: Same structure as crawl_website()
+        """
+        from .async_crawler import AsyncCrawler
+
+        crawler = AsyncCrawler(self, concurrency=concurrency, per_host_concurrency=per_host_concurrency)
+        # Run the event loop on its own thread: the sync Playwright driver
+        # started by __enter__ marks this thread as already running a loop.
+        with self.instrumented('crawl_website_async', profile) as metrics, ThreadPoolExecutor(max_workers=1) as executor:
+            result = executor.submit(asyncio.run, crawler.crawl(seed_url, max_depth, max_pages, strategy, engine, dedup, prune_duplicates,
+                                                          polite, sitemaps, sitemap_only)).result()
+            result["metrics"] = metrics.finish()
+        return result
+
+    def crawl_website_pipelined(self, seed_url, max_depth=5, max_pages=1000, strategy='bfs', engine='adaptive',
+                                dedup=True, prune_duplicates=False, extract_workers=None, fetch_workers=4,
+                                queue_size=32, sink=None, progress=None, polite=True, sitemaps=False, sitemap_only=False,
+                                profile=None, export_row=None, max_rows=0):
+        """
+        Crawl website with fetching and CPU-bound extraction overlapped.
 
-                    # Skip empty, fragment-only, or non-HTTP links
-                    if not href or href.startswith('#') or href.startswith('mailto:') or href.startswith('javascript:'):
-                        continue
+        Pages are downloaded on fetch threads and parsed in a process pool, so
+        extraction uses every core and never delays the next fetch; bounded
+        queues between the stages keep memory flat. See scraper/pipeline.py.
 
-                    # Normalize URL
-                    full_url = urljoin(current_url, href)
-                    normalized_url = self._normalize_url(full_url)
+        Args:
+            seed_url (str): Starting URL to crawl
+            max_depth (int): Maximum crawl depth (default: 5)
+            max_pages (int): Maximum number of pages to crawl (default: 1000)
+            strategy (str): Frontier order, 'bfs' or 'best_first' (default: 'bfs')
+            engine (str): 'adaptive', 'requests' or 'playwright' (default: 'adaptive')
+            dedup (bool): Drop near-duplicate pages (default: True)
+            prune_duplicates (bool): Stop crawling URL patterns that keep
+                producing duplicates (default: False)
+            extract_workers (int): Extraction processes (default: CPU count)
+            fetch_workers (int): Fetch threads (default: 4)
+            queue_size (int): Pages in flight between stages (default: 32)
+            sink (ExportSink): Write pages here as they are extracted instead
+                of returning them in "pages"
+            progress (callable): Same as for crawl_website()
+            polite (bool): Obey robots.txt and per-host rate limits; the
+                fetch threads wait for their host's turn (default: True)
+            sitemaps (bool): Also seed from the site's sitemaps (default: False)
+            sitemap_only (bool): Crawl only sitemap URLs (default: False)
+            profile (str): Collapsed-stack profile output path (default: None, off)
+            export_row (callable): Turns a page into a sink row, or None to
+                skip it (default: scraper.sinks.page_row)
+            max_rows (int): With a sink, stop once this many rows are
+                written (default: 0, no limit)
+
+        Returns:
+            dict: Same structure as crawl_website(), plus "pages_written"
+            when a sink is given
+        """
+        from .pipeline import PipelinedCrawler
+
+        crawler = PipelinedCrawler(self, extract_workers=extract_workers, fetch_workers=fetch_workers, queue_size=queue_size)
+        with self.instrumented('crawl_website_pipelined', profile) as metrics:
+            result = crawler.crawl(seed_url, max_depth, max_pages, strategy, engine, dedup, prune_duplicates, sink, progress,
+                                   polite, sitemaps, sitemap_only, export_row, max_rows)
+            result["metrics"] = metrics.finish()
+        return result
+
+    def _get_base_domain_root(self, seed_url):
+        """Return the domain that crawled links must stay within"""
+        # For subdomains like blog.example.co.uk, allow *.example.co.uk
+        return registrable_domain(urlparse(seed_url).hostname or '')
+
+    def _new_frontier(self, strategy, politeness=None):
+        """Frontier for a crawl, with URL variants folded by the canonicalizer"""
+        if politeness:
+            return PoliteFrontier(politeness, strategy, key=self.canonicalizer.key)
+        return Frontier(strategy, key=self.canonicalizer.key)
+
+    def _resolve_canonical(self, url, page, crawled):
+        """
+        URL a fetched page is recorded under: its rel=canonical target, if any.
 
-                    # Check if URL is valid and within allowed domain
-                    parsed_url = urlparse(normalized_url)
-                    if parsed_url.scheme in ('http', 'https') and base_domain_root in parsed_url.netloc:
-                        page_links.add(normalized_url)
+        crawled holds the canonical keys of the pages recorded so far. Returns
+        None if the page's canonical target was already recorded, i.e. the
+        page is a duplicate of one already crawled.
+        """
+        canonical = page.get('canonical') or url
+        canonical_key = self.canonicalizer.key(canonical)
+        if canonical_key in crawled:
+            return None
+        crawled.add(canonical_key)
+        crawled.add(self.canonicalizer.key(url))
+        return canonical
+
+    def _process_page(self, html, current_url, base_domain_root, page=None):
+        """Extract page content and in-domain links from fetched HTML"""
+        # Extract content and links unless the fetch step already did
+        if page is None:
+            page = self.extract_page(html, current_url)
+
+        page_data = None
+        if page['content']:
+            page_data = {
+                'url': current_url,
+                'title': page['title'],
+                'content': page['content']
+            }
 
-                # Add discovered links to global set
-                all_links.update(page_links)
+        # Only follow links within the allowed domain
+        page_links = {link for link in page['links'] if in_domain(link, base_domain_root)}
+        return page_data, page_links
 
-                # Add new links to visit queue if within depth limit
-                if depth < max_depth:
-                    for link_url in page_links:
-                        if link_url not in visited and link_url not in [u for u, d in to_visit]:
-                            to_visit.append((link_url, depth + 1))
+    def _collect_links(self, soup, current_url):
+        """Collect normalized absolute http(s) links from a parsed page"""
+        page_links = {}
+        for link in soup.find_all('a', href=True):
+            href = link['href'].strip()
 
-            except Exception as e:
-                print(f"Error crawling {current_url}: {str(e)}")
+            # Skip empty, fragment-only, or non-HTTP links
+            if not href or href.startswith('#') or href.startswith('mailto:') or href.startswith('javascript:'):
                 continue
 
-        print(f"Crawl completed. Visited {len(visited)} pages, discovered {len(all_links)} unique links, extracted content from {len(pages_data)} pages.")
+            # Normalize URL
+            full_url = urljoin(current_url, href)
+            normalized_url = self._normalize_url(full_url)
 
-        return {
-            "seed_url": seed_url,
-            "total_links": len(all_links),
-            "links": sorted(list(all_links)),
-            "pages": pages_data
-        }
+            if urlparse(normalized_url).scheme in ('http', 'https'):
+                page_links[normalized_url] = None
+
+        return list(page_links)
 
     def _normalize_url(self, url):
-        """Normalize URL by removing fragments and standardizing format"""
-        parsed = urlparse(url)
-        # Remove fragment
-        normalized = parsed._replace(fragment='')
-        # Reconstruct URL
-        return normalized.geturl()
+        """Canonical form of url (see scraper/canonical.py)"""
+        return self.canonicalizer.canonicalize(url)
 
     def scrape_url(self, url):
         """Main method to scrape a single URL"""
         try:
-            if self.is_dynamic_site(url):
-                html = self.fetch_html_playwright(url)
-            else:
-                html = self.fetch_html_requests(url)
-
-            return self.extract_content(html, url)
+            html, content_data, engine = self.fetch_cached(url)
+            content_data['engine'] = engine
+            return content_data
         except Exception as e:
             return {'title': 'Error', 'content': [], 'error': str(e)}
\ No newline at end of file
@@ -1,14 +1,24 @@
-from django.shortcuts import render
-from .utils import WebScraper
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import redirect, render
+from django.urls import reverse
+from .browser_pool import get_browser_pool
+from .jobs import get_crawl_jobs
+from .metrics import get_metrics_registry
+from .result_cache import get_result_cache
+from .search import get_search_index
+
+SEARCH_PAGE_SIZE = 20
 
 def scrape_blog(request):
     url = 'https://healthwire.pk/healthcare/'
 
+    def fetch():
+        with get_browser_pool().lease() as scraper:
+            return scraper.scrape_url(url)
+
     try:
-        with WebScraper() as scraper:
-            scraped_data = scraper.scrape_url(url)
+        scraped_data = get_result_cache().get_or_fetch(url, fetch)
     except Exception as e:
         scraped_data = {'title': 'Error', 'content': [], 'error': str(e)}
 
@@ -19,80 +29,125 @@ def scrape_blog(request):
     return render(request, 'scraper/results.html', context)
 
 def crawl_links(request):
-    from django.http import HttpResponse
-    import pandas as pd
-    from io import BytesIO
-
-    crawl_result = None
+    jobs = get_crawl_jobs()
     error = None
     submitted_url = ''
 
     if request.method == 'POST':
-        url = request.POST.get('url')
-        submitted_url = url
-
-        if url:
-            try:
-                # Use conservative limits for web interface to prevent timeouts
-                with WebScraper() as scraper:
-                    crawl_result = scraper.crawl_website(url, max_depth=2, max_pages=20)
-            except Exception as e:
-                error = str(e)
-
-        # Handle export
-        if 'export' in request.POST and crawl_result and crawl_result['pages']:
-            # Create DataFrame with page data
-            export_data = []
-            for page in crawl_result['pages']:
-                content_text = ' '.join(
-                    block.get('html', '').replace('<p>', '').replace('</p>', '').replace('<h1>', '').replace('</h1>', '').replace('<h2>', '').replace('</h2>', '').replace('<h3>', '').replace('</h3>', '').strip()
-                    for block in page['content']
-                    if block['type'] in ['paragraph', 'heading']
-                )
-                export_data.append({
-                    'URL': page['url'],
-                    'Title': page['title'],
-                    'Content': content_text[:5000],  # Limit content length
-                    'Word Count': len(content_text.split())
-                })
-
-            df = pd.DataFrame(export_data)
-            output = BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                df.to_excel(writer, index=False, sheet_name='Extracted Content')
-            output.seek(0)
-
-            response = HttpResponse(
-                output.getvalue(),
-                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            )
-            response['Content-Disposition'] = 'attachment; filename=extracted_content.xlsx'
-            return response
+        # Handle export from the stored job result, without recrawling
+        if 'export' in request.POST:
+            job = jobs.get(request.POST.get('job', ''))
+            if job and job.result and job.result['pages']:
+                return export_crawl_result(job.result)
+            error = 'The crawl results are no longer available, please crawl again.'
+            submitted_url = job.url if job else ''
+        else:
+            url = request.POST.get('url')
+            if url:
+                limits = getattr(settings, 'SCRAPER_WEB_CRAWL_LIMITS', {})
+                max_depth = _bounded_int(request.POST.get('max_depth'), limits.get('default_depth', 2), limits.get('max_depth', 5))
+                max_pages = _bounded_int(request.POST.get('max_pages'), limits.get('default_pages', 20), limits.get('max_pages', 1000))
+                job = jobs.submit(url, max_depth, max_pages)
+                return redirect(f"{reverse('crawl_links')}?job={job.id}")
+
+    job = jobs.get(request.GET['job']) if request.GET.get('job') else None
+    if job:
+        submitted_url = job.url
+        error = error or job.error
+    elif request.GET.get('job'):
+        error = 'Unknown crawl job.'
 
     context = {
-        'crawl_result': crawl_result,
+        'job': job.to_dict() if job else None,
+        'crawl_result': job.result if job else None,
         'error': error,
         'submitted_url': submitted_url,
     }
     return render(request, 'scraper/crawl_links.html', context)
-    return render(request, 'scraper/crawl_links.html', context)
+
+def crawl_job_status(request, job_id):
+    job = get_crawl_jobs().get(job_id)
+    if not job:
+        return JsonResponse({'error': 'Unknown crawl job'}, status=404)
+    return JsonResponse(job.to_dict())
+
+def metrics(request):
+    """Crawl stage timings and counters for Prometheus to scrape"""
+    return HttpResponse(get_metrics_registry().render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page = _bounded_int(request.GET.get('page'), 1, 1000)
+    search_index = get_search_index()
+    results = None
+    error = None
+    if search_index is None:
+        error = 'Search is not configured (set SCRAPER_SEARCH_INDEX).'
+    elif query:
+        results = search_index.search(query, limit=SEARCH_PAGE_SIZE, offset=(page - 1) * SEARCH_PAGE_SIZE)
+
+    context = {
+        'query': query,
+        'results': results,
+        'page': page,
+        'error': error,
+    }
+    return render(request, 'scraper/search.html', context)
+
+def search_api(request):
+    """Ranked pages matching ?q=, with highlighted snippets, as JSON"""
+    search_index = get_search_index()
+    if search_index is None:
+        return JsonResponse({'error': 'Search is not configured'}, status=503)
+    query = request.GET.get('q', '').strip()
+    if not query:
+        return JsonResponse({'error': 'Missing query parameter q'}, status=400)
+    limit = _bounded_int(request.GET.get('limit'), SEARCH_PAGE_SIZE, 100)
+    page = _bounded_int(request.GET.get('page'), 1, 1000)
+    return JsonResponse({**search_index.search(query, limit=limit, offset=(page - 1) * limit), 'page': page})
+
+def export_crawl_result(crawl_result):
+    import pandas as pd
+    from io import BytesIO
+
+    # Create DataFrame with page data
+    export_data = []
+    for page in crawl_result['pages']:
+        text_blocks = [block for block in page['content'] if block.type in ('paragraph', 'heading')]
+        content_text = ' '.join(block.text for block in text_blocks)
+        export_data.append({
+            'URL': page['url'],
+            'Title': page['title'],
+            'Content': content_text[:5000],  # Limit content length
+            'Word Count': sum(block.word_count for block in text_blocks)
+        })
+
+    df = pd.DataFrame(export_data)
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        df.to_excel(writer, index=False, sheet_name='Extracted Content')
+    output.seek(0)
+
+    response = HttpResponse(
+        output.getvalue(),
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
+    response['Content-Disposition'] = 'attachment; filename=extracted_content.xlsx'
+    return response
+
+def _bounded_int(value, default, maximum):
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(number, maximum))
 
 def extract_title_from_result(result):
     # Try to find title in content
     for block in result['content']:
-        if 'html' in block:
-            soup = BeautifulSoup(block['html'], 'lxml')
-            h1 = soup.find('h1')
-            if h1:
-                return h1.get_text(strip=True)
+        if block.type == 'heading' and block.level == 1 and block.text:
+            return block.text
     return result.get('title', 'No Title')
 
 def extract_content_from_result(result):
-    content_texts = []
-    for block in result['content']:
-        if block.get('type') == 'paragraph' and 'html' in block:
-            soup = BeautifulSoup(block['html'], 'lxml')
-            text = soup.get_text(strip=True)
-            if text:
-                content_texts.append(text)
-    return ' '.join(content_texts)
+    return ' '.join(block.text for block in result['content'] if block.type == 'paragraph' and block.text)